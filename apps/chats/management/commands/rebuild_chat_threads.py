@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.rooms.models import Room
+from apps.chats.threads import rebuild
+
+
+class Command(BaseCommand):
+    help = '重建留言串索引 thread_path / depth (bulk_create 等略過 Chat.save 的寫入之後執行)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('room_ids', nargs='*', type=int, help='房號 id；不指定則重建所有房間')
+
+    def handle(self, *args, **options):
+        room_ids = options['room_ids']
+        if room_ids:
+            missing = set(room_ids) - set(Room.objects.filter(id__in=room_ids).values_list('id', flat=True))
+            if missing:
+                raise CommandError(f'找不到房號 id: {sorted(missing)}')
+
+        count = rebuild(room_ids or None)
+        self.stdout.write(f'完成，共重建 {count} 則文章與留言的留言串路徑')
@@ -0,0 +1,136 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db import models
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Substr
+
+from .threads import SEGMENT_WIDTH, delete_threads, subtree_q
+from .unread import annotate_read_at
+
+
+def encode_cursor(article):
+    """文章 → 分頁 cursor (created_at + id，URL 安全)"""
+    raw = f'{article.created_at.isoformat()}|{article.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """分頁 cursor → (created_at, id)；格式錯誤時丟出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f'無效的 cursor: {cursor!r}') from e
+
+
+def _after_cursor(queryset, cursor, descending):
+    """只保留排在 cursor 之後的資料 (依 created_at, id)"""
+    created_at, pk = decode_cursor(cursor)
+    # 先加上 created_at 的範圍條件，讓索引可以直接從 cursor 的位置開始讀
+    if descending:
+        return queryset.filter(created_at__lte=created_at).filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    return queryset.filter(created_at__gte=created_at).filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+    )
+
+
+def _thread_cursor(cursor):
+    """留言串分頁的 cursor 就是上一頁最後一則的 thread_path；格式錯誤時丟出 ValueError"""
+    if not cursor.isdigit() or len(cursor) % SEGMENT_WIDTH:
+        raise ValueError(f'無效的 cursor: {cursor!r}')
+    return cursor
+
+
+def _page(queryset, limit, encode=encode_cursor):
+    """(一頁資料 list, 下一頁 cursor 或 None)；多讀一筆判斷是否還有下一頁"""
+    rows = list(queryset[:limit + 1])
+    next_cursor = encode(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+class ChatQuerySet(models.QuerySet):
+
+    def delete(self):
+        """連同所有子孫留言一起刪除 (以 thread_path 範圍集合刪除，見 apps.chats.threads)"""
+        deleted = delete_threads(self)
+        return deleted, {self.model._meta.label: deleted}
+
+
+class ChatManager(models.Manager):
+    """
+    留言板查詢：
+    - 文章列表以 (created_at, id)、留言串以 thread_path 做 keyset 分頁，不論翻到第幾頁都只讀一頁的資料
+    - 留言數與最後留言時間以子查詢計算，只針對查出來的文章執行
+    """
+
+    FEED_PAGE_SIZE = 20
+    COMMENT_PAGE_SIZE = 20
+    EXCERPT_LENGTH = 150
+    # 文章詳情一次展開的留言層數 (相對於文章)，更深的回覆以 ChatCommentsView 的 root 參數另外載入
+    THREAD_DEPTH = 5
+
+    def get_queryset(self):
+        return ChatQuerySet(self.model, using=self._db)
+
+    def with_reply_stats(self):
+        """附上 reply_count 與 last_reply_at"""
+        replies = (
+            self.model.objects.filter(parent=OuterRef('pk'), is_article=False)
+            .order_by().values('parent')
+        )
+        return self.annotate(
+            reply_count=Coalesce(
+                Subquery(replies.annotate(n=Count('id')).values('n')),
+                0, output_field=IntegerField(),
+            ),
+            last_reply_at=Subquery(replies.annotate(last=Max('created_at')).values('last')),
+        )
+
+    def feed_queryset(self, room, cursor=None, reader=None):
+        """
+        文章列表 (新到舊) 的 queryset，從 cursor 之後開始。
+        文章不載入完整 content，改以 excerpt 提供前 EXCERPT_LENGTH 個字；
+        指定 reader 時附上他的閱讀紀錄 read_at (判斷未讀用)。
+        """
+        queryset = (
+            self.with_reply_stats()
+            .filter(room=room, is_article=True)
+            .select_related('author')
+            .defer('content')
+            .annotate(excerpt=Substr('content', 1, self.EXCERPT_LENGTH))
+            .order_by('-created_at', '-id')
+        )
+        if cursor:
+            queryset = _after_cursor(queryset, cursor, descending=True)
+        if reader is not None:
+            queryset = annotate_read_at(queryset, reader)
+        return queryset
+
+    def article_feed(self, room, cursor=None, limit=FEED_PAGE_SIZE, reader=None):
+        """回傳 (一頁文章 list, 下一頁 cursor 或 None)"""
+        return _page(self.feed_queryset(room, cursor, reader), limit)
+
+    def thread_queryset(self, chat, cursor=None, max_depth=THREAD_DEPTH):
+        """
+        chat 底下的整串留言 (不含 chat 本身)，依 thread_path 排序：深度優先、同層舊到新。
+        max_depth 為相對於 chat 的層數上限 (None 為不限)；從 cursor 之後開始。
+        """
+        queryset = (
+            self.filter(subtree_q(chat.thread_path, include_self=False))
+            .select_related('author')
+            .order_by('thread_path')
+        )
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=chat.depth + max_depth)
+        if cursor:
+            queryset = queryset.filter(thread_path__gt=_thread_cursor(cursor))
+        return queryset
+
+    def thread_page(self, chat, cursor=None, limit=COMMENT_PAGE_SIZE, max_depth=THREAD_DEPTH):
+        """回傳 (一頁留言 list, 下一頁 cursor 或 None)"""
+        return _page(self.thread_queryset(chat, cursor, max_depth), limit, encode=lambda c: c.thread_path)
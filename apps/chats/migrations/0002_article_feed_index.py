@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-17 12:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0001_initial'),
+        ('rooms', '0002_room_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(condition=models.Q(('is_article', True)), fields=['room', '-created_at'], name='chat_article_feed_idx'),
+        ),
+    ]
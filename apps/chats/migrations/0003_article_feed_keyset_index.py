@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-17 13:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0002_article_feed_index'),
+        ('rooms', '0002_room_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chat',
+            name='chat_article_feed_idx',
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(condition=models.Q(('is_article', True)), fields=['room', '-created_at', '-id'], name='chat_article_feed_idx'),
+        ),
+    ]
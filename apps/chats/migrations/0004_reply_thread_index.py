@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-17 13:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0003_article_feed_keyset_index'),
+        ('rooms', '0002_room_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(condition=models.Q(('is_article', False)), fields=['parent', 'created_at', 'id'], name='chat_reply_thread_idx'),
+        ),
+    ]
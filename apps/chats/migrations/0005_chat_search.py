@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-17 13:20
+
+from django.db import migrations
+
+PG_VECTOR = "to_tsvector('simple'::regconfig, COALESCE(title, '') || ' ' || content)"
+
+
+def create_search_index(apps, schema_editor):
+    """SQLite：FTS5 虛擬資料表並填入現有留言；PostgreSQL：GIN 運算式索引 (見 apps.chats.search)"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE chats_chat_fts USING fts5(title, content, room_key, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            "INSERT INTO chats_chat_fts (rowid, title, content, room_key) "
+            "SELECT id, COALESCE(title, ''), content, 'r' || room_id || 'r' FROM chats_chat"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'CREATE INDEX chat_search_idx ON chats_chat USING gin ({PG_VECTOR})')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS chats_chat_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS chat_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0004_reply_thread_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
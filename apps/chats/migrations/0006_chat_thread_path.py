@@ -0,0 +1,63 @@
+# Generated by Django 5.1.1 on 2026-10-17 13:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+SEGMENT_WIDTH = 10
+
+
+def fill_thread_paths(apps, schema_editor):
+    """依 parent 計算現有留言的 thread_path / depth (之後可用 rebuild_chat_threads 重建)"""
+    Chat = apps.get_model('chats', 'Chat')
+    parents = dict(Chat.objects.values_list('id', 'parent_id'))
+    paths = {}
+
+    def path_of(chat_id):
+        chain = []
+        while chat_id is not None and chat_id not in paths:
+            chain.append(chat_id)
+            chat_id = parents[chat_id]
+        prefix, depth = paths[chat_id] if chat_id is not None else ('', -1)
+        for node in reversed(chain):
+            prefix, depth = prefix + str(node).zfill(SEGMENT_WIDTH), depth + 1
+            paths[node] = (prefix, depth)
+        return paths[chain[0]] if chain else paths[chat_id]
+
+    chats = []
+    for chat_id in parents:
+        thread_path, depth = path_of(chat_id)
+        chats.append(Chat(id=chat_id, thread_path=thread_path, depth=depth))
+    Chat.objects.bulk_update(chats, ['thread_path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0005_chat_search'),
+        ('rooms', '0002_room_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='層數'),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='thread_path',
+            field=models.CharField(default='', editable=False, max_length=250, verbose_name='留言串路徑'),
+        ),
+        migrations.AlterField(
+            model_name='chat',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='replies', to='chats.chat', verbose_name='父級文章/留言'),
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['thread_path'], name='chat_thread_path_idx'),
+        ),
+        migrations.RunPython(fill_thread_paths, migrations.RunPython.noop),
+    ]
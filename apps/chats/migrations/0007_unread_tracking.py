@@ -0,0 +1,81 @@
+# Generated by Django 5.1.1 on 2026-10-17 13:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+SEGMENT_WIDTH = 10
+
+
+def fill_tracking(apps, schema_editor):
+    """
+    文章的 last_activity_at 取整串最新一則的時間；
+    現有成員從現在開始計算未讀 (之前的留言都算已讀，之後可用 rebuild_unread_counters 重算)
+    """
+    Chat = apps.get_model('chats', 'Chat')
+    Room = apps.get_model('rooms', 'Room')
+    UnreadCounter = apps.get_model('chats', 'UnreadCounter')
+
+    latest = {}
+    for thread_path, created_at in Chat.objects.values_list('thread_path', 'created_at').iterator(chunk_size=5000):
+        article_id = int(thread_path[:SEGMENT_WIDTH])
+        if article_id not in latest or created_at > latest[article_id]:
+            latest[article_id] = created_at
+    Chat.objects.bulk_update(
+        [Chat(pk=article_id, last_activity_at=at) for article_id, at in latest.items()],
+        ['last_activity_at'], batch_size=1000,
+    )
+
+    now = django.utils.timezone.now()
+    UnreadCounter.objects.bulk_create([
+        UnreadCounter(room_id=room_id, user_id=user_id, since=now)
+        for room_id, user_id in Room.members.through.objects.values_list('room_id', 'user_id')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0006_chat_thread_path'),
+        ('rooms', '0002_room_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='最後活動時間'),
+        ),
+        migrations.CreateModel(
+            name='ReadMarker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(verbose_name='讀到的時間')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_markers', to='chats.chat', verbose_name='文章')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_read_markers', to=settings.AUTH_USER_MODEL, verbose_name='成員')),
+            ],
+            options={
+                'verbose_name': '閱讀紀錄',
+                'verbose_name_plural': '閱讀紀錄',
+                'constraints': [models.UniqueConstraint(fields=('user', 'article'), name='chat_read_marker_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='未讀數')),
+                ('since', models.DateTimeField(default=django.utils.timezone.now, verbose_name='起算時間')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='rooms.room', verbose_name='所屬房號')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_unread_counters', to=settings.AUTH_USER_MODEL, verbose_name='成員')),
+            ],
+            options={
+                'verbose_name': '未讀計數',
+                'verbose_name_plural': '未讀計數',
+                'constraints': [models.UniqueConstraint(fields=('room', 'user'), name='chat_unread_counter_unique')],
+            },
+        ),
+        migrations.RunPython(fill_tracking, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,9 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
+from .managers import ChatManager
+from .threads import MAX_DEPTH, child_path, rebuild as rebuild_threads, root_id
+
 class Chat(models.Model):
     """
     留言板上的文章或留言 (原 Message)
@@ -23,26 +26,123 @@ class Chat(models.Model):
     is_article = models.BooleanField(default=True, verbose_name='是否為文章 (True=文章, False=留言/回覆)')
     
     # 父級留言/文章 (F-5.1) - 處理留言與文章的巢狀關係
+    # 子孫留言由 delete() 以 thread_path 範圍一次刪除，不交給 Collector 逐層 CASCADE
     parent = models.ForeignKey(
         'self', 
-        on_delete=models.CASCADE, 
+        on_delete=models.DO_NOTHING, 
         null=True, 
         blank=True, 
         related_name='replies', 
         verbose_name='父級文章/留言'
     )
+
+    # 留言串索引 (見 apps.chats.threads)：從文章到自己的 id 路徑與層數
+    thread_path = models.CharField(max_length=250, default='', editable=False, verbose_name='留言串路徑')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='層數')
+    # 文章專用：整串 (文章與任何一層留言) 最新一則的建立時間，判斷未讀用 (見 apps.chats.unread)
+    last_activity_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='最後活動時間')
     
     # 時間戳
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='建立時間')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新時間')
 
+    objects = ChatManager()
+
     class Meta:
         verbose_name = '留言板訊息'
         verbose_name_plural = '留言板訊息'
         ordering = ['-created_at']
+        indexes = [
+            # 留言板列表：某房號的文章依時間新到舊。
+            # is_article=True 會被編譯成 WHERE "is_article" (沒有 = 1)，SQLite 無法用在複合索引上，
+            # 改用只含文章的部分索引 (PostgreSQL 也能使用)；
+            # id 一併放入，keyset 分頁 (created_at, id) 可直接從 cursor 的位置讀取
+            models.Index(
+                fields=['room', '-created_at', '-id'],
+                condition=models.Q(is_article=True),
+                name='chat_article_feed_idx',
+            ),
+            # 文章詳情的留言分頁：某篇文章的留言依時間舊到新
+            models.Index(
+                fields=['parent', 'created_at', 'id'],
+                condition=models.Q(is_article=False),
+                name='chat_reply_thread_idx',
+            ),
+            # 留言串 / 子樹：thread_path 範圍查詢，並直接依路徑排序
+            models.Index(fields=['thread_path'], name='chat_thread_path_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        creating = self._state.adding
+        parent = self.parent if self.parent_id else None
+        if creating and parent is not None:
+            if not parent.thread_path:
+                # bulk_create 回傳的物件沒有路徑，從資料庫讀取
+                parent.refresh_from_db(fields=['thread_path', 'depth'])
+            if parent.depth >= MAX_DEPTH:
+                raise ValueError(f'留言串最多 {MAX_DEPTH} 層')
+        super().save(*args, **kwargs)
+        if not creating:
+            return
+        if parent is not None and not parent.thread_path:
+            # 父留言尚未建立路徑 (bulk_create 後沒有重建)：整個房間一起補上
+            rebuild_threads([self.room_id])
+            self.refresh_from_db(fields=['thread_path', 'depth'])
+            return
+        # 路徑包含自己的 id，插入後才能決定
+        self.thread_path, self.depth = child_path(parent, self.pk)
+        if parent is None:
+            self.last_activity_at = self.created_at
+            Chat.objects.filter(pk=self.pk).update(
+                thread_path=self.thread_path, depth=self.depth, last_activity_at=self.last_activity_at
+            )
+        else:
+            Chat.objects.filter(pk=self.pk).update(thread_path=self.thread_path, depth=self.depth)
+            Chat.objects.filter(pk=root_id(self.thread_path)).update(last_activity_at=self.created_at)
+
+    def delete(self, using=None, keep_parents=False):
+        """連同所有子孫留言一起刪除 (集合操作)"""
+        return Chat.objects.filter(pk=self.pk).delete()
 
     def __str__(self):
         if self.is_article:
             return f"文章: {self.title or self.content[:30]}..."
         else:
             return f"回覆給 {self.parent.id} by {self.author.username}"
+
+
+class ReadMarker(models.Model):
+    """成員讀到某篇文章 (含整串留言) 的時間，之後的內容算未讀 (見 apps.chats.unread)"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chat_read_markers', verbose_name='成員')
+    article = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name='read_markers', verbose_name='文章')
+    read_at = models.DateTimeField(verbose_name='讀到的時間')
+
+    class Meta:
+        verbose_name = '閱讀紀錄'
+        verbose_name_plural = '閱讀紀錄'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'article'], name='chat_read_marker_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} read {self.article_id} at {self.read_at}"
+
+
+class UnreadCounter(models.Model):
+    """成員在房間內的留言板未讀數 (增量維護，導覽列徽章只讀這一列)"""
+    room = models.ForeignKey('rooms.Room', on_delete=models.CASCADE, related_name='unread_counters', verbose_name='所屬房號')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chat_unread_counters', verbose_name='成員')
+    count = models.PositiveIntegerField(default=0, verbose_name='未讀數')
+    # 這之前的文章與留言都算已讀 (加入房間的時間)
+    since = models.DateTimeField(default=timezone.now, verbose_name='起算時間')
+
+    class Meta:
+        verbose_name = '未讀計數'
+        verbose_name_plural = '未讀計數'
+        constraints = [
+            # 同時是徽章查詢 (room, user) 用的索引
+            models.UniqueConstraint(fields=['room', 'user'], name='chat_unread_counter_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.room}: {self.count}"
@@ -0,0 +1,169 @@
+"""
+留言板全文搜尋 (限定房號，標題 + 內容)
+
+- SQLite：FTS5 虛擬資料表 chats_chat_fts (rowid = Chat.id)，trigram 分詞，
+  中文不需斷詞即可做子字串搜尋；房號以 room_key 欄位 ("r<id>r") 一起放進索引，
+  MATCH 時直接與關鍵字交集。由 apps.chats.signals 在儲存 / 刪除時同步。
+  trigram 無法索引少於 3 個字的關鍵字，這類關鍵字改以 LIKE 在該房號的結果中過濾。
+- PostgreSQL：chats_chat 上 to_tsvector('simple', title || content) 的 GIN 運算式索引，
+  由資料庫自動維護。
+- 其他資料庫：退回 icontains (不排序相關度)。
+
+結果依相關度 (bm25 / ts_rank) 排序，以頁碼分頁 (多讀一筆判斷是否有下一頁，不做 COUNT)。
+bulk_create / QuerySet.update 不會觸發 signals，之後請執行 rebuild_chat_search。
+"""
+from typing import NamedTuple
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Chat
+
+FTS_TABLE = 'chats_chat_fts'
+PG_INDEX = 'chat_search_idx'
+# 必須與 PG_INDEX 的運算式完全相同，查詢才會使用索引
+PG_VECTOR = "to_tsvector('simple'::regconfig, COALESCE(title, '') || ' ' || content)"
+
+PAGE_SIZE = 20
+TRIGRAM = 3
+# bm25 欄位權重：title, content, room_key
+BM25_WEIGHTS = (2.0, 1.0, 0.0)
+
+
+class SearchPage(NamedTuple):
+    results: list
+    number: int
+    has_next: bool
+
+    @property
+    def has_previous(self):
+        return self.number > 1
+
+
+def _room_key(room_id):
+    return f'r{room_id}r'
+
+
+def _phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like(term):
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+# =========================
+# 同步 (僅 SQLite 需要)
+# =========================
+def index_chat(chat):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [chat.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, content, room_key) VALUES (%s, %s, %s, %s)',
+            [chat.pk, chat.title or '', chat.content, _room_key(chat.room_id)],
+        )
+
+
+def remove_chat(chat_id):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [chat_id])
+
+
+def remove_chats(chats):
+    """一次移除 queryset 內所有 Chat 的索引 (集合刪除留言串時使用)"""
+    if connection.vendor != 'sqlite':
+        return
+    sql, params = chats.values('id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({sql})', params)
+
+
+def rebuild(room_ids=None):
+    """從 chats_chat 重建索引 (room_ids 為 None 時重建全部)，回傳重建的文章與留言數"""
+    chats = Chat.objects.all()
+    if room_ids is not None:
+        chats = chats.filter(room_id__in=room_ids)
+    if connection.vendor == 'sqlite':
+        insert = (
+            f"INSERT INTO {FTS_TABLE} (rowid, title, content, room_key) "
+            f"SELECT id, COALESCE(title, ''), content, 'r' || room_id || 'r' FROM chats_chat"
+        )
+        with connection.cursor() as cursor:
+            if room_ids is None:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+                cursor.execute(insert)
+                cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            else:
+                placeholders = ', '.join(['%s'] * len(room_ids))
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} WHERE room_key IN ({placeholders})',
+                    [_room_key(room_id) for room_id in room_ids],
+                )
+                cursor.execute(f'{insert} WHERE room_id IN ({placeholders})', list(room_ids))
+    elif connection.vendor == 'postgresql' and room_ids is None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {PG_INDEX}')
+    return chats.count()
+
+
+# =========================
+# 查詢
+# =========================
+def _sqlite_ids(room_id, terms, limit, offset):
+    indexed = [t for t in terms if len(t) >= TRIGRAM]
+    short = [t for t in terms if len(t) < TRIGRAM]
+
+    match = f'room_key : {_phrase(_room_key(room_id))}'
+    for term in indexed:
+        match += f' AND {{title content}} : {_phrase(term)}'
+    sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    params = [match]
+    for term in short:
+        sql += " AND (title LIKE %s ESCAPE '\\' OR content LIKE %s ESCAPE '\\')"
+        params += [_like(term), _like(term)]
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    sql += f' ORDER BY bm25({FTS_TABLE}, {weights}), rowid DESC LIMIT %s OFFSET %s'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _postgres_ids(room_id, terms, limit, offset):
+    sql = (
+        f'SELECT id FROM chats_chat, plainto_tsquery(%s::regconfig, %s) query '
+        f'WHERE room_id = %s AND {PG_VECTOR} @@ query '
+        f'ORDER BY ts_rank({PG_VECTOR}, query) DESC, id DESC LIMIT %s OFFSET %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, ['simple', ' '.join(terms), room_id, limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_ids(room_id, terms, limit, offset):
+    queryset = Chat.objects.filter(room_id=room_id)
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(content__icontains=term))
+    return list(queryset.order_by('-created_at', '-id').values_list('id', flat=True)[offset:offset + limit])
+
+
+def search_ids(room, query, limit=PAGE_SIZE, offset=0):
+    """依相關度排序的 Chat id"""
+    terms = query.split()
+    if not terms:
+        return []
+    if connection.vendor == 'sqlite':
+        return _sqlite_ids(room.id, terms, limit, offset)
+    if connection.vendor == 'postgresql':
+        return _postgres_ids(room.id, terms, limit, offset)
+    return _fallback_ids(room.id, terms, limit, offset)
+
+
+def search(room, query, page=1, page_size=PAGE_SIZE):
+    """回傳 SearchPage；results 為 Chat (留言附帶 parent 以便連到文章)"""
+    ids = search_ids(room, query, limit=page_size + 1, offset=(page - 1) * page_size)
+    chats = Chat.objects.select_related('author', 'parent').in_bulk(ids[:page_size])
+    return SearchPage([chats[i] for i in ids[:page_size] if i in chats], page, len(ids) > page_size)
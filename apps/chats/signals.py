@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.rooms.models import Room
+from .models import Chat, UnreadCounter
+from .search import index_chat, remove_chat
+from .unread import create_counters, record_chat
+
+
+# ===============================================
+# 全文搜尋索引同步 (SQLite FTS5；PostgreSQL 由 GIN 運算式索引自動維護)
+# ===============================================
+
+@receiver(post_save, sender=Chat)
+def index_chat_for_search(sender, instance, **kwargs):
+    index_chat(instance)
+
+
+@receiver(post_delete, sender=Chat)
+def remove_chat_from_search(sender, instance, **kwargs):
+    remove_chat(instance.pk)
+
+
+# ===============================================
+# 留言串：parent 不做 CASCADE (見 apps.chats.threads)
+# ===============================================
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def delete_authored_threads(sender, instance, **kwargs):
+    # 刪除使用者時，他的文章 / 留言底下別人的回覆也要一起刪除，否則 parent 會指向不存在的列
+    Chat.objects.filter(author=instance).delete()
+
+
+# ===============================================
+# 未讀計數 (見 apps.chats.unread)
+# ===============================================
+
+@receiver(post_save, sender=Chat)
+def count_unread_chat(sender, instance, created, **kwargs):
+    if created:
+        record_chat(instance)
+
+
+@receiver(m2m_changed, sender=Room.members.through)
+def sync_unread_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    room_ids, user_ids = (pk_set, [instance.pk]) if reverse else ([instance.pk], pk_set)
+    if action == 'post_add':
+        create_counters(room_ids, user_ids)
+    else:
+        UnreadCounter.objects.filter(room_id__in=room_ids, user_id__in=user_ids).delete()
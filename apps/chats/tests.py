@@ -1,3 +1,371 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.tests.builders import build_room
+
+from apps.rooms.models import Room
+
+from .managers import decode_cursor
+from .models import Chat, ReadMarker, UnreadCounter
+from .search import search, search_ids
+from .threads import MAX_DEPTH
+
+
+class ArticleFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = build_room(chores=1, articles=45, replies_per_article=0)
+        cls.room = cls.fixture.room
+        # 每三篇共用同一個時間，分頁邊界必須靠 id 區分
+        now = timezone.now()
+        for k, article in enumerate(cls.fixture.articles):
+            Chat.objects.filter(pk=article.pk).update(created_at=now - timedelta(minutes=k // 3))
+        first = cls.fixture.articles[0]
+        for minutes in (5, 1):
+            reply = Chat.objects.create(room=cls.room, author=cls.fixture.owner, content='reply',
+                                        is_article=False, parent=first)
+            Chat.objects.filter(pk=reply.pk).update(created_at=now + timedelta(minutes=minutes))
+        cls.last_reply_at = now + timedelta(minutes=5)
+
+    def setUp(self):
+        self.client.force_login(self.fixture.owner)
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def test_pages_cover_feed_in_order(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = Chat.objects.article_feed(self.room, cursor=cursor, limit=10)
+            seen.extend(page)
+            if cursor is None:
+                break
+        expected = list(
+            Chat.objects.filter(room=self.room, is_article=True).order_by('-created_at', '-id')
+        )
+        self.assertEqual([a.pk for a in seen], [a.pk for a in expected])
+
+    def test_annotations_replace_prefetch(self):
+        with self.assertNumQueries(1):
+            page, cursor = Chat.objects.article_feed(self.room, limit=5)
+            counts = {a.pk: (a.reply_count, a.last_reply_at, a.author.username) for a in page}
+        self.assertIn('content', page[0].get_deferred_fields())
+        self.assertEqual(page[0].excerpt, 'hello')
+        first = self.fixture.articles[0]
+        self.assertEqual(counts[first.pk][0], 2)
+        self.assertEqual(counts[first.pk][1], self.last_reply_at)
+        self.assertEqual(decode_cursor(cursor)[1], page[-1].pk)
+
+    def test_list_view_pages(self):
+        response = self.client.get('/chats/')
+        self.assertEqual(response.status_code, 200)
+        articles = response.context['articles']
+        self.assertEqual(len(articles), Chat.objects.FEED_PAGE_SIZE)
+        next_cursor = response.context['next_cursor']
+        self.assertContains(response, f'?cursor={next_cursor}')
+
+        with self.assertNumQueries(5):  # session + user + 版本號 + 未讀計數 + 一頁文章
+            response = self.client.get('/chats/', {'cursor': next_cursor})
+        self.assertTrue(set(a.pk for a in articles).isdisjoint(a.pk for a in response.context['articles']))
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/chats/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+
+class CommentPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = build_room(chores=1, articles=2, replies_per_article=45)
+        cls.article = cls.fixture.articles[0]
+        # 每五則共用同一個時間
+        now = timezone.now()
+        for k, reply in enumerate(Chat.objects.filter(parent=cls.article).order_by('id')):
+            Chat.objects.filter(pk=reply.pk).update(created_at=now + timedelta(minutes=k // 5))
+
+    def setUp(self):
+        self.client.force_login(self.fixture.owner)
+        session = self.client.session
+        session['current_room_id'] = self.fixture.room.id
+        session.save()
+
+    def test_detail_renders_first_page(self):
+        response = self.client.get(f'/chats/{self.article.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['comments']), Chat.objects.COMMENT_PAGE_SIZE)
+        self.assertEqual(response.context['comment_count'], 45)
+        self.assertContains(response, 'load-more-comments')
+
+    def test_json_pages_cover_thread(self):
+        url = f'/chats/{self.article.id}/comments/'
+        seen, cursor = [], None
+        while True:
+            data = self.client.get(url, {'cursor': cursor} if cursor else {}).json()
+            seen.extend(comment['id'] for comment in data['comments'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        expected = Chat.objects.filter(parent=self.article).order_by('created_at', 'id')
+        self.assertEqual(seen, list(expected.values_list('id', flat=True)))
+
+    def test_errors(self):
+        url = f'/chats/{self.article.id}/comments/'
+        self.assertEqual(self.client.get(url, {'cursor': '!!'}).status_code, 400)
+        other = build_room(chores=1, articles=1)
+        self.assertEqual(self.client.get(f'/chats/{other.articles[0].id}/comments/').status_code, 404)
+
+
+class ChatSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = build_room(chores=1, articles=0)
+        cls.other = build_room(chores=1, articles=0)
+        cls.author = cls.fixture.owner
+        cls.in_title = cls.post(cls.fixture.room, title='倒垃圾輪值', content='本週改由我負責')
+        cls.in_content = cls.post(cls.fixture.room, title='公告', content='記得星期三晚上倒垃圾輪值')
+        cls.unrelated = cls.post(cls.fixture.room, title='冰箱', content='請清理過期食物')
+        cls.other_room = cls.post(cls.other.room, title='倒垃圾輪值', content='別的房間', author=cls.other.owner)
+
+    @classmethod
+    def post(cls, room, title, content, author=None):
+        return Chat.objects.create(room=room, author=author or cls.author, title=title,
+                                   content=content, is_article=True)
+
+    def ids(self, query):
+        return search_ids(self.fixture.room, query)
+
+    def test_ranked_and_room_scoped(self):
+        self.assertEqual(self.ids('垃圾輪值'), [self.in_title.id, self.in_content.id])
+        self.assertEqual(self.ids('星期三 垃圾'), [self.in_content.id])
+        # 少於 3 個字的關鍵字也找得到
+        self.assertEqual(self.ids('冰箱'), [self.unrelated.id])
+        self.assertEqual(self.ids('   '), [])
+
+    def test_index_follows_save_and_delete(self):
+        reply = Chat.objects.create(room=self.fixture.room, author=self.author, content='洗衣機壞了',
+                                    is_article=False, parent=self.unrelated)
+        self.assertEqual(self.ids('洗衣機'), [reply.id])
+        reply.content = '已經修好了'
+        reply.save()
+        self.assertEqual(self.ids('洗衣機'), [])
+        self.unrelated.delete()
+        self.assertEqual(self.ids('已經修好'), [])
+        self.assertEqual(self.ids('冰箱'), [])
+
+    def test_rebuild_after_bulk_create(self):
+        Chat.objects.bulk_create([
+            Chat(room=self.fixture.room, author=self.author, title=f'大掃除 {k}', content='週末', is_article=True)
+            for k in range(25)
+        ])
+        self.assertEqual(self.ids('大掃除'), [])
+        call_command('rebuild_chat_search', str(self.fixture.room.id), stdout=StringIO())
+        page = search(self.fixture.room, '大掃除')
+        self.assertEqual((len(page.results), page.has_next), (20, True))
+        page = search(self.fixture.room, '大掃除', page=2)
+        self.assertEqual((len(page.results), page.has_next), (5, False))
+        self.assertEqual(search_ids(self.other.room, '倒垃圾'), [self.other_room.id])
+
+    def test_search_view(self):
+        self.client.force_login(self.author)
+        session = self.client.session
+        session['current_room_id'] = self.fixture.room.id
+        session.save()
+        response = self.client.get('/chats/search/', {'q': '垃圾輪值'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['results']), [self.in_title, self.in_content])
+        self.assertNotContains(response, '別的房間')
+        self.assertEqual(self.client.get('/chats/search/', {'q': '垃圾', 'page': 'x'}).status_code, 404)
+
+
+class ThreadIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = build_room(chores=1, articles=2, replies_per_article=0)
+        cls.room = cls.fixture.room
+        cls.article, cls.other_article = cls.fixture.articles
+        cls.a = cls.reply(cls.article)
+        cls.a1 = cls.reply(cls.a)
+        cls.a1x = cls.reply(cls.a1)
+        cls.b = cls.reply(cls.article)
+        cls.a2 = cls.reply(cls.a)
+        cls.kept = cls.reply(cls.other_article)
+
+    @classmethod
+    def reply(cls, parent, author=None):
+        return Chat.objects.create(room=cls.room, author=author or cls.fixture.owner, content=f're {parent.pk}',
+                                   is_article=False, parent=parent)
+
+    def setUp(self):
+        self.client.force_login(self.fixture.owner)
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def test_thread_in_depth_first_order(self):
+        with self.assertNumQueries(1):
+            thread = list(Chat.objects.thread_queryset(self.article))
+        self.assertEqual(thread, [self.a, self.a1, self.a1x, self.a2, self.b])
+        self.assertEqual([c.depth for c in thread], [1, 2, 3, 2, 1])
+        self.assertEqual(list(Chat.objects.thread_queryset(self.article, max_depth=1)), [self.a, self.b])
+        self.assertEqual(list(Chat.objects.thread_queryset(self.a)), [self.a1, self.a1x, self.a2])
+
+    def test_rebuild_matches_save(self):
+        expected = dict(Chat.objects.values_list('id', 'thread_path'))
+        Chat.objects.update(thread_path='', depth=0)
+        call_command('rebuild_chat_threads', str(self.room.id), stdout=StringIO())
+        self.assertEqual(dict(Chat.objects.values_list('id', 'thread_path')), expected)
+
+    def test_delete_subtree_is_set_based(self):
+        version = Room.objects.get(pk=self.room.pk).version
+        # 路徑 + 搜尋索引 + 未讀數 (內容、計數器、閱讀紀錄、扣除) + 閱讀紀錄 + 刪除 + 房間版本號
+        # (加上 savepoint)，不隨巢狀層數或留言數增加
+        with self.assertNumQueries(11):
+            self.article.delete()
+        self.assertFalse(Chat.objects.filter(pk__in=[self.a.pk, self.a1x.pk, self.b.pk]).exists())
+        self.assertEqual(Chat.objects.filter(pk__in=[self.other_article.pk, self.kept.pk]).count(), 2)
+        self.assertEqual(search_ids(self.room, f're {self.a1.pk}'), [])
+        self.assertEqual(Room.objects.get(pk=self.room.pk).version, version + 1)
+
+        Chat.objects.filter(pk=self.kept.pk).delete()
+        self.assertEqual(list(Chat.objects.filter(room=self.room)), [self.other_article])
+
+    def test_deleting_author_removes_replies_below(self):
+        guest = get_user_model().objects.create_user(username='guest', password='pw')
+        self.room.members.add(guest)
+        post = self.reply(self.b, author=guest)
+        below = self.reply(post)
+        guest.delete()
+        self.assertFalse(Chat.objects.filter(pk__in=[post.pk, below.pk]).exists())
+        self.assertTrue(Chat.objects.filter(pk=self.b.pk).exists())
+
+    def test_reply_to_comment(self):
+        url = f'/chats/{self.article.id}/reply/'
+        self.assertEqual(self.client.post(url, {'content': 'nested', 'parent': self.a1x.id}).status_code, 302)
+        created = Chat.objects.latest('id')
+        self.assertEqual((created.parent_id, created.depth), (self.a1x.id, 4))
+        # 別篇文章的留言不能當作 parent
+        self.assertEqual(self.client.post(url, {'content': 'x', 'parent': self.kept.id}).status_code, 404)
+        self.assertEqual(self.client.post(url, {'content': 'x', 'parent': 'abc'}).status_code, 400)
+
+        Chat.objects.filter(pk=created.pk).update(depth=MAX_DEPTH)
+        self.assertEqual(self.client.post(url, {'content': 'x', 'parent': created.id}).status_code, 400)
+
+    def test_comments_api_subtree(self):
+        url = f'/chats/{self.article.id}/comments/'
+        data = self.client.get(url, {'root': self.a.id}).json()
+        self.assertEqual([c['id'] for c in data['comments']], [self.a1.id, self.a1x.id, self.a2.id])
+        self.assertEqual(data['comments'][0]['parent_id'], self.a.id)
+        self.assertEqual(self.client.get(url, {'root': self.kept.id}).status_code, 404)
+
+
+class UnreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = build_room(chores=1, members=2, articles=1, replies_per_article=1)
+        cls.room = cls.fixture.room
+        cls.reader, cls.writer = cls.fixture.users
+
+    def login(self, user):
+        self.client.force_login(user)
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def count(self, user):
+        return UnreadCounter.objects.get(room=self.room, user=user).count
+
+    def test_counters_follow_posts_and_reads(self):
+        # 建好房間之前的內容都算已讀
+        self.assertEqual(self.count(self.reader), 0)
+        self.login(self.writer)
+        self.client.post('/chats/new/', {'title': '停水通知', 'content': '明天早上停水'})
+        article = Chat.objects.get(title='停水通知')
+        self.client.post(f'/chats/{article.id}/reply/', {'content': '記得儲水'})
+        self.assertEqual((self.count(self.reader), self.count(self.writer)), (2, 0))
+
+        self.login(self.reader)
+        response = self.client.get('/chats/')
+        self.assertEqual(response.context['unread_chat_count'], 2)
+        flags = {a.pk: a.is_unread for a in response.context['articles']}
+        self.assertEqual(flags, {article.pk: True, self.fixture.articles[0].pk: False})
+
+        self.client.get(f'/chats/{article.id}/')
+        self.assertEqual(self.count(self.reader), 0)
+        # 沒有新內容：只有一次 COUNT，不寫入
+        with self.assertNumQueries(6):
+            self.client.get(f'/chats/{article.id}/')
+
+        comment = Chat.objects.filter(parent=article).get()
+        self.login(self.writer)
+        self.client.post(f'/chats/{article.id}/reply/', {'content': '已儲水', 'parent': comment.id})
+        self.login(self.reader)
+        self.assertEqual(self.count(self.reader), 1)
+        # 第二層的回覆也會讓文章標為未讀
+        self.assertTrue(self.client.get('/chats/').context['articles'][0].is_unread)
+        self.client.get(f'/chats/{article.id}/')
+        self.assertEqual(self.count(self.reader), 0)
+        self.assertEqual(ReadMarker.objects.get(user=self.reader, article=article).read_at,
+                         Chat.objects.latest('id').created_at)
+
+    def test_reading_changes_etag(self):
+        self.login(self.writer)
+        self.client.post('/chats/new/', {'title': '停水通知', 'content': '明天早上停水'})
+        article = Chat.objects.get(title='停水通知')
+
+        self.login(self.reader)
+        first = self.client.get('/chats/')
+        self.assertTrue(first.context['articles'][0].is_unread)
+        self.assertEqual(self.client.get('/chats/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        # 閱讀不會改變房間版本號，但未讀數與標記變了：不能回 304
+        self.client.get(f'/chats/{article.id}/')
+        response = self.client.get('/chats/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['unread_chat_count'], 0)
+        self.assertFalse(response.context['articles'][0].is_unread)
+
+    def test_deleting_unread_content_discounts_counters(self):
+        self.login(self.writer)
+        self.client.post('/chats/new/', {'title': '停水通知', 'content': '明天早上停水'})
+        article = Chat.objects.get(title='停水通知')
+        self.client.post(f'/chats/{article.id}/reply/', {'content': '記得儲水'})
+        old_article = self.fixture.articles[0]
+        self.client.post(f'/chats/{old_article.id}/reply/', {'content': '補充'})
+        self.assertEqual(self.count(self.reader), 3)
+
+        # 讀過的內容不會再扣一次
+        self.login(self.reader)
+        self.client.get(f'/chats/{old_article.id}/')
+        self.assertEqual(self.count(self.reader), 2)
+        Chat.objects.filter(parent=old_article, content='補充').delete()
+        self.assertEqual(self.count(self.reader), 2)
+
+        article.delete()
+        self.assertEqual((self.count(self.reader), self.count(self.writer)), (0, 0))
+        expected = dict(UnreadCounter.objects.values_list('user_id', 'count'))
+        call_command('rebuild_unread_counters', str(self.room.id), stdout=StringIO())
+        self.assertEqual(dict(UnreadCounter.objects.values_list('user_id', 'count')), expected)
+
+    def test_badge_on_base_pages(self):
+        UnreadCounter.objects.filter(room=self.room, user=self.reader).update(count=3)
+        self.login(self.reader)
+        response = self.client.get('/members/')
+        self.assertContains(response, '留言板')
+        self.assertEqual(response.context['unread_chat_count'], 3)
+
+    def test_membership_and_rebuild(self):
+        newcomer = get_user_model().objects.create_user(username='newcomer', password='pw')
+        self.room.members.add(newcomer)
+        self.assertEqual(self.count(newcomer), 0)
+        Chat.objects.create(room=self.room, author=self.writer, title='new', content='x', is_article=True)
+        self.assertEqual(self.count(newcomer), 1)
+        self.room.members.remove(newcomer)
+        self.assertFalse(UnreadCounter.objects.filter(user=newcomer).exists())
 
-# Create your tests here.
+        expected = dict(UnreadCounter.objects.values_list('user_id', 'count'))
+        UnreadCounter.objects.update(count=99)
+        call_command('rebuild_unread_counters', str(self.room.id), stdout=StringIO())
+        self.assertEqual(dict(UnreadCounter.objects.values_list('user_id', 'count')), expected)
@@ -0,0 +1,155 @@
+"""
+留言串索引 (materialized path)
+
+每則 Chat 的 thread_path 是從文章到自己的 id 串接而成，每段固定 SEGMENT_WIDTH 位數
+(左補 0)，depth 為層數 (文章 = 0)。例如文章 12 底下的留言 40、再回覆 41：
+
+    0000000012 / 00000000120000000040 / 000000001200000000400000000041
+
+- 子樹 = thread_path 以某路徑開頭的所有列，只含數字，可以寫成範圍條件
+  [path, path + 1)，在 thread_path 索引上一次讀完，不論巢狀多深
+- 依 thread_path 排序即為「深度優先、同層依建立順序」的留言串顯示順序
+- 新增時由 Chat.save 設定 (需要自己的 id，插入後多一個 UPDATE)；
+  bulk_create 不會設定，之後請執行 rebuild_chat_threads
+- 刪除整串改用集合操作 (delete_threads)，不再由 Collector 逐層查詢子留言
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import CharField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+SEGMENT_WIDTH = 10
+# thread_path 欄位長度 (250) 能容納的最深層數
+MAX_DEPTH = 24
+# delete_threads 一次 OR 多少個子樹範圍
+DELETE_BATCH = 500
+
+
+def segment(chat_id):
+    return str(chat_id).zfill(SEGMENT_WIDTH)
+
+
+def child_path(parent, chat_id):
+    """新留言的 (thread_path, depth)；parent 為 None 時是文章"""
+    if parent is None:
+        return segment(chat_id), 0
+    return parent.thread_path + segment(chat_id), parent.depth + 1
+
+
+def root_id(path):
+    """路徑所屬文章的 id"""
+    return int(path[:SEGMENT_WIDTH])
+
+
+def subtree_q(path, include_self=True):
+    """thread_path 以 path 開頭的條件 (範圍查詢，可使用索引)"""
+    upper = str(int(path) + 1).zfill(len(path))
+    q = Q(thread_path__gte=path) if include_self else Q(thread_path__gt=path)
+    # path 全是 9 時沒有上界：比它大的路徑一定以它開頭
+    if len(upper) == len(path):
+        q &= Q(thread_path__lt=upper)
+    return q
+
+
+def _outermost(paths):
+    """去掉已被其他路徑涵蓋的子路徑 (paths 需已排序)"""
+    roots = []
+    for path in paths:
+        if not roots or not path.startswith(roots[-1]):
+            roots.append(path)
+    return roots
+
+
+# =========================
+# 重建
+# =========================
+def rebuild(room_ids=None):
+    """
+    從 parent 重建 thread_path / depth 與文章的 last_activity_at (room_ids 為 None 時重建全部)，
+    回傳處理的列數。路徑每一層一個 UPDATE，查詢數只跟最深層數有關。
+    """
+    from .models import Chat
+
+    chats = Chat.objects.all()
+    if room_ids is not None:
+        chats = chats.filter(room_id__in=room_ids)
+    own_segment = LPad(Cast('id', CharField()), SEGMENT_WIDTH, Value('0'))
+
+    with transaction.atomic():
+        chats.update(thread_path='', depth=0)
+        total = chats.filter(parent__isnull=True).update(thread_path=own_segment, depth=0)
+        parents = Chat.objects.filter(pk=OuterRef('parent_id'))
+        depth = 0
+        while True:
+            depth += 1
+            updated = chats.filter(
+                thread_path='', parent__depth=depth - 1, parent__thread_path__gt=''
+            ).update(
+                thread_path=Concat(Subquery(parents.values('thread_path')), own_segment),
+                depth=depth,
+            )
+            if not updated:
+                break
+            total += updated
+        _fill_last_activity(chats)
+    return total
+
+
+def _fill_last_activity(chats):
+    """依路徑重算文章的 last_activity_at (整串最新一則的建立時間)"""
+    from .models import Chat
+
+    latest = {}
+    for thread_path, created_at in chats.values_list('thread_path', 'created_at').iterator(chunk_size=5000):
+        article_id = root_id(thread_path)
+        if article_id not in latest or created_at > latest[article_id]:
+            latest[article_id] = created_at
+    Chat.objects.bulk_update(
+        [Chat(pk=article_id, last_activity_at=at) for article_id, at in latest.items()],
+        ['last_activity_at'], batch_size=1000,
+    )
+
+
+# =========================
+# 刪除
+# =========================
+def delete_threads(chats):
+    """
+    刪除 chats 與其所有子孫留言，回傳刪除的列數。
+
+    以 thread_path 範圍一次刪除整個子樹 (不載入物件、不逐層查詢)，
+    因為略過了 signals 與 Collector，全文搜尋索引、閱讀紀錄、成員的未讀數
+    與房間版本號在這裡一併處理。
+    """
+    from apps.rooms.models import Room
+    from apps.rooms.realtime import publish_room_event
+    from .models import Chat, ReadMarker
+    from .search import remove_chats
+    from .unread import discount
+
+    targets = list(chats.order_by().values_list('thread_path', 'room_id'))
+    if not targets:
+        return 0
+    room_ids = sorted({room_id for _, room_id in targets})
+    if any(not path for path, _ in targets):
+        # bulk_create 後尚未重建的列：先補上路徑，否則無法找到子孫
+        rebuild(room_ids)
+        targets = list(chats.order_by().values_list('thread_path', 'room_id'))
+
+    roots = _outermost(sorted(path for path, _ in targets))
+    deleted = 0
+    with transaction.atomic():
+        for start in range(0, len(roots), DELETE_BATCH):
+            subtree = Chat.objects.filter(reduce(or_, map(subtree_q, roots[start:start + DELETE_BATCH])))
+            remove_chats(subtree)
+            # 要在刪除閱讀紀錄之前：需要它判斷每位成員讀過哪些內容
+            discount(subtree)
+            ReadMarker.objects.filter(article__in=subtree).delete()
+            # 整個子樹在同一個 DELETE 中刪除，parent 外鍵不會懸空
+            deleted += subtree._raw_delete(subtree.db)
+        Room.bump_version(id__in=room_ids)
+        for room_id in room_ids:
+            publish_room_event(room_id, 'room.changed')
+    return deleted
@@ -0,0 +1,185 @@
+"""
+留言板未讀追蹤
+
+- ReadMarker：成員讀到某篇文章 (含其整串留言) 的時間
+- UnreadCounter：成員在房間內的未讀數 (文章 + 留言，不含自己發的)，以及起算時間 since
+  (加入房間之前的內容都算已讀)
+
+未讀數以增量維護，頁面只讀一列 UnreadCounter：
+- 新文章 / 留言建立時 (apps.chats.signals)：同房間其他成員的計數器一個 UPDATE +1
+- 開啟文章詳情時 (mark_read)：一次 COUNT 算出這篇文章串裡還沒讀的數量並扣掉
+- 刪除文章 / 留言時 (threads.delete_threads)：刪除前扣掉各成員在被刪內容中還沒讀的數量
+
+bulk_create 不會調整計數器，之後可執行 rebuild_unread_counters 重算。
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, F, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from .threads import root_id, subtree_q
+
+REQUEST_CACHE = '_chat_unread_counter'
+
+
+def get_counter(request):
+    """目前使用者在 request.room 的 UnreadCounter (同一個請求只查一次)；沒有房間時為 None"""
+    if not hasattr(request, REQUEST_CACHE):
+        from .models import UnreadCounter
+
+        counter = None
+        room = getattr(request, 'room', None)
+        if room is not None:
+            counter = UnreadCounter.objects.filter(room_id=room.id, user_id=request.user.pk).first()
+            if counter is None:
+                # 加入房間時沒有建立 (例如 bulk_create 的成員)：從現在開始計算
+                counter, _ = UnreadCounter.objects.get_or_create(room_id=room.id, user_id=request.user.pk)
+        setattr(request, REQUEST_CACHE, counter)
+    return getattr(request, REQUEST_CACHE)
+
+
+def unread_count(request):
+    counter = get_counter(request)
+    return counter.count if counter else 0
+
+
+def create_counters(room_ids, user_ids):
+    """成員加入房間時建立計數器 (已存在的不變)"""
+    from .models import UnreadCounter
+
+    UnreadCounter.objects.bulk_create([
+        UnreadCounter(room_id=room_id, user_id=user_id)
+        for room_id in room_ids for user_id in user_ids
+    ], ignore_conflicts=True)
+
+
+def record_chat(chat):
+    """新文章 / 留言：同房間其他成員的未讀數 +1"""
+    from .models import UnreadCounter
+
+    UnreadCounter.objects.filter(room_id=chat.room_id).exclude(user_id=chat.author_id).update(
+        count=F('count') + 1
+    )
+
+
+def _read_horizon(user, article, counter):
+    """這篇文章在此時間之後的內容算未讀 (沒有閱讀紀錄時為計數器的 since)"""
+    from .models import ReadMarker
+
+    marker = ReadMarker.objects.filter(user=user, article=article).values('read_at')
+    return Coalesce(Subquery(marker), Value(counter.since), output_field=DateTimeField())
+
+
+def mark_read(user, article, counter):
+    """
+    把文章 (含整串留言) 標為已讀，回傳這次扣掉的未讀數。
+    沒有新內容時只有一個 COUNT 查詢，不寫入。
+    """
+    from .models import Chat, ReadMarker, UnreadCounter
+
+    new = (
+        Chat.objects.filter(subtree_q(article.thread_path), created_at__gt=_read_horizon(user, article, counter))
+        .aggregate(unread=Count('id', filter=~Q(author=user)), last=Max('created_at'))
+    )
+    if new['last'] is None:
+        return 0
+    with transaction.atomic():
+        if new['unread']:
+            UnreadCounter.objects.filter(pk=counter.pk).update(count=Greatest(F('count') - new['unread'], 0))
+        # 讀到最後一則已計算的內容為止 (自己的留言也算)，這之後才寫入的留言仍算未讀
+        ReadMarker.objects.bulk_create(
+            [ReadMarker(user=user, article=article, read_at=new['last'])],
+            update_conflicts=True, unique_fields=['user', 'article'], update_fields=['read_at'],
+        )
+    counter.count = max(counter.count - new['unread'], 0)
+    return new['unread']
+
+
+def annotate_read_at(queryset, user):
+    """文章列表附上 read_at (此成員的閱讀紀錄，沒有時為 None)"""
+    from .models import ReadMarker
+
+    return queryset.annotate(read_at=Subquery(
+        ReadMarker.objects.filter(user=user, article=OuterRef('pk')).values('read_at')
+    ))
+
+
+def is_unread(article, counter):
+    """整串最新一則比閱讀紀錄新 (需要 annotate_read_at)"""
+    last_activity = article.last_activity_at or article.created_at
+    return last_activity > (article.read_at or counter.since)
+
+
+def _count_unread(counters, markers, chats):
+    """
+    chats 為 (room_id, author_id, thread_path, created_at) 的可迭代物件，
+    markers 為 {(user_id, article_id): read_at}；回傳 Counter({計數器 pk: 未讀數})
+    """
+    by_room = {}
+    for counter in counters:
+        by_room.setdefault(counter.room_id, []).append(counter)
+
+    counts = Counter()
+    for room_id, author_id, thread_path, created_at in chats:
+        article_id = root_id(thread_path)
+        for counter in by_room.get(room_id, ()):
+            if counter.user_id == author_id:
+                continue
+            if created_at > markers.get((counter.user_id, article_id), counter.since):
+                counts[counter.pk] += 1
+    return counts
+
+
+def discount(chats):
+    """
+    刪除 chats 之前呼叫 (delete_threads)：各成員的未讀數扣掉其中還沒讀的內容。
+    chats 需已有 thread_path；以 F 運算式扣除，不會覆蓋同時進行的 +1。
+    """
+    from .models import ReadMarker, UnreadCounter
+
+    rows = list(chats.order_by().values_list('room_id', 'author_id', 'thread_path', 'created_at'))
+    if not rows:
+        return
+    counters = UnreadCounter.objects.filter(room_id__in={row[0] for row in rows}, count__gt=0)
+    markers = dict(
+        ((user_id, article_id), read_at)
+        for user_id, article_id, read_at in ReadMarker.objects.filter(
+            article_id__in={root_id(row[2]) for row in rows}
+        ).values_list('user_id', 'article_id', 'read_at')
+    )
+    counts = _count_unread(counters, markers, rows)
+    if counts:
+        unread = Case(*(When(pk=pk, then=Value(n)) for pk, n in counts.items()), default=Value(0))
+        UnreadCounter.objects.filter(pk__in=counts).update(count=Greatest(F('count') - unread, 0))
+
+
+# =========================
+# 重算
+# =========================
+def rebuild(room_ids=None):
+    """依閱讀紀錄重算計數器 (room_ids 為 None 時重算全部)，回傳計數器數量"""
+    from .models import Chat, ReadMarker, UnreadCounter
+    from .threads import rebuild as rebuild_threads
+
+    counters = UnreadCounter.objects.all()
+    if room_ids is not None:
+        counters = counters.filter(room_id__in=room_ids)
+    counters = list(counters)
+    rooms = {c.room_id for c in counters}
+    markers = dict(
+        ((user_id, article_id), read_at)
+        for user_id, article_id, read_at in ReadMarker.objects.filter(
+            article__room_id__in=rooms
+        ).values_list('user_id', 'article_id', 'read_at')
+    )
+    if Chat.objects.filter(room_id__in=rooms, thread_path='').exists():
+        # 依 thread_path 找出每則留言所屬的文章
+        rebuild_threads(sorted(rooms))
+
+    chats = Chat.objects.filter(room_id__in=rooms).values_list('room_id', 'author_id', 'thread_path', 'created_at')
+    counts = _count_unread(counters, markers, chats.iterator(chunk_size=5000))
+    for counter in counters:
+        counter.count = counts[counter.pk]
+    UnreadCounter.objects.bulk_update(counters, ['count'], batch_size=1000)
+    return len(counters)
@@ -7,10 +7,12 @@ urlpatterns = [
     # 列表與新增文章
     path('', views.ChatListView.as_view(), name='list'), # ***View 名稱變更***
     path('new/', views.ArticleCreateView.as_view(), name='create'),
+    path('search/', views.ChatSearchView.as_view(), name='search'),
     path('<int:pk>/update/', views.ArticleUpdateView.as_view(), name='update'),
     path('<int:pk>/delete/', views.ArticleDeleteView.as_view(),name='delete'),
     # 文章詳情與留言發布 (F-5.4)
     path('<int:pk>/', views.ChatDetailView.as_view(), name='detail'), # ***View 名稱變更***
     path('<int:pk>/reply/', views.ReplyCreateView.as_view(), name='reply'),
+    path('<int:pk>/comments/', views.ChatCommentsView.as_view(), name='comments'),
     # 編輯/刪除 (F-5.3) - 待實作
 ]
\ No newline at end of file
@@ -4,43 +4,80 @@ from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy, reverse
 from django.shortcuts import redirect, get_object_or_404
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.utils import timezone
+from django.views import View
 
 from .models import Chat # ***模型名稱變更為 Chat***
 from .forms import ArticleForm, ReplyForm # 確保已導入
-from apps.rooms.models import Room 
+from .search import search
+from .threads import subtree_q
+from .unread import get_counter, is_unread, mark_read
+from django.utils.decorators import method_decorator
+from apps.rooms.conditional import room_conditional
+from apps.rooms.realtime import publish_room_event
 
 
-# 定義輔助函數
-def get_current_room(request):
-    """輔助函數：獲取當前用戶和房號。"""
-    current_room_id = request.session.get('current_room_id') 
-    try:
-        # 這裡假設 Room 模型有一個 members 欄位/關係
-        room = Room.objects.get(id=current_room_id, members=request.user) 
-        return room
-    except (Room.DoesNotExist, TypeError):
-        return None
 
+@method_decorator(room_conditional, name='dispatch')
 class ChatListView(LoginRequiredMixin, ListView): # ***類別名稱變更為 ChatListView***
     model = Chat # ***使用 Chat 模型***
     template_name = 'chats/chat_list.html' # ***模板路徑變更***
     context_object_name = 'articles'
     
     def get_queryset(self):
-        self.room = get_current_room(self.request)
+        self.room = self.request.room
+        self.next_cursor = None
         if not self.room:
             return Chat.objects.none()
-        # F-5.2: 僅顯示文章 (is_article=True)
-        return Chat.objects.filter(room=self.room, is_article=True).select_related('author').prefetch_related('replies').order_by('-created_at')
+        # F-5.2: 僅顯示文章 (is_article=True)，以 ?cursor= 做 keyset 分頁
+        try:
+            articles, self.next_cursor = Chat.objects.article_feed(
+                self.room, cursor=self.request.GET.get('cursor'), reader=self.request.user
+            )
+        except ValueError:
+            raise Http404('無效的分頁位置')
+        # 有新內容的文章標上「未讀」
+        counter = get_counter(self.request)
+        for article in articles:
+            article.is_unread = is_unread(article, counter)
+        return articles
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['room'] = self.room
+        context['next_cursor'] = self.next_cursor
+        context['is_first_page'] = not self.request.GET.get('cursor')
         if not self.room:
             context['no_room_assigned'] = True
         return context
     
     # ... (get_context_data 保持不變)
 
+class ChatSearchView(LoginRequiredMixin, ListView):
+    """留言板全文搜尋 (?q=關鍵字&page=頁碼)，依相關度排序"""
+    template_name = 'chats/chat_search.html'
+    context_object_name = 'results'
+
+    def get_queryset(self):
+        self.room = self.request.room
+        self.query = self.request.GET.get('q', '').strip()
+        try:
+            page = max(int(self.request.GET.get('page', 1)), 1)
+        except ValueError:
+            raise Http404('無效的頁碼')
+        self.search_page = search(self.room, self.query, page) if self.room and self.query else None
+        return self.search_page.results if self.search_page else []
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['room'] = self.room
+        context['query'] = self.query
+        context['search_page'] = self.search_page
+        if not self.room:
+            context['no_room_assigned'] = True
+        return context
+
 class ArticleCreateView(LoginRequiredMixin, CreateView):
     model = Chat # ***使用 Chat 模型***
     form_class = ArticleForm
@@ -50,7 +87,7 @@ class ArticleCreateView(LoginRequiredMixin, CreateView):
         return reverse('chats:detail', kwargs={'pk': self.object.pk})
 
     def form_valid(self, form):
-        self.room = get_current_room(self.request)
+        self.room = self.request.room
         if not self.room:
             # 如果用戶沒有房間，阻止創建
             form.add_error(None, "您尚未加入房號，無法發布文章。")
@@ -63,7 +100,7 @@ class ArticleCreateView(LoginRequiredMixin, CreateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['room'] = get_current_room(self.request)
+        context['room'] = self.request.room
         return context
 
 
@@ -82,7 +119,7 @@ class ArticleUpdateView(LoginRequiredMixin, UpdateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['room'] = get_current_room(self.request)
+        context['room'] = self.request.room
         return context
 
 class ArticleDeleteView(LoginRequiredMixin, DeleteView):
@@ -102,40 +139,98 @@ class ChatDetailView(LoginRequiredMixin, DetailView): # ***類別名稱變更為
     context_object_name = 'article'
     # ... (get_queryset 和 get_context_data 保持不變，但內部引用應改為 Chat.objects 和 'replies' 關係)
     def get_queryset(self):
-        self.room = get_current_room(self.request)
+        self.room = self.request.room
         if not self.room:
             return Chat.objects.none()
         
-        # 確保只能看到當前房間內且是文章的內容
-        return Chat.objects.filter(room=self.room, is_article=True)
+        # 確保只能看到當前房間內且是文章的內容 (留言總數以子查詢一併取得)
+        return Chat.objects.with_reply_stats().filter(
+            room=self.room, is_article=True
+        ).select_related('author', 'room')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         article = context['article']
         
-        # 獲取所有留言，並使用 select_related('author')
-        context['comments'] = article.replies.filter(
-            is_article=False
-        ).select_related('author').order_by('created_at')
+        # 開啟文章即標為已讀 (沒有新內容時不寫入)
+        mark_read(self.request.user, article, get_counter(self.request))
+
+        # 只先渲染第一頁留言串 (巢狀回覆依 thread_path 一次查出)，其餘由 ChatCommentsView 依 cursor 分頁載入
+        context['comments'], context['next_comment_cursor'] = Chat.objects.thread_page(article)
+        context['comment_count'] = article.reply_count
+        context['thread_depth'] = Chat.objects.THREAD_DEPTH
         
         context['reply_form'] = ReplyForm() # 傳遞空留言表單
         context['room'] = self.room
         return context
 
+def comment_json(comment):
+    """留言的 JSON 格式 (分頁 API 與即時推播共用)"""
+    return {
+        'id': comment.id,
+        'author': comment.author.username,
+        'author_url': reverse('members:detail', kwargs={'pk': comment.author_id}),
+        'content': comment.content,
+        'created_at': timezone.localtime(comment.created_at).strftime('%Y/%m/%d %H:%M'),
+        'parent_id': comment.parent_id,
+        'depth': comment.depth,
+    }
+
+
+@method_decorator(room_conditional, name='dispatch')
+class ChatCommentsView(LoginRequiredMixin, View):
+    """
+    文章留言串的分頁 JSON (?cursor= 為上一頁回傳的 next_cursor)。
+    ?root=<留言 id> 改為載入該則留言底下的子樹 (超過 THREAD_DEPTH 層的回覆)。
+    """
+
+    def get(self, request, pk):
+        room = request.room
+        if not room:
+            return JsonResponse({'status': 'error', 'message': '請先選擇房號。'}, status=403)
+        article = get_object_or_404(Chat, pk=pk, is_article=True, room=room)
+        try:
+            root = article
+            if request.GET.get('root'):
+                root = get_object_or_404(
+                    Chat.objects.filter(subtree_q(article.thread_path), room=room), pk=request.GET['root']
+                )
+            comments, next_cursor = Chat.objects.thread_page(root, cursor=request.GET.get('cursor'))
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': '無效的分頁位置。'}, status=400)
+
+        return JsonResponse({
+            'comments': [comment_json(comment) for comment in comments],
+            'next_cursor': next_cursor,
+        })
+
 class ReplyCreateView(LoginRequiredMixin, CreateView):
     model = Chat
     form_class = ReplyForm
     # 這裡不使用模板，處理完畢直接重定向回文章詳情頁面
 
     def form_valid(self, form):
-        room = get_current_room(self.request)
+        room = self.request.room
         article = get_object_or_404(Chat, pk=self.kwargs['pk'], is_article=True, room=room)
         
         form.instance.author = self.request.user
         form.instance.room = room
         form.instance.is_article = False # 確保是留言
-        form.instance.parent = article   # 指定父級文章
-        return super().form_valid(form)
+        try:
+            # 回覆某則留言時 parent 為該留言 (必須在同一篇文章的留言串內)，否則直接回覆文章
+            form.instance.parent = article
+            if self.request.POST.get('parent'):
+                form.instance.parent = get_object_or_404(
+                    Chat.objects.filter(subtree_q(article.thread_path), room=room),
+                    pk=self.request.POST['parent'],
+                )
+            response = super().form_valid(form)
+        except ValueError as e:
+            # parent 格式錯誤或留言串層數已達上限
+            return HttpResponseBadRequest(str(e))
+        # 推播給正在看這個房間的成員
+        publish_room_event(room.id, 'chat.reply', article_id=article.id, comment=comment_json(self.object))
+        return response
 
     def get_success_url(self):
         # 提交成功後重定向回文章詳情頁面
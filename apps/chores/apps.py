@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ChoresConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.chores'
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,156 @@
+"""
+批次完成家務 (ChoreBulkCompleteView / ChoreCompleteView 共用)
+
+一次完成多個家務只用固定數量的查詢，在同一個交易中：
+- 一次查詢確認所有家務都屬於目前房間 (有任何一個不屬於就整批不寫入)
+- bulk_create 完成紀錄，一個 UPDATE 更新 last_completed
+
+並行安全 (不鎖資料表，多個 worker 同時處理也不會重複或遺失更新)：
+- 樂觀並行控制：UPDATE 只改 last_completed 與 version，條件是 version 仍是讀到的值；
+  有家務在這之間被別的請求完成 (更新筆數不足) 就整批回滾，丟出 CompletionConflict
+- Idempotency-Key：run_once 在同一個交易中先插入 (成員, key) 唯一的 CompletionRequest，
+  重送 (連點、網路重試) 的請求撞到唯一索引就回傳第一次存下的結果；
+  同時送達的兩個請求由資料庫的唯一索引排隊，只有一個會執行。
+  一併存下請求指紋 (路徑、房間、家務 id)，同一個 key 用在內容不同的請求時丟出 IdempotencyKeyReused
+
+bulk_create 與 QuerySet.update 不會觸發 signals，apps.chores.signals / apps.core.signals
+原本在每筆寫入時做的維護在這裡一次做完：排程重建、每日貢獻彙總、
+房間版本號 (主頁快照隨之失效) 與即時推播。
+"""
+import hashlib
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+# Idempotency-Key 的最大長度 (CompletionRequest.key)
+MAX_KEY_LENGTH = 64
+
+
+class ChoresNotInRoom(Exception):
+    """有家務不存在或不屬於目前房間"""
+
+    def __init__(self, missing):
+        self.missing = sorted(missing)
+        super().__init__(f'家務不存在或不屬於目前房間：{self.missing}')
+
+
+class _VersionMismatch(Exception):
+    pass
+
+
+class CompletionConflict(Exception):
+    """家務在讀取之後被其他請求更新 (版本號不符)"""
+
+    def __init__(self, chore_ids):
+        self.chore_ids = sorted(chore_ids)
+        super().__init__(f'家務已被其他請求更新：{self.chore_ids}')
+
+
+class IdempotencyKeyReused(Exception):
+    """同一個 Idempotency-Key 已用於內容不同的請求"""
+
+    def __init__(self, key):
+        self.key = key
+        super().__init__(f'Idempotency-Key 已用於不同的請求：{key}')
+
+
+def request_fingerprint(path, room, chore_ids):
+    """請求內容的指紋 (路徑、房間、排序後的家務 id)，與 Idempotency-Key 一起存下"""
+    ids = ','.join(map(str, sorted(set(chore_ids))))
+    return hashlib.sha256(f'{path}|{room.id}|{ids}'.encode()).hexdigest()
+
+
+def complete_chores(room, user, chore_ids):
+    """
+    user 完成 room 內的 chore_ids，回傳完成的家務 (依 id 排序，last_completed 已更新)。
+    有任何 id 不屬於此房間時丟出 ChoresNotInRoom，版本號不符時丟出 CompletionConflict，
+    兩種情況都不寫入任何資料。
+    """
+    from apps.rooms.models import Room
+    from apps.rooms.realtime import publish_room_event
+    from .contributions import record_completions
+    from .models import Chore, ChoreRecord
+    from .schedule import materialize_chores
+
+    ids = set(chore_ids)
+    if not ids:
+        return []
+    now = timezone.now()
+    today = timezone.localdate(now)
+
+    try:
+        with transaction.atomic():
+            chores = list(Chore.objects.filter(room=room, id__in=ids).order_by('id'))
+            missing = ids - {chore.id for chore in chores}
+            if missing:
+                raise ChoresNotInRoom(missing)
+
+            records = ChoreRecord.objects.bulk_create([
+                ChoreRecord(chore=chore, completed_by=user, completed_on=now) for chore in chores
+            ])
+            # 只更新 last_completed 與 version；條件是每個家務的版本號都還是剛才讀到的值
+            current = reduce(or_, (Q(id=chore.id, version=chore.version) for chore in chores))
+            updated = Chore.objects.filter(current).update(last_completed=today, version=F('version') + 1)
+            if updated != len(chores):
+                raise _VersionMismatch
+            for chore in chores:
+                chore.last_completed = today
+                chore.version += 1
+
+            # 以下對應每筆 post_save 的 signals
+            materialize_chores(chores)
+            record_completions(records)
+            Room.bump_version(pk=room.id)
+            publish_room_event(room.id, 'room.changed')
+    except _VersionMismatch:
+        # 回滾之後才比對：版本號和讀到的不同就是被別的請求更新過的家務
+        read = {chore.id: chore.version for chore in chores}
+        raise CompletionConflict(
+            chore_id for chore_id, version in Chore.objects.filter(id__in=ids).values_list('id', 'version')
+            if version != read[chore_id]
+        ) from None
+    return chores
+
+
+def run_once(user, room, key, handler, fingerprint=''):
+    """
+    以 Idempotency-Key 執行 handler() → (status_code, payload)，回傳 (status_code, payload, 是否為重送)。
+
+    key 為空時直接執行。只有成功 (2xx) 的結果會存下；失敗時整個交易回滾，
+    同一個 key 可以再試一次。已存下的 key 指紋 (request_fingerprint) 不同時
+    丟出 IdempotencyKeyReused，不回傳另一個請求的結果。
+    """
+    from .models import CompletionRequest
+
+    if not key:
+        status_code, payload = handler()
+        return status_code, payload, False
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                entry = CompletionRequest.objects.create(user=user, room=room, key=key, fingerprint=fingerprint)
+        except IntegrityError:
+            stored = CompletionRequest.objects.get(user=user, key=key)
+            # 沒有指紋的是加上指紋之前存下的紀錄，照舊重送
+            if stored.fingerprint and stored.fingerprint != fingerprint:
+                raise IdempotencyKeyReused(key) from None
+            return stored.status_code, stored.response, True
+
+        status_code, payload = handler()
+        if status_code >= 300:
+            transaction.set_rollback(True)
+        else:
+            CompletionRequest.objects.filter(pk=entry.pk).update(status_code=status_code, response=payload)
+    return status_code, payload, False
+
+
+def prune_requests(older_than):
+    """刪除 older_than (datetime) 之前的 CompletionRequest，回傳刪除筆數"""
+    from .models import CompletionRequest
+
+    deleted, _ = CompletionRequest.objects.filter(created_at__lt=older_than).delete()
+    return deleted
@@ -0,0 +1,200 @@
+"""
+每日貢獻彙總 (DailyContribution) 維護
+
+- 新的完成紀錄：該 (房號, 成員, 類型, 日期) +1 (record_completion；批次為 record_completions)
+- 匯入的歷史紀錄：合併後整批寫入 (import_completions)
+- 刪除紀錄 / 家務、家務類型變更：受影響的日期從 ChoreRecord 重新計數 (recount)
+- 既有資料：依完成時間分批聚合 (backfill)；今天的列與刪除時相同，以 recount 重算
+
+日期以當地時區 (TIME_ZONE) 的完成日計算，與 timezone.localdate 一致。
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _aggregate(records):
+    """ChoreRecord queryset → {(room_id, user_id, chore_type, day): count}"""
+    rows = (
+        records.filter(completed_by__isnull=False)
+        .annotate(day=TruncDate('completed_on'))
+        .values('chore__room_id', 'completed_by_id', 'chore__type', 'day')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    return {
+        (r['chore__room_id'], r['completed_by_id'], r['chore__type'], r['day']): r['n']
+        for r in rows
+    }
+
+
+def _add_counts(counts):
+    """
+    把 {key: count} 累加進彙總表：既有的列以 F('count') + n bulk_update
+    (不會蓋掉同時進行的 +1)，其餘 bulk_create
+    """
+    from .models import DailyContribution
+
+    if not counts:
+        return
+    days = [key[3] for key in counts]
+    existing = {
+        (c.room_id, c.user_id, c.chore_type, c.day): c
+        for c in DailyContribution.objects.filter(
+            room_id__in={key[0] for key in counts},
+            user_id__in={key[1] for key in counts},
+            day__range=(min(days), max(days)),
+        )
+    }
+    changed, new = [], []
+    for key, n in counts.items():
+        row = existing.get(key)
+        if row is None:
+            room_id, user_id, chore_type, day = key
+            new.append(DailyContribution(room_id=room_id, user_id=user_id,
+                                         chore_type=chore_type, day=day, count=n))
+        else:
+            row.count = F('count') + n
+            changed.append(row)
+    DailyContribution.objects.bulk_update(changed, ['count'], batch_size=1000)
+    DailyContribution.objects.bulk_create(new, batch_size=1000)
+
+
+def _increment(key, n=1):
+    """彙總表的一列 +n (沒有就建立)"""
+    from .models import DailyContribution
+
+    if DailyContribution.objects.filter(**key).update(count=F('count') + n):
+        return
+    try:
+        with transaction.atomic():
+            DailyContribution.objects.create(count=n, **key)
+    except IntegrityError:
+        # 同時有另一個請求先建立了這一列
+        DailyContribution.objects.filter(**key).update(count=F('count') + n)
+
+
+def record_completion(record):
+    """新的完成紀錄：對應的那一列 +1 (沒有就建立)"""
+    if record.completed_by_id is None:
+        return
+    chore = record.chore
+    _increment(dict(
+        room_id=chore.room_id,
+        user_id=record.completed_by_id,
+        chore_type=chore.type,
+        day=timezone.localdate(record.completed_on),
+    ))
+
+
+def _count_records(records):
+    """record.chore 需已載入 → {(room_id, user_id, chore_type, day): count}"""
+    return Counter(
+        (record.chore.room_id, record.completed_by_id, record.chore.type, timezone.localdate(record.completed_on))
+        for record in records if record.completed_by_id is not None
+    )
+
+
+def record_completions(records):
+    """
+    一批新的完成紀錄 (bulk_create，不會觸發 signals；record.chore 需已載入)：
+    依 (房號, 成員, 類型, 日期) 合併後每一列 +n，查詢數只跟合併後的列數有關
+    """
+    for (room_id, user_id, chore_type, day), n in _count_records(records).items():
+        _increment(dict(room_id=room_id, user_id=user_id, chore_type=chore_type, day=day), n)
+
+
+def import_completions(records):
+    """
+    批次匯入的大量歷史紀錄：合併後整批 bulk_update / bulk_create，查詢數固定。
+    不處理同時寫入同一列的競爭，只在匯入這類批次作業中使用
+    """
+    _add_counts(_count_records(records))
+
+
+def record_days(records):
+    """紀錄的當地完成日集合"""
+    return {timezone.localdate(dt) for dt in records.values_list('completed_on', flat=True)}
+
+
+def recount(room_ids, days):
+    """
+    重新計算這些房號在 days 這幾天的彙總，回傳計入的紀錄筆數。
+    刪除紀錄 / 家務、家務類型變更時使用；只動受影響的日期。
+    先刪除再聚合，都在同一個交易中：刪除會等同時寫入這些列的交易提交，
+    之後的聚合就包含那些紀錄，不會少算也不會重複。
+    """
+    from .models import ChoreRecord, DailyContribution
+
+    days, room_ids = set(days), set(room_ids)
+    if not days or not room_ids:
+        return 0
+    with transaction.atomic():
+        DailyContribution.objects.filter(room_id__in=room_ids, day__in=days).delete()
+        counts = _aggregate(ChoreRecord.objects.filter(
+            chore__room_id__in=room_ids, completed_on__date__in=days,
+        ))
+        _add_counts(counts)
+    return sum(counts.values())
+
+
+def backfill(chunk_size=5000, room_ids=None, stdout=None):
+    """
+    從 ChoreRecord 重建彙總表，依完成時間分批聚合。
+
+    開始時以今天 (當地日期) 為界：今天以前的日期在這裡重建，之後才寫入的紀錄
+    由 signals 遞增，今天的列最後以 recount 重算，所以執行期間新增的紀錄不會被算兩次。
+    每批約 chunk_size 筆紀錄，邊界對齊當地的日期；每批一個交易，先刪除該日期範圍的列
+    再寫入聚合結果 (取代而不是累加)，中斷後重跑或同時有 recount 都不會重複計數。
+    """
+    from apps.rooms.models import Room
+    from .models import ChoreRecord, DailyContribution
+
+    records = ChoreRecord.objects.all()
+    targets = DailyContribution.objects.all()
+    if room_ids:
+        records = records.filter(chore__room_id__in=room_ids)
+        targets = targets.filter(room_id__in=room_ids)
+
+    today = timezone.localdate()
+    cutoff = _start_of_day(today)
+    past = records.filter(completed_on__lt=cutoff)
+    first = past.aggregate(first=Min('completed_on'))['first']
+    first_day = timezone.localdate(first) if first else today
+    # 第一筆紀錄之前的列沒有對應的紀錄
+    targets.filter(day__lt=first_day).delete()
+
+    since = _start_of_day(first_day)
+    processed = 0
+    while since < cutoff:
+        chunk = past.filter(completed_on__gte=since)
+        boundary = list(
+            chunk.order_by('completed_on').values_list('completed_on', flat=True)[chunk_size:chunk_size + 1]
+        )
+        until = cutoff
+        if boundary:
+            until = _start_of_day(timezone.localdate(boundary[0]))
+            if until <= since:
+                # 單日紀錄超過 chunk_size 筆：整天一批
+                until = _start_of_day(timezone.localdate(since) + timedelta(days=1))
+        with transaction.atomic():
+            targets.filter(day__gte=timezone.localdate(since), day__lt=timezone.localdate(until)).delete()
+            counts = _aggregate(chunk.filter(completed_on__lt=until))
+            _add_counts(counts)
+        processed += sum(counts.values())
+        if stdout is not None:
+            stdout.write(f'  {timezone.localdate(since)} 起：累計 {processed} 筆')
+        since = until
+
+    if not room_ids:
+        room_ids = Room.objects.values_list('id', flat=True)
+    processed += recount(room_ids, [today])
+    return processed
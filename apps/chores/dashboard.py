@@ -0,0 +1,121 @@
+"""
+主頁儀表板的非同步計算 (HomeView)
+
+快照未命中時，待辦 / 月曆 / 圓餅圖 / 成員貢獻四個區塊彼此獨立，
+在 ASGI 下同時計算，等待時間約等於最慢的一個區塊，而不是四個加總。
+
+- 各區塊的查詢仍是同步 ORM，放進固定大小的執行緒池 (DASHBOARD_SECTION_WORKERS)，
+  每個執行緒使用自己的資料庫連線，區塊結束時依 CONN_MAX_AGE 關閉
+- 單一區塊執行超過 DASHBOARD_SECTION_TIMEOUT 秒就放棄，以空的預設值顯示並在頁面上提示；
+  這份不完整的結果不寫入快照，下一次瀏覽會重新計算。
+  逾時從區塊在執行緒開始執行時才計時，其他請求佔滿執行緒池時排隊的時間不算在內
+  (逾時的區塊仍會在背景執行完畢，執行緒池的大小限制了同時在跑的數量)
+- DASHBOARD_SECTION_WORKERS = 0，或請求的連線正在交易中 (測試、基準測試的回滾交易)
+  時在請求的執行緒內依序計算：交易中尚未提交的資料只有同一條連線看得到
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .snapshots import SECTIONS, read_snapshot, snapshot_key, store_snapshot
+
+logger = logging.getLogger(__name__)
+
+# 頁面提示用的區塊名稱
+SECTION_LABELS = {
+    'todos': '今日與積欠事項',
+    'calendar': '月曆',
+    'pie_chart': '完成率',
+    'member_stats': '成員貢獻',
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'DASHBOARD_SECTION_WORKERS', 4),
+                thread_name_prefix='dashboard-section',
+            )
+        return _executor
+
+
+def _in_worker(func, room, user, on_start):
+    """在執行緒池中計算一個區塊；前後清掉過期的連線 (等同一個請求的開始與結束)"""
+    on_start()
+    close_old_connections()
+    try:
+        return func(room, user)
+    finally:
+        close_old_connections()
+
+
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+async def _section(name, room, user, timeout, parallel):
+    func, default = SECTIONS[name]
+    if parallel:
+        loop = asyncio.get_running_loop()
+        started = asyncio.Event()
+        run = sync_to_async(_in_worker, thread_sensitive=False, executor=_get_executor())
+        call = asyncio.ensure_future(run(func, room, user, partial(loop.call_soon_threadsafe, started.set)))
+        # 等執行緒池空出執行緒 (不計時)，開始執行後才套用逾時
+        waiting = asyncio.ensure_future(started.wait())
+        await asyncio.wait([call, waiting], return_when=asyncio.FIRST_COMPLETED)
+        waiting.cancel()
+    else:
+        call = sync_to_async(func)(room, user)
+    try:
+        return await asyncio.wait_for(call, timeout=timeout), True
+    except asyncio.TimeoutError:
+        logger.warning('dashboard section %s timed out after %ss (room %s)', name, timeout, room.id)
+        return default, False
+
+
+async def abuild_dashboard(room, user):
+    """
+    同時計算所有區塊，回傳 (snapshot, 無法取得的區塊名稱)；
+    snapshot 的欄位與 snapshots.build_dashboard 相同。
+    """
+    timeout = getattr(settings, 'DASHBOARD_SECTION_TIMEOUT', 5)
+    parallel = (
+        getattr(settings, 'DASHBOARD_SECTION_WORKERS', 4) > 0
+        and not await sync_to_async(_in_transaction)()
+    )
+    if parallel:
+        results = await asyncio.gather(*(_section(name, room, user, timeout, True) for name in SECTIONS))
+    else:
+        # 同一條連線不能同時執行多個查詢：依序計算
+        results = [await _section(name, room, user, timeout, False) for name in SECTIONS]
+
+    snapshot, unavailable = {}, []
+    for name, (data, ok) in zip(SECTIONS, results):
+        snapshot.update(data)
+        if not ok:
+            unavailable.append(name)
+    return snapshot, unavailable
+
+
+async def aget_dashboard_snapshot(room, user):
+    """非同步版的 snapshots.get_dashboard_snapshot，回傳 (snapshot, 無法取得的區塊名稱)"""
+    key = await sync_to_async(snapshot_key)(room, user)
+    snapshot = await sync_to_async(read_snapshot)(key)
+    if snapshot is not None:
+        return snapshot, []
+
+    snapshot, unavailable = await abuild_dashboard(room, user)
+    if not unavailable:
+        await sync_to_async(store_snapshot)(key, snapshot)
+    return snapshot, unavailable
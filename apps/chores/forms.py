@@ -51,4 +51,23 @@ class ChoreForm(forms.ModelForm):
                 self.add_error('private_area', "私人家事必須填寫區域。")
             if self.user:
                 cleaned_data['assigned_to'] = [self.user]
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+
+class ChoreImportForm(forms.Form):
+    """家務批次匯入 (見 apps.chores.importer)"""
+    file = forms.FileField(label='匯入檔案 (CSV / JSON)')
+    format = forms.ChoiceField(
+        choices=[('', '依副檔名判斷'), ('csv', 'CSV'), ('json', 'JSON')], required=False, label='格式',
+    )
+
+    def clean(self):
+        from .importer import detect_format
+
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('file')
+        if upload and not cleaned_data.get('format'):
+            cleaned_data['format'] = detect_format(upload.name)
+            if not cleaned_data['format']:
+                self.add_error('format', '無法從副檔名判斷格式，請選擇 CSV 或 JSON。')
+        return cleaned_data
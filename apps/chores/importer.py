@@ -0,0 +1,272 @@
+"""
+家務批次匯入 (ChoreImportView / import_chores 共用)
+
+從 CSV 或 JSON 一次建立大量家務、負責成員與過去的完成紀錄：
+- 先整批驗證 (成員只查一次)，有任何錯誤就整批不寫入，回傳每一筆的錯誤
+- 家務、assigned_to 的 through 資料列、完成紀錄都以 bulk_create 寫入，全部在同一個交易中
+- 輪值名單在寫入前就排好，不必再 refresh_rosters；排程、每日貢獻彙總、
+  房間版本號 (主頁快照隨之失效) 在寫入後一次處理 (bulk_create 不會觸發 signals)
+
+查詢數只跟批次數有關，匯入時間隨筆數線性成長。
+
+CSV 欄位 (第一列為標題)：
+    title, type, frequency_days, last_completed, private_area, assignees, completions
+    assignees：以 ; 分隔的 username
+    completions：以 ; 分隔的「username@時間」(時間為 ISO 格式的日期或日期時間)
+JSON：家務物件的陣列 (或 {"chores": [...]})，欄位同上；
+    assignees 為 username 陣列，completions 為 [{"by": username, "on": 時間}, ...]
+"""
+import csv
+import io
+import json
+from datetime import datetime, time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+FORMATS = ('csv', 'json')
+BATCH_SIZE = 1000
+DEFAULT_FREQUENCY_DAYS = 7
+CHORE_TYPES = ('PUBLIC', 'PRIVATE')
+
+
+class ChoreImportError(Exception):
+    """匯入資料有誤；errors 為 [(第幾列 / 第幾筆, 訊息), ...]"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f'匯入資料有 {len(errors)} 個錯誤')
+
+
+class ImportResult(NamedTuple):
+    chores: int
+    assignments: int
+    completions: int
+
+
+# =========================
+# 讀取
+# =========================
+def _split(value, sep=';'):
+    return [part.strip() for part in (value or '').split(sep) if part.strip()]
+
+
+def _csv_rows(text):
+    for row in csv.DictReader(io.StringIO(text)):
+        completions = []
+        for entry in _split(row.get('completions')):
+            # username 本身可能含 @，以最後一個 @ 分隔時間
+            by, _, on = entry.rpartition('@')
+            completions.append({'by': by.strip(), 'on': on.strip()})
+        yield dict(row, assignees=_split(row.get('assignees')), completions=completions)
+
+
+def _json_rows(text):
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get('chores')
+    if not isinstance(data, list):
+        raise ChoreImportError([(0, 'JSON 必須是家務陣列或 {"chores": [...]}')])
+    return data
+
+
+def read_rows(data, fmt):
+    """bytes / str → 原始資料列 (dict) 的 list，第幾列從 CSV 的資料列 (2) 或 JSON 的第 1 筆起算"""
+    if isinstance(data, bytes):
+        try:
+            data = data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ChoreImportError([(0, '檔案必須是 UTF-8 編碼')]) from None
+    try:
+        if fmt == 'csv':
+            return list(enumerate(_csv_rows(data), start=2))
+        return list(enumerate(_json_rows(data), start=1))
+    except (csv.Error, ValueError) as exc:
+        raise ChoreImportError([(0, f'無法解析檔案：{exc}')]) from None
+
+
+def detect_format(filename):
+    """依副檔名判斷格式，無法判斷時為 None"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in FORMATS else None
+
+
+# =========================
+# 驗證
+# =========================
+def _parse_time(value):
+    value = str(value or '').strip()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _clean_row(raw, members, default_user, now):
+    """
+    一筆原始資料 → (Chore 欄位, 負責成員 id, [(完成者 id, 完成時間)], 錯誤訊息)；
+    members 為 {username: user id}
+    """
+    errors = []
+    if not isinstance(raw, dict):
+        return None, [], [], ['必須是物件']
+
+    title = str(raw.get('title') or '').strip()
+    if not title:
+        errors.append('缺少家務名稱 (title)')
+    elif len(title) > 100:
+        errors.append('家務名稱超過 100 字')
+
+    chore_type = str(raw.get('type') or 'PUBLIC').strip().upper()
+    if chore_type not in CHORE_TYPES:
+        errors.append(f'類型必須是 PUBLIC 或 PRIVATE：{raw.get("type")}')
+
+    frequency = raw.get('frequency_days')
+    try:
+        frequency = int(frequency) if frequency not in (None, '') else DEFAULT_FREQUENCY_DAYS
+        if frequency < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors.append(f'頻率必須是正整數：{frequency}')
+
+    private_area = str(raw.get('private_area') or '').strip() or None
+    if chore_type == 'PRIVATE' and not private_area:
+        errors.append('私人家事必須填寫區域 (private_area)')
+    elif private_area and len(private_area) > 100:
+        errors.append('區域名稱超過 100 字')
+
+    assignees = raw.get('assignees') or []
+    if isinstance(assignees, str):
+        assignees = _split(assignees)
+    elif not isinstance(assignees, list):
+        errors.append('負責成員 (assignees) 必須是 username 陣列')
+        assignees = []
+    unknown = [name for name in assignees if name not in members]
+    if unknown:
+        errors.append(f'不是房間成員：{", ".join(map(str, unknown))}')
+    user_ids = sorted({members[name] for name in assignees if name in members})
+    if chore_type == 'PRIVATE':
+        # 與 ChoreForm 相同：沒有指定時由匯入者負責
+        if not user_ids and default_user is not None:
+            user_ids = [default_user.pk]
+        if len(user_ids) != 1 and not unknown:
+            errors.append('私人家事必須恰好有一位負責成員')
+
+    completions = []
+    entries = raw.get('completions') or []
+    if not isinstance(entries, list):
+        errors.append('完成紀錄 (completions) 必須是 [{"by": username, "on": 時間}, ...] 陣列')
+        entries = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            errors.append(f'無效的完成紀錄：{entry}')
+            continue
+        by, completed_on = entry.get('by'), _parse_time(entry.get('on'))
+        if by not in members:
+            errors.append(f'完成者不是房間成員：{by}')
+        if completed_on is None:
+            errors.append(f'無效的完成時間：{entry.get("on")}')
+        elif completed_on > now:
+            errors.append(f'完成時間不能在未來：{entry.get("on")}')
+        if by in members and completed_on is not None:
+            completions.append((members[by], completed_on))
+
+    last_completed = raw.get('last_completed')
+    if last_completed:
+        last_completed = parse_date(str(last_completed).strip())
+        if last_completed is None:
+            errors.append(f'無效的上次完成日期：{raw.get("last_completed")}')
+    elif completions:
+        last_completed = max(timezone.localdate(on) for _, on in completions)
+    else:
+        last_completed = timezone.localdate(now)
+
+    fields = dict(
+        title=title, type=chore_type, frequency_days=frequency,
+        last_completed=last_completed, private_area=private_area,
+    )
+    return fields, user_ids, completions, errors
+
+
+def validate(room, rows, default_user=None):
+    """驗證所有資料列，有錯誤時丟出 ChoreImportError；回傳 [(Chore 欄位, 負責成員 id, 完成紀錄), ...]"""
+    limit = getattr(settings, 'CHORE_IMPORT_MAX_ROWS', 50000)
+    if len(rows) > limit:
+        raise ChoreImportError([(0, f'單次最多匯入 {limit} 筆家務，檔案有 {len(rows)} 筆')])
+    members = dict(
+        get_user_model().objects.filter(joined_rooms=room).values_list('username', 'id')
+    )
+    now = timezone.now()
+    cleaned, errors = [], []
+    for line, raw in rows:
+        fields, user_ids, completions, row_errors = _clean_row(raw, members, default_user, now)
+        errors.extend((line, message) for message in row_errors)
+        cleaned.append((fields, user_ids, completions))
+    if errors:
+        raise ChoreImportError(errors)
+    return cleaned
+
+
+# =========================
+# 寫入
+# =========================
+def _batches(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def import_chores(room, rows, default_user=None):
+    """
+    rows (read_rows 的結果) 驗證後整批寫入 room，回傳 ImportResult。
+    有任何錯誤時丟出 ChoreImportError，不寫入任何資料。
+    """
+    from apps.rooms.models import Room
+    from apps.rooms.realtime import publish_room_event
+    from .contributions import import_completions
+    from .models import Chore, ChoreRecord
+    from .schedule import materialize_chores
+
+    cleaned = validate(room, rows, default_user)
+    if not cleaned:
+        return ImportResult(0, 0, 0)
+
+    with transaction.atomic():
+        chores = Chore.objects.bulk_create([
+            Chore(room=room, duty_roster=user_ids, **fields) for fields, user_ids, _ in cleaned
+        ], batch_size=BATCH_SIZE)
+
+        through = Chore.assigned_to.through
+        assignments = through.objects.bulk_create([
+            through(chore_id=chore.id, user_id=user_id)
+            for chore, (_, user_ids, _) in zip(chores, cleaned) for user_id in user_ids
+        ], batch_size=BATCH_SIZE)
+
+        history = [
+            (chore, user_id, completed_on)
+            for chore, (_, _, completions) in zip(chores, cleaned) for user_id, completed_on in completions
+        ]
+        records = ChoreRecord.objects.bulk_create([
+            ChoreRecord(chore=chore, completed_by_id=user_id) for chore, user_id, _ in history
+        ], batch_size=BATCH_SIZE)
+        # completed_on 是 auto_now_add，bulk_create 時會被改成現在，寫回匯入的時間
+        for record, (_, _, completed_on) in zip(records, history):
+            record.completed_on = completed_on
+        ChoreRecord.objects.bulk_update(records, ['completed_on'], batch_size=BATCH_SIZE)
+
+        # 以下對應逐筆新增時的 signals
+        for batch in _batches(chores):
+            materialize_chores(batch)
+        import_completions(records)
+        Room.bump_version(pk=room.id)
+        publish_room_event(room.id, 'room.changed')
+
+    return ImportResult(len(chores), len(assignments), len(records))
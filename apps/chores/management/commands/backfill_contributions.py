@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.rooms.models import Room
+from apps.chores.contributions import backfill
+
+
+class Command(BaseCommand):
+    help = '從完成紀錄 (ChoreRecord) 分批重建每日貢獻彙總 (DailyContribution)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('room_ids', nargs='*', type=int, help='房號 id；不指定則重建所有房間')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='每批大約處理的紀錄筆數 (依日期切齊)')
+
+    def handle(self, *args, **options):
+        room_ids = options['room_ids']
+        if room_ids:
+            missing = set(room_ids) - set(Room.objects.filter(id__in=room_ids).values_list('id', flat=True))
+            if missing:
+                raise CommandError(f'找不到房號 id: {sorted(missing)}')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size 必須大於 0')
+
+        total = backfill(options['chunk_size'], room_ids or None, stdout=self.stdout)
+        self.stdout.write(f'完成，共彙總 {total} 筆完成紀錄')
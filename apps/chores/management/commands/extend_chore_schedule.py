@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.chores.models import Chore
+from apps.chores.schedule import extend_schedule
+
+
+class Command(BaseCommand):
+    help = '把所有家務的排程往後延伸到滾動期限 (建議每日執行一次)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CHORE_SCHEDULE_HORIZON_DAYS,
+            help='從今天往後物化的天數',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        until = date.today() + timedelta(days=options['days'])
+        ids = list(Chore.objects.order_by('id').values_list('id', flat=True))
+        created = 0
+        for i in range(0, len(ids), options['batch_size']):
+            batch = Chore.objects.filter(id__in=ids[i:i + options['batch_size']])
+            created += extend_schedule(batch, until)
+        self.stdout.write(f'已延伸至 {until}，新增 {created} 筆排程')
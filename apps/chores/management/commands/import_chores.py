@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chores.importer import FORMATS, ChoreImportError, detect_format, import_chores, read_rows
+from apps.rooms.models import Room
+
+
+class Command(BaseCommand):
+    help = '從 CSV / JSON 批次匯入家務、負責成員與過去的完成紀錄 (整批驗證，單一交易寫入)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('room_id', type=int, help='房號 id')
+        parser.add_argument('path', help='匯入檔案')
+        parser.add_argument('--format', choices=FORMATS, help='檔案格式；不指定則依副檔名判斷')
+        parser.add_argument('--user', help='私人家事沒有指定負責成員時的負責人 (username)')
+
+    def handle(self, *args, **options):
+        room = Room.objects.filter(id=options['room_id']).first()
+        if room is None:
+            raise CommandError(f'找不到房號 id: {options["room_id"]}')
+        fmt = options['format'] or detect_format(options['path'])
+        if fmt is None:
+            raise CommandError('無法從副檔名判斷格式，請指定 --format')
+        default_user = None
+        if options['user']:
+            default_user = get_user_model().objects.filter(username=options['user'], joined_rooms=room).first()
+            if default_user is None:
+                raise CommandError(f'{options["user"]} 不是此房間的成員')
+
+        try:
+            with open(options['path'], 'rb') as source:
+                rows = read_rows(source.read(), fmt)
+            result = import_chores(room, rows, default_user=default_user)
+        except OSError as exc:
+            raise CommandError(f'無法讀取檔案：{exc}') from None
+        except ChoreImportError as exc:
+            for line, message in exc.errors:
+                self.stderr.write(f'第 {line} 筆：{message}' if line else message)
+            raise CommandError(f'匯入失敗，共 {len(exc.errors)} 個錯誤，沒有寫入任何資料') from None
+
+        self.stdout.write(
+            f'已匯入 {result.chores} 個家務、{result.assignments} 筆負責成員與 {result.completions} 筆完成紀錄'
+        )
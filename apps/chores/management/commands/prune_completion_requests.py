@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.chores.completion import prune_requests
+
+
+class Command(BaseCommand):
+    help = '刪除過期的家務完成請求紀錄 (Idempotency-Key，建議每日執行一次)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=settings.CHORE_COMPLETION_KEY_HOURS,
+            help='保留最近幾小時的紀錄',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_requests(timezone.now() - timedelta(hours=options['hours']))
+        self.stdout.write(f'已刪除 {deleted} 筆完成請求紀錄')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.rooms.models import Room
+from apps.chores.schedule import rebuild_room
+
+
+class Command(BaseCommand):
+    help = '從頭重建房間的家務排程 (ChoreOccurrence)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('room_ids', nargs='*', type=int, help='房號 id；不指定則重建所有房間')
+
+    def handle(self, *args, **options):
+        rooms = Room.objects.all()
+        if options['room_ids']:
+            rooms = rooms.filter(id__in=options['room_ids'])
+            missing = set(options['room_ids']) - set(rooms.values_list('id', flat=True))
+            if missing:
+                raise CommandError(f'找不到房號 id: {sorted(missing)}')
+
+        for room in rooms:
+            count = rebuild_room(room)
+            self.stdout.write(f'{room.room_number}: {count} 筆排程')
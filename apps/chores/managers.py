@@ -1,7 +1,10 @@
 from django.db import models
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Q, Max, Sum
+
+from .occurrences import expand_chores
+from .schedule import ensure_schedule
 
 class ChoreManager(models.Manager):
     """
@@ -24,10 +27,13 @@ class ChoreManager(models.Manager):
     # =========================
     def get_status(self, chore):
         today = date.today()
+        return self.resolve_statuses([chore])[(chore.id, today)]
+
+    def _status_today(self, chore, completed_dates, today):
         due_date = self.get_due_date(chore)  # 取得理論應完成日
 
         # 1. 檢查今天是否已完成
-        if chore.records.filter(completed_on__date=today).exists():
+        if today in completed_dates:
             return 'Done'
 
         # 2. 比較「應完成日」與「今天」
@@ -46,35 +52,24 @@ class ChoreManager(models.Manager):
         - 會往前回推，確保不漏掉 start 附近的週期
         - 不考慮完成狀態 / 權限
         """
-        freq = chore.frequency_days
-
-        # 沒有頻率就不產生
-        if not freq or freq <= 0:
-            return
-
-        # 找「基準日」：最後完成日 + 週期
-        if chore.last_completed:
-            base_due = chore.last_completed + timedelta(days=freq)
-        else:
-            base_due = start
-
-        # ⭐ 關鍵：往前回推到 start 之前最近的一次
-        cur = base_due
-        while cur - timedelta(days=freq) >= start:
-            cur -= timedelta(days=freq)
+        for _, due in expand_chores([chore], start, end, missing_base=start):
+            yield due
 
-        # 正向產生
-        while cur < end:
-            yield cur
-            cur += timedelta(days=freq)
+    def expand_cycles(self, chores, start, end, rewind=True, missing_base=None):
+        """
+        一次展開多個家務的週期，回傳 [(chore, date), ...]
+        （批次版的 iter_chore_cycles，見 occurrences.expand_cycles）
+        """
+        return expand_chores(chores, start, end, rewind=rewind, missing_base=missing_base)
 
     def get_my_todos(self, room, user):
         """獲取該用戶今天該做的，以及積欠的事項"""
         today = date.today()
         # 1. 取得所有可能相關的家事
-        chores = self.filter(room=room).filter(
+        chores = list(self.filter(room=room).filter(
             Q(type='PUBLIC') | Q(type='PRIVATE', assigned_to=user)
-        ).prefetch_related('records')
+        ).distinct())
+        statuses = self.resolve_statuses(chores)
 
         today_list = []
         overdue_list = []
@@ -82,10 +77,11 @@ class ChoreManager(models.Manager):
         for chore in chores:
             # 核心判斷：今天或積欠的狀態下，是不是輪到我？
             # 注意：對於積欠(Red)，通常視為「目前該負責的人」要清理
-            if chore.get_current_duty_user(at_date=today) != user:
+            # (duty_roster 已隨家務載入，這裡不會再查詢資料庫)
+            if chore.get_duty_user_id(at_date=today) != user.id:
                 continue
 
-            status = self.get_status(chore)
+            status = statuses[(chore.id, today)]
             
             if status == 'Green':
                 today_list.append(chore)
@@ -100,10 +96,11 @@ class ChoreManager(models.Manager):
         """
         給月曆 / 統計 / 任意日期用
         """
-        today = date.today()
-        
+        return self.resolve_statuses([chore], [target_date])[(chore.id, target_date)]
+
+    def _status_on(self, chore, target_date, completed_dates, today):
         # 該日期是否已完成
-        if chore.records.filter(completed_on__date=target_date).exists():
+        if target_date in completed_dates:
             return 'Done'
         if chore.last_completed and target_date <= chore.last_completed:
             return 'Done'
@@ -117,23 +114,90 @@ class ChoreManager(models.Manager):
         else:
             # 未來的格子：顯示灰色預測
             return 'Grey'
+
+    # =========================
+    # 批次狀態 ⭐ 一次查詢取得所有完成紀錄
+    # =========================
+    def _completion_dates(self, chores, start, end):
+        """
+        回傳 {chore_id: {完成日期, ...}}，只含 [start, end] 範圍內的日期。
+        - 若呼叫端已 prefetch_related('records')，直接使用記憶體中的資料
+        - 否則以一次查詢取得所有家務的紀錄
+        """
+        done = {}
+        if all('records' in getattr(c, '_prefetched_objects_cache', {}) for c in chores):
+            for chore in chores:
+                for record in chore.records.all():
+                    day = timezone.localdate(record.completed_on)
+                    if start <= day <= end:
+                        done.setdefault(chore.id, set()).add(day)
+            return done
+
+        # 用時間區間 (而非 __date) 過濾，才能使用 completed_on 上的索引
+        tz = timezone.get_current_timezone()
+        since = timezone.make_aware(datetime.combine(start, time.min), tz)
+        until = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+        record_model = self.model._meta.get_field('records').related_model
+        rows = record_model.objects.filter(
+            chore_id__in=[c.id for c in chores],
+            completed_on__gte=since,
+            completed_on__lt=until,
+        ).order_by().values_list('chore_id', 'completed_on')
+        for chore_id, completed_on in rows:
+            done.setdefault(chore_id, set()).add(timezone.localdate(completed_on))
+        return done
+
+    def resolve_statuses(self, chores, dates=None):
+        """
+        批次判斷多個家務的狀態，回傳 {(chore_id, date): status}
+        - dates=None：今天的狀態 (同 get_status)
+        - 指定 dates：每個家務在每個日期的狀態 (同 get_status_by_date)
+        不論家務數量多少，完成紀錄只查詢一次。
+        """
+        chores = list(chores)
+        if dates is None:
+            today = date.today()
+            done = self._completion_dates(chores, today, today) if chores else {}
+            return {
+                (c.id, today): self._status_today(c, done.get(c.id, ()), today)
+                for c in chores
+            }
+        dates = list(dates)
+        return self.resolve_cycle_statuses([(c, d) for c in chores for d in dates])
+
+    def resolve_cycle_statuses(self, cycles):
+        """
+        給 expand_cycles 的結果用：每個 (chore, date) 只算自己的日期，
+        回傳 {(chore_id, date): status}
+        """
+        if not cycles:
+            return {}
+        today = date.today()
+        chores = list({c.id: c for c, _ in cycles}.values())
+        days = [d for _, d in cycles]
+        done = self._completion_dates(chores, min(days), max(days))
+        return {
+            (c.id, d): self._status_on(c, d, done.get(c.id, ()), today)
+            for c, d in cycles
+        }
     # =========================
     # 清單頁（F-3.1 / F-3.2）
     # =========================
     def get_chore_list_data(self, room):
-        chores = (
+        chores = list(
             self.filter(room=room)
-            .prefetch_related('records', 'assigned_to')
+            .annotate(last_record_on=Max('records__completed_on'))
+            .prefetch_related('assigned_to')
             .order_by('type', 'private_area', 'title')
         )
 
         public_chores = []
         private_by_area = {}
         today = date.today()
+        statuses = self.resolve_statuses(chores)
 
         for chore in chores:
-            last_record = chore.records.order_by('-completed_on').first()
-            last_completed = last_record.completed_on if last_record else None
+            last_completed = chore.last_record_on
 
             days_ago = (
                 (today - last_completed.date()).days
@@ -146,12 +210,9 @@ class ChoreManager(models.Manager):
                 'frequency': chore.frequency_days,
                 'last_completed': last_completed,
                 'days_ago': days_ago,
-                'status': self.get_status(chore),
+                'status': statuses[(chore.id, today)],
                 'type': chore.get_type_display(),
-                'assigned_members': list(
-                    chore.assigned_to.all()
-                    .values_list('username', flat=True)
-                ),
+                'assigned_members': [u.username for u in chore.assigned_to.all()],
             }
 
             if chore.type == 'PUBLIC':
@@ -175,45 +236,75 @@ class ChoreManager(models.Manager):
 
         events = []
 
-        chores = (
-            self.filter(room=room)
-            .filter(
-                Q(type='PUBLIC') |
-                Q(type='PRIVATE', assigned_to=user)
-            )
-            .prefetch_related('records')
+        # 從物化排程讀取：已完成的週期不顯示，積欠的週期會一直保留到完成為止
+        # (區間含 end_date 當天，所以右界 +1 天)
+        cycles = self.scheduled_cycles(
+            room, end_date + timedelta(days=1), user=user, pending_only=True
         )
+        for chore, cur_due, status in cycles:
+            events.append({
+                'date': cur_due.isoformat(),
+                'status': status,
+                'title': chore.title,
+                'is_public': chore.type == 'PUBLIC',
+            })
 
-        for chore in chores:
-            freq = chore.frequency_days
-            cur_due = self.get_due_date(chore)
-
-            # 回推到月初
-            while cur_due - timedelta(days=freq) >= start_date:
-                cur_due -= timedelta(days=freq)
-
-            while cur_due <= end_date:
-                status = self.get_status_by_date(chore, cur_due)
-
-                if status != 'Done':
-                    events.append({
-                        'date': cur_due.isoformat(),
-                        'status': status,
-                        'title': chore.title,
-                        'is_public': chore.type == 'PUBLIC',
-                    })
+        return events
 
-                cur_due += timedelta(days=freq)
+    # =========================
+    # 物化排程（ChoreOccurrence）
+    # =========================
+    def scheduled_cycles(self, room, end, user=None, pending_only=False):
+        """
+        從 ChoreOccurrence 讀出房間內到 end (不含) 為止的週期，
+        回傳 [(chore, due_date, status)]。
+        - 排程從每個家務上次完成後的第一個到期日開始
+        - user：只保留公共家事與該用戶負責的私人家事
+        - 紅 / 綠 / 灰 依今天日期判斷，不需要再查詢完成紀錄
+        """
+        ensure_schedule(room, end)
+        occurrence_model = self.model._meta.get_field('occurrences').related_model
+        rows = (
+            occurrence_model.objects
+            .filter(room=room, due_date__lt=end)
+            .select_related('chore')
+            .order_by('chore__last_completed', 'chore_id', 'due_date')
+        )
+        if pending_only:
+            rows = rows.filter(status='Pending')
+        if user is not None:
+            rows = rows.filter(
+                Q(chore__type='PUBLIC') |
+                Q(chore__type='PRIVATE', chore__assigned_to=user)
+            ).distinct()
 
-        return events
+        today = date.today()
+        return [
+            (
+                row.chore,
+                row.due_date,
+                'Done' if row.status == 'Done' else self._status_on(row.chore, row.due_date, (), today),
+            )
+            for row in rows
+        ]
+
+    def duty_schedule(self, user, start, end):
+        """user 在 [start, end) 之間輪值的排程 (使用 (duty_user, due_date) 索引)"""
+        occurrence_model = self.model._meta.get_field('occurrences').related_model
+        return (
+            occurrence_model.objects
+            .filter(duty_user=user, due_date__gte=start, due_date__lt=end)
+            .select_related('chore')
+            .order_by('due_date')
+        )
 
     
     # =========================
     # 圓餅圖（F-3.4）
     # =========================
     def get_completion_percentage(self, room):
-        chores = self.filter(room=room)
-        total = chores.count()
+        chores = list(self.filter(room=room))
+        total = len(chores)
 
         if total == 0:
             return {
@@ -223,11 +314,8 @@ class ChoreManager(models.Manager):
                 'total': 0,
             }
 
-        completed = 0
-        for chore in chores:
-            status = self.get_status(chore)
-            if status in ('Done', 'Grey'):
-                completed += 1
+        statuses = self.resolve_statuses(chores)
+        completed = sum(1 for s in statuses.values() if s in ('Done', 'Grey'))
 
         return {
             'percentage': int((completed / total) * 100),
@@ -242,21 +330,58 @@ class ChoreManager(models.Manager):
             models.Q(room=room, type='PUBLIC') | 
             models.Q(room=room, type='PRIVATE', assigned_to=user)
         ).distinct()
+        my_chores = list(my_chores)
         
-        total = my_chores.count()
+        total = len(my_chores)
         if total == 0:
             return {'percentage': 0, 'completed': 0, 'pending': 0, 'total': 0}
 
-        completed = 0
-        for chore in my_chores:
-            status = self.get_status(chore)
-            # Done 表示今天已完成，Grey 表示還沒到期（視為完成/安全）
-            if status in ('Done', 'Grey'):
-                completed += 1
+        # Done 表示今天已完成，Grey 表示還沒到期（視為完成/安全）
+        statuses = self.resolve_statuses(my_chores)
+        completed = sum(1 for s in statuses.values() if s in ('Done', 'Grey'))
 
         return {
             'percentage': int((completed / total) * 100),
             'completed': completed,
             'pending': total - completed,
             'total': total,
-        }
\ No newline at end of file
+        }
+
+
+class ContributionManager(models.Manager):
+    """
+    DailyContribution 的查詢：滾動視窗 (近 N 天，含今天) 與歷來累計都只是 SUM。
+    """
+
+    WINDOWS = (7, 30, 365)
+
+    def _since(self, days, today=None):
+        today = today or timezone.localdate()
+        return today - timedelta(days=days - 1)
+
+    def leaderboard(self, room, days=30):
+        """
+        房間成員排行 [{'completed_by__username', 'completed_count'}, ...]，
+        欄位名稱沿用 HomeView 舊版 ChoreRecord 聚合的結果；days=None 為歷來累計。
+        """
+        qs = self.filter(room=room)
+        if days is not None:
+            qs = qs.filter(day__gte=self._since(days))
+        return list(
+            qs.values(completed_by__username=models.F('user__username'))
+            .annotate(completed_count=Sum('count'))
+            .order_by('-completed_count', 'completed_by__username')
+        )
+
+    def totals(self, room, user, chore_type=None):
+        """單一成員的 {'7', '30', '365', 'all'} 完成次數 (一次查詢)"""
+        qs = self.filter(room=room, user=user)
+        if chore_type:
+            qs = qs.filter(chore_type=chore_type)
+        today = timezone.localdate()
+        sums = {
+            str(days): Sum('count', filter=Q(day__gte=self._since(days, today)), default=0)
+            for days in self.WINDOWS
+        }
+        sums['all'] = Sum('count', default=0)
+        return qs.aggregate(**sums)
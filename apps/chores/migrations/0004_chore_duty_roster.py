@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-17 12:36
+
+from django.db import migrations, models
+
+
+def fill_duty_rosters(apps, schema_editor):
+    """依現有 assigned_to (依 user id 排序) 建立輪值名單"""
+    Chore = apps.get_model('chores', 'Chore')
+    rosters = {}
+    rows = Chore.assigned_to.through.objects.order_by('chore_id', 'user_id').values_list('chore_id', 'user_id')
+    for chore_id, user_id in rows:
+        rosters.setdefault(chore_id, []).append(user_id)
+    for chore_id, roster in rosters.items():
+        Chore.objects.filter(pk=chore_id).update(duty_roster=roster)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chores', '0003_chore_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chore',
+            name='duty_roster',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='輪值名單'),
+        ),
+        migrations.RunPython(fill_duty_rosters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.1 on 2026-10-17 12:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chores', '0004_chore_duty_roster'),
+        ('rooms', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chore',
+            name='schedule_until',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='排程物化至'),
+        ),
+        migrations.CreateModel(
+            name='ChoreOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_date', models.DateField(verbose_name='應完成日期')),
+                ('status', models.CharField(choices=[('Pending', '待完成'), ('Done', '已完成')], default='Pending', max_length=10, verbose_name='狀態')),
+                ('chore', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='chores.chore', verbose_name='家務事項')),
+                ('duty_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duty_occurrences', to=settings.AUTH_USER_MODEL, verbose_name='輪值成員')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chore_occurrences', to='rooms.room', verbose_name='所屬房號')),
+            ],
+            options={
+                'verbose_name': '家務排程',
+                'verbose_name_plural': '家務排程',
+                'ordering': ['due_date'],
+                'indexes': [models.Index(fields=['room', 'due_date'], name='occurrence_room_due_idx'), models.Index(fields=['duty_user', 'due_date'], name='occurrence_duty_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('chore', 'due_date'), name='unique_chore_occurrence')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.1 on 2026-10-17 12:45
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_contributions(apps, schema_editor):
+    """依現有完成紀錄建立每日彙總 (之後可用 backfill_contributions 重建)"""
+    ChoreRecord = apps.get_model('chores', 'ChoreRecord')
+    DailyContribution = apps.get_model('chores', 'DailyContribution')
+    counts = Counter()
+    rows = (
+        ChoreRecord.objects.filter(completed_by__isnull=False)
+        .values_list('chore__room_id', 'completed_by_id', 'chore__type', 'completed_on')
+        .iterator(chunk_size=5000)
+    )
+    for room_id, user_id, chore_type, completed_on in rows:
+        counts[(room_id, user_id, chore_type, timezone.localdate(completed_on))] += 1
+    DailyContribution.objects.bulk_create([
+        DailyContribution(room_id=room_id, user_id=user_id, chore_type=chore_type, day=day, count=n)
+        for (room_id, user_id, chore_type, day), n in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chores', '0005_chore_occurrence'),
+        ('rooms', '0002_room_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chore_type', models.CharField(choices=[('PUBLIC', '公共家事'), ('PRIVATE', '私人家事')], max_length=10, verbose_name='家務類型')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='完成次數')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_contributions', to='rooms.room', verbose_name='所屬房號')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_contributions', to=settings.AUTH_USER_MODEL, verbose_name='成員')),
+            ],
+            options={
+                'verbose_name': '每日貢獻',
+                'verbose_name_plural': '每日貢獻',
+                'indexes': [models.Index(fields=['room', 'day'], name='contribution_room_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('room', 'user', 'chore_type', 'day'), name='unique_daily_contribution')],
+            },
+        ),
+        migrations.RunPython(fill_contributions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-17 12:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chores', '0006_daily_contribution'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chorerecord',
+            index=models.Index(fields=['chore', 'completed_on'], name='record_chore_completed_idx'),
+        ),
+    ]
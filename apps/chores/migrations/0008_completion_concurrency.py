@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-17 13:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chores', '0007_record_chore_completed_index'),
+        ('rooms', '0002_room_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chore',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='版本號'),
+        ),
+        migrations.CreateModel(
+            name='CompletionRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, verbose_name='Idempotency-Key')),
+                ('status_code', models.PositiveSmallIntegerField(default=200, verbose_name='回應狀態碼')),
+                ('response', models.JSONField(default=dict, verbose_name='回應內容')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='建立時間')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rooms.room', verbose_name='所屬房號')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='成員')),
+            ],
+            options={
+                'verbose_name': '家務完成請求',
+                'verbose_name_plural': '家務完成請求',
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='unique_completion_request')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chores', '0008_completion_concurrency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='completionrequest',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='請求指紋'),
+        ),
+    ]
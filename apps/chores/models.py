@@ -5,7 +5,8 @@ from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 from django.utils import timezone
 # 引入自定義管理器
-from .managers import ChoreManager
+from .managers import ChoreManager, ContributionManager
+from .roster import duty_index
 
 class Chore(models.Model):
     """家務事項模型"""
@@ -28,11 +29,19 @@ class Chore(models.Model):
     # 負責成員 (公共家事用於輪值，私人家事則為固定負責人)
     assigned_to = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='assigned_chores', verbose_name='負責成員')
     
+    # 輪值名單：assigned_to 依 id 排序後的 user id 陣列 (由 signals 維護)
+    duty_roster = models.JSONField(default=list, blank=True, editable=False, verbose_name='輪值名單')
+
+    # 排程 (ChoreOccurrence) 已物化到哪一天，None 表示尚未物化
+    schedule_until = models.DateField(null=True, blank=True, editable=False, verbose_name='排程物化至')
+
     # 私人家務區域細分
     private_area = models.CharField(max_length=100, blank=True, null=True, verbose_name='私人家務區域')
 
     # 建立日期 (作為輪替計算的基準點) 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='建立時間')
+    # 完成時的樂觀並行控制：UPDATE ... WHERE version = 讀到的值，成功才 +1
+    version = models.PositiveIntegerField(default=0, editable=False, verbose_name='版本號')
     # 使用自定義管理器
     objects = ChoreManager() # 確保使用了修正後的 ChoreManager
 
@@ -42,27 +51,26 @@ class Chore(models.Model):
         return self.last_completed + timedelta(days=self.frequency_days)
 
     # --- 新增：核心輪替邏輯 ---
-    def get_current_duty_user(self,at_date=None):
+    def get_duty_user_id(self, at_date=None):
         """
-        計算當前『理論上』輪到誰。
-        邏輯：根據 (今天 - 建立日期) 經過了幾個週期，來決定成員清單中的索引。
+        計算當前『理論上』輪到誰 (回傳 user id，不查詢資料庫)。
+        邏輯：根據 (今天 - 建立日期) 經過了幾個週期，來決定 duty_roster 中的索引。
         """
         if at_date is None:
             at_date = timezone.now().date()
-        members = self.assigned_to.all().order_by('id') # 固定排序確保輪替順序不變
-        count = members.count()
-        if count == 0:
+        index = duty_index(self, at_date)
+        if index is None:
             return None
-        if self.type == 'PRIVATE':
-            return members.first() # 私人家事通常只有一個人
+        return self.duty_roster[index]
 
-        # 計算從建立到現在過了幾個頻率週期
-        days_elapsed = (at_date - self.created_at.date()).days
-        cycle_number = days_elapsed // self.frequency_days
-        
-        # 取得當前輪到的成員索引
-        index = cycle_number % count
-        return members[index]
+    def get_current_duty_user(self,at_date=None):
+        """回傳輪值的 User 物件；已 prefetch assigned_to 時不再查詢"""
+        user_id = self.get_duty_user_id(at_date)
+        if user_id is None:
+            return None
+        if 'assigned_to' in getattr(self, '_prefetched_objects_cache', {}):
+            return next((u for u in self.assigned_to.all() if u.id == user_id), None)
+        return self.assigned_to.filter(pk=user_id).first()
     class Meta:
         verbose_name = '家務事項'
         verbose_name_plural = '家務事項'
@@ -82,8 +90,97 @@ class ChoreRecord(models.Model):
         verbose_name = '家務完成紀錄'
         verbose_name_plural = '家務完成紀錄'
         ordering = ['-completed_on']
+        indexes = [
+            # 狀態判斷與統計都是「某些家務在某段時間內的紀錄」
+            models.Index(fields=['chore', 'completed_on'], name='record_chore_completed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.chore.title} 於 {self.completed_on.strftime('%Y-%m-%d')}"
 
 
+class ChoreOccurrence(models.Model):
+    """家務排程 (每個到期日一列)，由 apps.chores.schedule 維護"""
+
+    STATUS_CHOICES = [
+        ('Pending', '待完成'),
+        ('Done', '已完成'),
+    ]
+
+    chore = models.ForeignKey(Chore, on_delete=models.CASCADE, related_name='occurrences', verbose_name='家務事項')
+    # 冗餘存放房號，讓月曆可以直接用 (room, due_date) 索引範圍查詢
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='chore_occurrences', verbose_name='所屬房號')
+    due_date = models.DateField(verbose_name='應完成日期')
+    duty_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='duty_occurrences', verbose_name='輪值成員'
+    )
+    # 只存「是否完成」；紅 / 綠 / 灰 依今天日期在讀取時判斷
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending', verbose_name='狀態')
+
+    class Meta:
+        verbose_name = '家務排程'
+        verbose_name_plural = '家務排程'
+        ordering = ['due_date']
+        constraints = [
+            models.UniqueConstraint(fields=['chore', 'due_date'], name='unique_chore_occurrence'),
+        ]
+        indexes = [
+            models.Index(fields=['room', 'due_date'], name='occurrence_room_due_idx'),
+            models.Index(fields=['duty_user', 'due_date'], name='occurrence_duty_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.chore.title} @ {self.due_date}"
+
+
+class DailyContribution(models.Model):
+    """
+    每日貢獻彙總：(房號, 成員, 家務類型, 日期) 的完成次數，由 apps.chores.contributions 維護。
+    排行榜與成員統計只要對這張表做 SUM，不必掃描全部 ChoreRecord。
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='daily_contributions', verbose_name='所屬房號')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_contributions', verbose_name='成員')
+    chore_type = models.CharField(max_length=10, choices=Chore.CHORE_TYPES, verbose_name='家務類型')
+    day = models.DateField(verbose_name='日期')
+    count = models.PositiveIntegerField(default=0, verbose_name='完成次數')
+
+    objects = ContributionManager()
+
+    class Meta:
+        verbose_name = '每日貢獻'
+        verbose_name_plural = '每日貢獻'
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'user', 'chore_type', 'day'], name='unique_daily_contribution'),
+        ]
+        indexes = [
+            models.Index(fields=['room', 'day'], name='contribution_room_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} @ {self.day}: {self.count}"
+
+
+class CompletionRequest(models.Model):
+    """
+    已處理的家務完成請求 (Idempotency-Key 標頭)，由 apps.chores.completion 維護。
+    同一個成員以同一個 key 重送時直接回傳第一次的結果，不會重複完成；
+    fingerprint 記錄請求內容 (路徑、房間、家務 id)，同一個 key 用在不同的請求時回 422。
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', verbose_name='成員')
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='+', verbose_name='所屬房號')
+    key = models.CharField(max_length=64, verbose_name='Idempotency-Key')
+    fingerprint = models.CharField(max_length=64, blank=True, default='', verbose_name='請求指紋')
+    status_code = models.PositiveSmallIntegerField(default=200, verbose_name='回應狀態碼')
+    response = models.JSONField(default=dict, verbose_name='回應內容')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='建立時間')
+
+    class Meta:
+        verbose_name = '家務完成請求'
+        verbose_name_plural = '家務完成請求'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_completion_request'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
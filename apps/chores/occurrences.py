@@ -0,0 +1,113 @@
+"""
+家務週期展開引擎
+
+把一整個房間的家務轉成陣列 (last_completed, frequency_days, created_at)，
+用 NumPy 的日期運算一次算出 [start, end) 區間內所有的理論到期日，
+取代過去每個家務、每個週期逐一 timedelta 相加的迴圈。
+"""
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Occurrences(NamedTuple):
+    """展開結果：三個等長陣列，依 (輸入順序, 到期日) 排序"""
+    index: np.ndarray   # 對應輸入陣列中的第幾個家務
+    due: np.ndarray     # 到期日 (datetime64[D])
+    cycle: np.ndarray   # 從 created_at 起算的第幾個週期 (輪值計算用)，沒有 created_at 時為 -1
+
+    def __len__(self):
+        return len(self.index)
+
+    def dates(self):
+        """把到期日轉回 Python 的 date 物件"""
+        return self.due.astype(object)
+
+
+def _to_day(value):
+    if value is None:
+        return np.datetime64('NaT', 'D')
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+
+def chore_arrays(chores):
+    """
+    把家務物件轉成引擎需要的三個陣列。
+    created_at 取 .date()，與 Chore.get_current_duty_user 的算法一致。
+    """
+    last = np.array([_to_day(c.last_completed) for c in chores], dtype='datetime64[D]')
+    freq = np.array([c.frequency_days or 0 for c in chores], dtype=np.int64)
+    created = np.array([_to_day(c.created_at) for c in chores], dtype='datetime64[D]')
+    return last, freq, created
+
+
+def expand_cycles(last_completed, frequency_days, start, end, created_at=None,
+                  rewind=True, missing_base=None):
+    """
+    計算每個家務在 [start, end) 區間內的所有理論到期日。
+
+    - 基準日 = last_completed + frequency_days
+    - rewind=True 時，基準日若晚於 start，往前回推到 start 之後最近的一次；
+      基準日早於 start 時則從基準日開始 (積欠的週期不會被略過)
+    - rewind=False 時一律從基準日開始
+    - last_completed 為 NaT 的家務：missing_base 為 None 時略過，否則以它當基準日
+    - frequency_days <= 0 的家務不產生任何週期
+    """
+    last = np.asarray(last_completed, dtype='datetime64[D]')
+    freq = np.asarray(frequency_days, dtype=np.int64)
+    start = _to_day(start)
+    end = _to_day(end)
+
+    valid = freq > 0
+    missing = np.isnat(last)
+    safe_freq = np.where(valid, freq, 1)
+
+    base = last + safe_freq.astype('timedelta64[D]')
+    if missing_base is not None:
+        base = np.where(missing, _to_day(missing_base), base)
+    else:
+        valid &= ~missing
+    base = np.where(valid, base, end)
+
+    if rewind:
+        # 往前回推的次數 = floor((base - start) / freq)，只在 base >= start 時成立
+        offset = (base - start).astype(np.int64)
+        steps = np.where(offset >= 0, offset // safe_freq, 0)
+        first = base - (steps * safe_freq).astype('timedelta64[D]')
+    else:
+        first = base
+
+    span = (end - first).astype(np.int64)
+    counts = np.where(valid & (span > 0), (span + safe_freq - 1) // safe_freq, 0)
+
+    total = int(counts.sum())
+    index = np.repeat(np.arange(len(freq)), counts)
+    # 每個家務內的週期序號 0, 1, 2, ...
+    group_start = np.repeat(np.cumsum(counts) - counts, counts)
+    k = np.arange(total) - group_start
+    due = first[index] + (k * safe_freq[index]).astype('timedelta64[D]')
+
+    if created_at is not None:
+        created = np.asarray(created_at, dtype='datetime64[D]')[index]
+        cycle = (due - created).astype(np.int64) // safe_freq[index]
+    else:
+        cycle = np.full(total, -1, dtype=np.int64)
+
+    return Occurrences(index=index, due=due, cycle=cycle)
+
+
+def expand_chores(chores, start, end, rewind=True, missing_base=None):
+    """
+    以家務物件清單為輸入的便利版本，回傳 [(chore, date), ...]。
+    順序與舊版迴圈相同：先依家務順序，再依日期遞增。
+    """
+    chores = list(chores)
+    if not chores:
+        return []
+    last, freq, created = chore_arrays(chores)
+    occ = expand_cycles(last, freq, start, end, created_at=created,
+                        rewind=rewind, missing_base=missing_base)
+    return [(chores[i], d) for i, d in zip(occ.index.tolist(), occ.dates())]
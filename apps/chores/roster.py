@@ -0,0 +1,98 @@
+"""
+輪值表 (Duty Roster)
+
+每個家務把「依 id 排序的負責成員」存在 Chore.duty_roster (JSON 整數陣列)，
+輪替基準點為 created_at。整個房間的家務只要一次查詢載入，
+之後「某日誰輪值」與「某人在區間內負責哪些家務」都在記憶體中一次算完。
+"""
+from datetime import timedelta
+
+import numpy as np
+
+from .occurrences import chore_arrays, expand_cycles
+
+
+def refresh_rosters(chore_ids):
+    """
+    assigned_to 變更後重建輪值名單：一次查詢取得所有關聯，逐筆寫回。
+    名單依 user id 排序，與舊版 order_by('id') 的輪替順序一致。
+    """
+    from .models import Chore
+
+    chore_ids = list(chore_ids)
+    if not chore_ids:
+        return
+    rosters = {pk: [] for pk in chore_ids}
+    through = Chore.assigned_to.through
+    rows = (
+        through.objects.filter(chore_id__in=chore_ids)
+        .order_by('chore_id', 'user_id')
+        .values_list('chore_id', 'user_id')
+    )
+    for chore_id, user_id in rows:
+        rosters[chore_id].append(user_id)
+    for chore_id, roster in rosters.items():
+        Chore.objects.filter(pk=chore_id).update(duty_roster=roster)
+
+
+def duty_index(chore, at_date):
+    """輪值名單中的索引；沒有成員時回傳 None"""
+    roster = chore.duty_roster or []
+    if not roster:
+        return None
+    if chore.type == 'PRIVATE':
+        return 0  # 私人家事通常只有一個人
+    days_elapsed = (at_date - chore.created_at.date()).days
+    cycle_number = days_elapsed // chore.frequency_days
+    return cycle_number % len(roster)
+
+
+class DutyRoster:
+    """
+    一個房間 (或任意一組家務) 的輪值表。
+    建立後不再查詢資料庫。
+    """
+
+    def __init__(self, chores):
+        self.chores = list(chores)
+        self.by_id = {c.id: c for c in self.chores}
+
+    @classmethod
+    def for_room(cls, room):
+        from .models import Chore
+        return cls(Chore.objects.filter(room=room))
+
+    def duty_user_id(self, chore_id, at_date):
+        """某家務在 at_date 輪到的成員 id"""
+        return self.by_id[chore_id].get_duty_user_id(at_date)
+
+    def duty_map(self, at_date):
+        """{chore_id: 輪值成員 id} (沒有負責成員的家務為 None)"""
+        return {c.id: c.get_duty_user_id(at_date) for c in self.chores}
+
+    def chores_on_duty(self, user_id, start, end):
+        """
+        user 在 [start, end] 之間的每個到期日中輪值的家務，
+        回傳 [(chore, date), ...]，依家務順序、日期遞增。
+        """
+        chores = [c for c in self.chores if user_id in (c.duty_roster or [])]
+        if not chores:
+            return []
+
+        last, freq, created = chore_arrays(chores)
+        occ = expand_cycles(last, freq, start, end + timedelta(days=1),
+                            created_at=created)
+        keep = occ.due >= np.datetime64(start, 'D')
+        index, due, cycle = occ.index[keep], occ.due[keep], occ.cycle[keep]
+
+        # 每個家務的名單長度、user 在名單中的位置、是否為私人家事
+        size = np.array([len(c.duty_roster) for c in chores], dtype=np.int64)
+        position = np.array([c.duty_roster.index(user_id) for c in chores], dtype=np.int64)
+        private = np.array([c.type == 'PRIVATE' for c in chores], dtype=bool)
+
+        slot = np.where(private[index], 0, cycle % size[index])
+        mine = slot == position[index]
+        return [
+            (chores[i], d)
+            for i, d in zip(index[mine].tolist(), due[mine].astype(object))
+        ]
@@ -0,0 +1,147 @@
+"""
+ChoreOccurrence 物化排程
+
+把每個家務從「下一次應完成日 (last_completed + frequency_days)」到
+滾動期限 (今天 + CHORE_SCHEDULE_HORIZON_DAYS) 之間的所有到期日存成資料列，
+月曆讀取就只是 (room, due_date) 的範圍查詢。
+
+- 家務完成、頻率或上次完成日改變：重建這個家務 (materialize_chores)，
+  只刪除新舊排程起點中較早那天之後的資料列；只改名稱等其他欄位時不重建
+- 新的完成紀錄：只把當天那一列標為 Done (mark_done)
+- 每日排程或讀取時發現期限不足：往後補齊 (extend_schedule)
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .occurrences import Occurrences, chore_arrays, expand_cycles
+
+
+def horizon_end(today=None):
+    """滾動期限：今天往後 CHORE_SCHEDULE_HORIZON_DAYS 天"""
+    today = today or date.today()
+    return today + timedelta(days=getattr(settings, 'CHORE_SCHEDULE_HORIZON_DAYS', 90))
+
+
+def _build_rows(chores, since, until):
+    """產生 chores 在 [max(基準日, since), until] 之間的 ChoreOccurrence (尚未存檔)"""
+    from .models import Chore, ChoreOccurrence
+
+    if not chores:
+        return []
+    last, freq, created = chore_arrays(chores)
+    # 不回推：從上次完成後的第一個到期日開始
+    occ = expand_cycles(last, freq, since or date.min, until + timedelta(days=1),
+                        created_at=created, rewind=False)
+    if since is not None:
+        keep = occ.due >= np.datetime64(since, 'D')
+        occ = Occurrences(index=occ.index[keep], due=occ.due[keep], cycle=occ.cycle[keep])
+
+    cycles = [(chores[i], d) for i, d in zip(occ.index.tolist(), occ.dates())]
+    statuses = Chore.objects.resolve_cycle_statuses(cycles)
+
+    rows = []
+    for (chore, due), cycle in zip(cycles, occ.cycle.tolist()):
+        roster = chore.duty_roster or []
+        if not roster:
+            duty_user_id = None
+        elif chore.type == 'PRIVATE':
+            duty_user_id = roster[0]
+        else:
+            duty_user_id = roster[cycle % len(roster)]
+        rows.append(ChoreOccurrence(
+            chore_id=chore.id,
+            room_id=chore.room_id,
+            due_date=due,
+            duty_user_id=duty_user_id,
+            status='Done' if statuses[(chore.id, due)] == 'Done' else 'Pending',
+        ))
+    return rows
+
+
+def materialize_chores(chores, until=None, since=None):
+    """
+    重建這些家務的排程 (刪除舊資料列後重新產生)。
+    since：只刪除 due_date >= since 的資料列 (呼叫端確定舊排程沒有更早的資料列時使用)
+    """
+    from .models import Chore, ChoreOccurrence
+
+    chores = list(chores)
+    if not chores:
+        return 0
+    for chore in chores:
+        # 剛建立的物件 last_completed 可能還是 default 的 datetime (存進資料庫後才是 date)
+        if isinstance(chore.last_completed, datetime):
+            chore.last_completed = chore.last_completed.date()
+    until = until or horizon_end()
+    ids = [c.id for c in chores]
+    rows = _build_rows(chores, None, until)
+    stale = ChoreOccurrence.objects.filter(chore_id__in=ids)
+    if since is not None:
+        stale = stale.filter(due_date__gte=since)
+    with transaction.atomic():
+        stale.delete()
+        ChoreOccurrence.objects.bulk_create(rows, batch_size=1000)
+        Chore.objects.filter(id__in=ids).update(schedule_until=until)
+    for chore in chores:
+        chore.schedule_until = until
+    return len(rows)
+
+
+def extend_schedule(chores, until=None):
+    """
+    滾動期限延伸：已經物化過的家務只補上 (schedule_until, until] 的新資料列，
+    從未物化的家務則整個重建。
+    """
+    from .models import Chore, ChoreOccurrence
+
+    until = until or horizon_end()
+    fresh, partial = [], {}
+    for chore in chores:
+        if chore.schedule_until is None:
+            fresh.append(chore)
+        elif chore.schedule_until < until:
+            partial.setdefault(chore.schedule_until, []).append(chore)
+
+    created = materialize_chores(fresh, until)
+    for since, group in partial.items():
+        rows = _build_rows(group, since + timedelta(days=1), until)
+        with transaction.atomic():
+            ChoreOccurrence.objects.bulk_create(rows, batch_size=1000)
+            Chore.objects.filter(id__in=[c.id for c in group]).update(schedule_until=until)
+        for chore in group:
+            chore.schedule_until = until
+        created += len(rows)
+    return created
+
+
+def ensure_schedule(room, until):
+    """讀取前確認房間內所有家務都已物化到 until (平常只有一次查詢)"""
+    from .models import Chore
+
+    stale = list(
+        Chore.objects.filter(room=room)
+        .filter(Q(schedule_until__isnull=True) | Q(schedule_until__lt=until))
+    )
+    if stale:
+        extend_schedule(stale, max(until, horizon_end()))
+
+
+def rebuild_room(room):
+    """從頭重建一個房間的排程"""
+    from .models import Chore
+    return materialize_chores(Chore.objects.filter(room=room))
+
+
+def mark_done(record):
+    """新的完成紀錄：把該家務在完成當天的資料列標為 Done"""
+    from .models import ChoreOccurrence
+
+    ChoreOccurrence.objects.filter(
+        chore_id=record.chore_id,
+        due_date=timezone.localdate(record.completed_on),
+    ).update(status='Done')
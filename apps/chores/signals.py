@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, pre_delete, post_delete, pre_save, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.rooms.models import Room
+from .contributions import record_completion, record_days, recount
+from .models import Chore, ChoreRecord
+from .roster import refresh_rosters
+from .schedule import extend_schedule, materialize_chores, mark_done
+
+
+def _assignment_changed(chore_ids):
+    """負責成員變動：重建輪值名單，再重建排程 (輪值成員會變)"""
+    chore_ids = list(chore_ids)
+    if not chore_ids:
+        return
+    refresh_rosters(chore_ids)
+    materialize_chores(Chore.objects.filter(id__in=chore_ids))
+
+
+# ===============================================
+# 輪值名單維護：assigned_to 有任何變動就重建 duty_roster
+# ===============================================
+
+@receiver(m2m_changed, sender=Chore.assigned_to.through)
+def rebuild_duty_roster(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # user.assigned_chores.clear()：清除前先記下受影響的家務
+        instance._roster_chore_ids = list(instance.assigned_chores.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        _assignment_changed([instance.pk])
+        instance.duty_roster = Chore.objects.values_list('duty_roster', flat=True).get(pk=instance.pk)
+    elif action == 'post_clear':
+        _assignment_changed(getattr(instance, '_roster_chore_ids', []))
+    else:
+        _assignment_changed(pk_set or [])
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def remember_user_chores(sender, instance, **kwargs):
+    # 刪除使用者時 through 表會被 cascade 刪除，不會觸發 m2m_changed
+    instance._roster_chore_ids = list(instance.assigned_chores.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def drop_deleted_user_from_rosters(sender, instance, **kwargs):
+    _assignment_changed(getattr(instance, '_roster_chore_ids', []))
+
+
+# ===============================================
+# 排程 (ChoreOccurrence) 維護
+# ===============================================
+
+def _as_date(value):
+    # 剛建立的物件 last_completed 可能還是 default 的 datetime
+    return value.date() if isinstance(value, datetime) else value
+
+
+@receiver(pre_save, sender=Chore)
+def remember_previous_state(sender, instance, **kwargs):
+    """一次讀取舊的欄位，post_save 依此決定要不要重算彙總 / 重建排程"""
+    previous = None
+    if instance.pk:
+        previous = (
+            Chore.objects.filter(pk=instance.pk)
+            .values_list('type', 'room_id', 'frequency_days', 'last_completed').first()
+        )
+    instance._type_changed = previous is not None and previous[0] != instance.type
+    instance._schedule_since = None
+    if previous is not None:
+        new_last = _as_date(instance.last_completed)
+        current = (instance.type, instance.room_id, instance.frequency_days, new_last)
+        if previous != current:
+            # 排程從上次完成後的第一個到期日開始，新舊排程的資料列都不早於兩個起點中較早的那天
+            _, _, frequency, last_completed = previous
+            instance._schedule_since = min(
+                last_completed + timedelta(days=frequency),
+                new_last + timedelta(days=instance.frequency_days),
+            )
+
+
+@receiver(post_save, sender=Chore)
+def rebuild_chore_schedule(sender, instance, created, **kwargs):
+    if created:
+        # 新家務在設定負責成員時 (m2m post_add) 才物化，不在這裡先建一次；
+        # 沒有負責成員的家務由讀取時的 ensure_schedule 補上
+        return
+    since = getattr(instance, '_schedule_since', None)
+    if since is not None:
+        # 頻率、上次完成日、類型或房號改變：重建受影響的範圍
+        materialize_chores([instance], since=since)
+    else:
+        # 只改了名稱、區域等：排程不變，只在期限不足時往後補
+        extend_schedule([instance])
+
+
+@receiver(post_save, sender=ChoreRecord)
+def mark_occurrence_done(sender, instance, created, **kwargs):
+    if created:
+        mark_done(instance)
+
+
+@receiver(post_delete, sender=ChoreRecord)
+def restore_occurrence(sender, instance, origin=None, **kwargs):
+    # 只處理直接刪除紀錄的情況；刪除家務 / 房號時排程會一併 cascade 刪除
+    if isinstance(origin, ChoreRecord) or getattr(origin, 'model', None) is ChoreRecord:
+        chore = Chore.objects.filter(pk=instance.chore_id).first()
+        if chore:
+            materialize_chores([chore])
+
+
+# ===============================================
+# 每日貢獻彙總 (DailyContribution) 維護
+# ===============================================
+
+def _deleted_with_room(origin):
+    return isinstance(origin, Room) or getattr(origin, 'model', None) is Room
+
+
+@receiver(post_save, sender=ChoreRecord)
+def add_contribution(sender, instance, created, **kwargs):
+    if created:
+        record_completion(instance)
+
+
+@receiver(post_delete, sender=ChoreRecord)
+def remove_contribution(sender, instance, origin=None, **kwargs):
+    # 刪除家務時由 recount_deleted_chore 一次處理
+    if isinstance(origin, ChoreRecord) or getattr(origin, 'model', None) is ChoreRecord:
+        room_id = Chore.objects.filter(pk=instance.chore_id).values_list('room_id', flat=True).first()
+        if room_id:
+            recount([room_id], [timezone.localdate(instance.completed_on)])
+
+
+@receiver(pre_delete, sender=Chore)
+def remember_chore_days(sender, instance, origin=None, **kwargs):
+    # 房號一起刪除時彙總會 cascade 刪除，不必重新計數
+    if not _deleted_with_room(origin):
+        instance._contribution_days = record_days(instance.records.all())
+
+
+@receiver(post_delete, sender=Chore)
+def recount_deleted_chore(sender, instance, **kwargs):
+    recount([instance.room_id], getattr(instance, '_contribution_days', ()))
+
+
+@receiver(post_save, sender=Chore)
+def recount_type_change(sender, instance, created, **kwargs):
+    # 彙總以家務類型分類，類型改變時該家務所有完成日都要重算
+    if not created and getattr(instance, '_type_changed', False):
+        recount([instance.room_id], record_days(instance.records.all()))
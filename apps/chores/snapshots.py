@@ -0,0 +1,158 @@
+"""
+主頁儀表板快照 (Dashboard Snapshot)
+
+HomeView 的待辦、月曆、圓餅圖、成員貢獻只有在家務 / 完成紀錄 / 房間成員
+變動時才會改變，所以依 (room, user, 日期) 快取整份計算結果。
+
+- 失效方式：快照 key 包含房間版本號 (Room.version，見 apps.core.signals)，
+  任何寫入讓版本 +1 後舊的快照就不會再被讀到，不必逐一刪除。
+  版本號與資料在同一個交易中更新：交易提交前讀到的是舊版本與舊資料，
+  不會把提交前的內容存到新版本的 key 下。
+- 使用 Django cache framework (local-memory 或 file backend 皆可；
+  多個 worker 時請用 file backend 讓命中計數器共用)。
+- 命中 / 未命中次數也存在 cache 中，可由 dashboard_cache_stats 查看。
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+
+STATS_KEYS = ('dashboard-snapshot:hits', 'dashboard-snapshot:misses')
+
+
+def _cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+def _incr(key):
+    cache = _cache()
+    if cache.add(key, 1, timeout=None):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # key 剛好在 add 與 incr 之間過期
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def invalidate_room(room_id):
+    """強制房間內所有成員的快照重建 (版本號 +1；一般寫入由 signals 處理，這裡給測試 / 基準測試用)"""
+    from apps.rooms.models import Room
+
+    Room.bump_version(pk=room_id)
+
+
+# =========================
+# 區塊 (彼此獨立，可以分別計算)
+# =========================
+def todos_section(room, user):
+    """待辦家務 (F-2.1)"""
+    from .models import Chore
+
+    today_chores, overdue_chores = Chore.objects.get_my_todos(room, user)
+    return {'today_chores': today_chores, 'overdue_chores': overdue_chores}
+
+
+def calendar_section(room, user):
+    """月曆"""
+    from .models import Chore
+
+    calendar_events = []
+    for e in Chore.objects.format_for_calendar(room, user):
+        color = {
+            "Green": "green",
+            "Red": "red",
+            "Grey": "grey",
+        }.get(e["status"], "grey")
+
+        calendar_events.append({
+            "date": e["date"],
+            "title": e["title"],
+            "color": color,
+        })
+    return {'calendar_data': calendar_events}
+
+
+def pie_chart_section(room, user):
+    """個人統計 (Doughnut 圖)"""
+    from .models import Chore
+
+    return {'pie_chart_data': Chore.objects.get_my_completion_percentage(room, user)}
+
+
+def member_stats_section(room, user):
+    """成員貢獻統計 (近 30 天，讀每日彙總表)"""
+    from .models import DailyContribution
+
+    return {'member_stats': DailyContribution.objects.leaderboard(room, days=30)}
+
+
+# 區塊名稱 → (計算函式, 無法取得時的預設值)
+SECTIONS = {
+    'todos': (todos_section, {'today_chores': [], 'overdue_chores': []}),
+    'calendar': (calendar_section, {'calendar_data': []}),
+    'pie_chart': (pie_chart_section, {'pie_chart_data': None}),
+    'member_stats': (member_stats_section, {'member_stats': []}),
+}
+
+
+def build_dashboard(room, user):
+    """實際計算主頁的四個區塊 (不經過快取，依序計算)"""
+    snapshot = {}
+    for func, _ in SECTIONS.values():
+        snapshot.update(func(room, user))
+    return snapshot
+
+
+# =========================
+# 快取
+# =========================
+def snapshot_key(room, user):
+    from apps.rooms.models import Room
+
+    # request.room 可能是由 session 重建的 (沒有載入 version)，直接讀資料庫中已提交的版本號；
+    # 加上版本更新時間，房間被刪除後 id 重複使用 (SQLite) 也不會讀到舊房間的快照
+    version, changed_at = (
+        Room.objects.filter(pk=room.id).values_list('version', 'version_changed_at').first() or (0, None)
+    )
+    stamp = changed_at.timestamp() if changed_at else 0
+    return f'dashboard-snapshot:{room.id}:{user.id}:{date.today().isoformat()}:v{version}-{stamp}'
+
+
+def read_snapshot(key):
+    """讀取快照並記錄命中 / 未命中；沒有時回傳 None"""
+    snapshot = _cache().get(key)
+    _incr(STATS_KEYS[0] if snapshot is not None else STATS_KEYS[1])
+    return snapshot
+
+
+def store_snapshot(key, snapshot):
+    _cache().set(key, snapshot, getattr(settings, 'DASHBOARD_SNAPSHOT_TIMEOUT', 60 * 60 * 24))
+
+
+def get_dashboard_snapshot(room, user):
+    """讀取 (或建立) 今天的主頁快照"""
+    key = snapshot_key(room, user)
+    snapshot = read_snapshot(key)
+    if snapshot is None:
+        snapshot = build_dashboard(room, user)
+        store_snapshot(key, snapshot)
+    return snapshot
+
+
+def snapshot_stats():
+    """快照命中統計 {'hits', 'misses', 'hit_ratio'}"""
+    values = _cache().get_many(STATS_KEYS)
+    hits = values.get(STATS_KEYS[0], 0)
+    misses = values.get(STATS_KEYS[1], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_snapshot_stats():
+    _cache().delete_many(STATS_KEYS)
@@ -0,0 +1,89 @@
+"""
+家務統計的 Server-Sent Events 串流 (chore_stats_stream)
+
+- 連線後先送一次統計，之後只有房間資料版本 (Room.version) 或日期改變才再送
+- 同一個行程內的寫入透過 apps.core.broadcast 立即喚醒；其他 worker 的寫入
+  最晚在下一次 heartbeat 時以版本號 (一次索引查詢) 發現
+- 閒置的連線只是一個等待中的 coroutine；檢查版本號與計算統計時才借用預設執行緒池
+  (thread_sensitive=False) 的執行緒，前後以 close_old_connections() 依 CONN_MAX_AGE
+  歸還資料庫連線，不會排在全部請求共用的 thread-sensitive 執行緒後面，
+  也不會每個連線各佔一條資料庫連線，適合在 daphne 下維持大量閒置連線
+- 連線正在交易中 (測試的回滾交易) 時改在請求的執行緒查詢：未提交的資料只有同一條連線看得到
+- 事件 id 為「版本-日期」；瀏覽器重新連線時帶回 Last-Event-ID，資料沒變就不重送
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from apps.core.broadcast import get_broadcast
+from apps.rooms.models import Room
+from apps.rooms.realtime import room_group
+
+# 瀏覽器斷線後等待多久重新連線 (毫秒)
+RETRY_MS = 5000
+
+
+def _event_id(version):
+    return f'{version}-{timezone.localdate().isoformat()}'
+
+
+def _sse(event, data, event_id):
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def _room_version(room_id):
+    """房間目前的資料版本號，房間已刪除時為 None"""
+    return Room.objects.filter(id=room_id).values_list('version', flat=True).first()
+
+
+def _in_worker(func, *args):
+    """在執行緒池中執行一次查詢；前後清掉過期的連線 (等同一個請求的開始與結束)"""
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+async def _run(func, *args, isolated=True):
+    if isolated:
+        return await sync_to_async(_in_worker, thread_sensitive=False)(func, *args)
+    return await sync_to_async(func)(*args)
+
+
+async def stats_events(room, compute_stats, last_event_id=None):
+    """SSE 文字片段的 async generator (compute_stats(room) 為同步函式)；房間被刪除時結束"""
+    heartbeat = getattr(settings, 'CHORE_STATS_STREAM_HEARTBEAT', 15)
+    sent_id = last_event_id
+    yield f'retry: {RETRY_MS}\n\n'
+
+    isolated = not await sync_to_async(_in_transaction)()
+
+    async with get_broadcast().subscribe(room_group(room.id)) as queue:
+        while True:
+            version = await _run(_room_version, room.id, isolated=isolated)
+            if version is None:
+                return
+            event_id = _event_id(version)
+            if event_id != sent_id:
+                stats = await _run(compute_stats, room, isolated=isolated)
+                yield _sse('stats', stats, event_id)
+                sent_id = event_id
+
+            try:
+                await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # 註解行：讓代理伺服器與瀏覽器知道連線還活著
+                yield ': heartbeat\n\n'
+                continue
+            # 一次寫入可能觸發多個事件，合併成一次重新計算
+            while not queue.empty():
+                queue.get_nowait()
@@ -1,3 +1,1305 @@
-from django.test import TestCase
+import json
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.rooms.models import Room
+from .models import Chore, ChoreOccurrence, ChoreRecord, CompletionRequest, DailyContribution
+from .occurrences import expand_cycles, chore_arrays
+from .roster import DutyRoster, refresh_rosters
+from .schedule import rebuild_room, extend_schedule, mark_done
+from . import contributions
+from .completion import request_fingerprint
+from .dashboard import abuild_dashboard
+from .importer import ChoreImportError, ImportResult, import_chores, read_rows
+from .snapshots import SECTIONS, build_dashboard, snapshot_key, snapshot_stats
+from . import streams
+from .streams import stats_events
+from .views import room_chore_stats
+
+
+# ===============================================
+# 舊版迴圈 (作為等價測試的基準)
+# ===============================================
+
+def legacy_iter_chore_cycles(last_completed, freq, start, end):
+    """原本 ChoreManager.iter_chore_cycles 的逐日迴圈"""
+    if not freq or freq <= 0:
+        return
+    if last_completed:
+        base_due = last_completed + timedelta(days=freq)
+    else:
+        base_due = start
+    cur = base_due
+    while cur - timedelta(days=freq) >= start:
+        cur -= timedelta(days=freq)
+    while cur < end:
+        yield cur
+        cur += timedelta(days=freq)
+
+
+def legacy_list_view_cycles(last_completed, freq, end):
+    """原本 ChoreListView.get_context_data 內的迴圈 (不回推)"""
+    if not last_completed:
+        return
+    due = last_completed + timedelta(days=freq)
+    while due < end:
+        yield due
+        due += timedelta(days=freq)
+
+
+class FakeChore:
+    def __init__(self, last_completed, frequency_days, created_at):
+        self.last_completed = last_completed
+        self.frequency_days = frequency_days
+        self.created_at = created_at
+
+
+class OccurrenceEngineTests(SimpleTestCase):
+    """向量化引擎必須與舊版迴圈逐一相同"""
+
+    def setUp(self):
+        self.rng = random.Random(20251220)
+        self.today = date(2025, 12, 20)
+
+    def random_chores(self, n):
+        chores = []
+        for _ in range(n):
+            last = self.today - timedelta(days=self.rng.randint(-40, 1200))
+            freq = self.rng.choice([1, 1, 2, 3, 7, 14, 30, 45])
+            created = last - timedelta(days=self.rng.randint(0, 400))
+            chores.append(FakeChore(last, freq, created))
+        return chores
+
+    def test_matches_legacy_generator(self):
+        chores = self.random_chores(300)
+        for _ in range(20):
+            start = self.today - timedelta(days=self.rng.randint(0, 90))
+            end = start + timedelta(days=self.rng.randint(0, 120))
+
+            last, freq, created = chore_arrays(chores)
+            occ = expand_cycles(last, freq, start, end, created_at=created)
+            got = {}
+            for i, d in zip(occ.index.tolist(), occ.dates()):
+                got.setdefault(i, []).append(d)
+
+            for i, chore in enumerate(chores):
+                expected = list(legacy_iter_chore_cycles(
+                    chore.last_completed, chore.frequency_days, start, end))
+                self.assertEqual(got.get(i, []), expected, (i, start, end))
+
+    def test_matches_legacy_list_view_loop(self):
+        chores = self.random_chores(200)
+        start = self.today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+
+        last, freq, _ = chore_arrays(chores)
+        occ = expand_cycles(last, freq, start, end, rewind=False)
+        got = {}
+        for i, d in zip(occ.index.tolist(), occ.dates()):
+            got.setdefault(i, []).append(d)
+
+        for i, chore in enumerate(chores):
+            expected = list(legacy_list_view_cycles(
+                chore.last_completed, chore.frequency_days, end))
+            self.assertEqual(got.get(i, []), expected)
+
+    def test_cycle_number_matches_rotation(self):
+        chore = FakeChore(date(2025, 1, 1), 3, date(2024, 12, 5))
+        last, freq, created = chore_arrays([chore])
+        occ = expand_cycles(last, freq, date(2025, 1, 1), date(2025, 3, 1), created_at=created)
+        for d, cycle in zip(occ.dates(), occ.cycle.tolist()):
+            self.assertEqual(cycle, (d - chore.created_at).days // chore.frequency_days)
+
+    def test_missing_and_zero_frequency(self):
+        chores = [
+            FakeChore(None, 7, None),
+            FakeChore(date(2025, 12, 1), 0, None),
+        ]
+        start, end = date(2025, 12, 1), date(2026, 1, 1)
+        last, freq, _ = chore_arrays(chores)
+
+        skipped = expand_cycles(last, freq, start, end)
+        self.assertEqual(len(skipped), 0)
+
+        occ = expand_cycles(last, freq, start, end, missing_base=start)
+        expected = list(legacy_iter_chore_cycles(None, 7, start, end))
+        self.assertEqual(list(occ.dates()), expected)
+
+    def test_empty_input(self):
+        occ = expand_cycles([], [], date(2025, 1, 1), date(2025, 2, 1))
+        self.assertEqual(len(occ), 0)
+
+
+class CalendarEquivalenceTests(TestCase):
+    """format_for_calendar 換成引擎後，事件清單不變"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username='amy', email='amy@example.com', password='pw')
+        cls.room = Room.objects.create(room_number='101', password='x')
+        cls.room.members.add(cls.user)
+        today = date.today()
+        for i, (ago, freq) in enumerate([(3, 1), (0, 7), (45, 3), (1100, 1), (-5, 14)]):
+            chore = Chore.objects.create(
+                room=cls.room, title=f'chore-{i}', frequency_days=freq,
+                last_completed=today - timedelta(days=ago),
+            )
+            chore.assigned_to.add(cls.user)
+
+    def legacy_calendar(self, lookahead_days=60):
+        today = date.today()
+        start_date = today.replace(day=1)
+        end_date = today + timedelta(days=lookahead_days)
+        events = []
+        for chore in Chore.objects.filter(room=self.room):
+            freq = chore.frequency_days
+            cur_due = Chore.objects.get_due_date(chore)
+            while cur_due - timedelta(days=freq) >= start_date:
+                cur_due -= timedelta(days=freq)
+            while cur_due <= end_date:
+                status = Chore.objects.get_status_by_date(chore, cur_due)
+                if status != 'Done':
+                    events.append({
+                        'date': cur_due.isoformat(),
+                        'status': status,
+                        'title': chore.title,
+                        'is_public': chore.type == 'PUBLIC',
+                    })
+                cur_due += timedelta(days=freq)
+        return events
+
+    def test_format_for_calendar_unchanged(self):
+        events = Chore.objects.format_for_calendar(self.room, self.user)
+        key = lambda e: (e['title'], e['date'])
+        self.assertEqual(sorted(events, key=key), sorted(self.legacy_calendar(), key=key))
+
+
+def make_room(number='101', members=1):
+    User = get_user_model()
+    room = Room.objects.create(room_number=number, password='x')
+    users = [
+        User.objects.create_user(
+            username=f'{number}-u{i}', email=f'{number}-u{i}@example.com', password='pw'
+        )
+        for i in range(members)
+    ]
+    room.members.add(*users)
+    return room, users
+
+
+class BatchedStatusTests(TestCase):
+    """resolve_statuses 與舊版逐筆查詢結果一致，且查詢數固定"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, (cls.user,) = make_room()
+        cls.today = date.today()
+        cls.chores = []
+        for i, (ago, freq) in enumerate([(0, 1), (1, 1), (3, 1), (7, 7), (2, 7), (10, 3), (-3, 5)]):
+            chore = Chore.objects.create(
+                room=cls.room, title=f'c{i}', frequency_days=freq,
+                last_completed=cls.today - timedelta(days=ago),
+            )
+            chore.assigned_to.add(cls.user)
+            cls.chores.append(chore)
+        # 今天完成一筆、前天完成一筆
+        for chore, ago in [(cls.chores[1], 0), (cls.chores[5], 2)]:
+            record = ChoreRecord.objects.create(chore=chore, completed_by=cls.user)
+            ChoreRecord.objects.filter(pk=record.pk).update(
+                completed_on=timezone.now() - timedelta(days=ago))
+
+    def legacy_status(self, chore):
+        due_date = Chore.objects.get_due_date(chore)
+        if chore.records.filter(completed_on__date=self.today).exists():
+            return 'Done'
+        if due_date < self.today:
+            return 'Red'
+        return 'Green' if due_date == self.today else 'Grey'
+
+    def legacy_status_by_date(self, chore, target):
+        if chore.records.filter(completed_on__date=target).exists():
+            return 'Done'
+        if chore.last_completed and target <= chore.last_completed:
+            return 'Done'
+        if target < self.today:
+            return 'Red'
+        if target == self.today:
+            return 'Red' if self.today > Chore.objects.get_due_date(chore) else 'Green'
+        return 'Grey'
+
+    def test_today_statuses_match_legacy(self):
+        statuses = Chore.objects.resolve_statuses(Chore.objects.filter(room=self.room))
+        for chore in self.chores:
+            self.assertEqual(statuses[(chore.id, self.today)], self.legacy_status(chore))
+
+    def test_dated_statuses_match_legacy(self):
+        dates = [self.today + timedelta(days=d) for d in range(-4, 4)]
+        statuses = Chore.objects.resolve_statuses(self.chores, dates)
+        for chore in self.chores:
+            for d in dates:
+                self.assertEqual(statuses[(chore.id, d)], self.legacy_status_by_date(chore, d))
+
+    def test_prefetched_records_are_reused(self):
+        chores = list(Chore.objects.filter(room=self.room).prefetch_related('records'))
+        with self.assertNumQueries(0):
+            statuses = Chore.objects.resolve_statuses(chores)
+        self.assertEqual(statuses, Chore.objects.resolve_statuses(self.chores))
+
+
+class ConstantQueryTests(TestCase):
+    """200 個家務的房間，統計與清單的查詢數不隨家務數量增加"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, (cls.user,) = make_room()
+        today = date.today()
+        chores = Chore.objects.bulk_create([
+            Chore(room=cls.room, title=f'c{i}', frequency_days=1 + i % 7,
+                  last_completed=today - timedelta(days=i % 11))
+            for i in range(200)
+        ])
+        Chore.assigned_to.through.objects.bulk_create([
+            Chore.assigned_to.through(chore_id=c.id, user_id=cls.user.id) for c in chores
+        ])
+        ChoreRecord.objects.bulk_create([
+            ChoreRecord(chore=c, completed_by=cls.user) for c in chores[::3]
+        ])
+        refresh_rosters([c.id for c in chores])
+        rebuild_room(cls.room)
+
+    def test_manager_methods(self):
+        with self.assertNumQueries(2):
+            Chore.objects.get_completion_percentage(self.room)
+        with self.assertNumQueries(2):
+            Chore.objects.get_my_completion_percentage(self.room, self.user)
+        with self.assertNumQueries(3):
+            Chore.objects.get_chore_list_data(self.room)
+        with self.assertNumQueries(2):
+            Chore.objects.format_for_calendar(self.room, self.user)
+
+    def test_stats_api(self):
+        self.client.force_login(self.user)
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+        self.client.get('/chores/api/stats/')  # 第一次請求驗證成員資格並記在 session
+        with self.assertNumQueries(5):  # session + user + 版本號 + 家務 + 紀錄
+            response = self.client.get('/chores/api/stats/')
+        self.assertEqual(response.json()['total'], 200)
+
+
+class DutyRosterTests(TestCase):
+    """duty_roster 與舊版 assigned_to.order_by('id') 輪替結果一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, cls.users = make_room(members=4)
+        cls.chore = Chore.objects.create(room=cls.room, title='trash', frequency_days=3)
+        cls.chore.assigned_to.add(*cls.users[:3])
+
+    def legacy_duty_user(self, chore, at_date):
+        members = chore.assigned_to.all().order_by('id')
+        count = members.count()
+        if count == 0:
+            return None
+        if chore.type == 'PRIVATE':
+            return members.first()
+        cycle_number = (at_date - chore.created_at.date()).days // chore.frequency_days
+        return members[cycle_number % count]
+
+    def assert_matches_legacy(self):
+        chore = Chore.objects.get(pk=self.chore.pk)
+        for offset in range(-10, 40):
+            at = date.today() + timedelta(days=offset)
+            expected = self.legacy_duty_user(chore, at)
+            self.assertEqual(chore.get_current_duty_user(at), expected)
+
+    def test_roster_follows_assignment_changes(self):
+        self.assertEqual(self.chore.duty_roster, [u.id for u in self.users[:3]])
+        self.assert_matches_legacy()
+
+        self.chore.assigned_to.remove(self.users[1])
+        self.assert_matches_legacy()
+
+        self.users[3].assigned_chores.add(self.chore)
+        self.assert_matches_legacy()
+
+        self.chore.assigned_to.set([self.users[2], self.users[0]])
+        self.assert_matches_legacy()
+
+        self.users[0].assigned_chores.clear()
+        self.assertEqual(Chore.objects.get(pk=self.chore.pk).duty_roster, [self.users[2].id])
+
+        self.users[2].delete()
+        self.assertEqual(Chore.objects.get(pk=self.chore.pk).duty_roster, [])
+        self.assert_matches_legacy()
+
+    def test_chores_on_duty_matches_brute_force(self):
+        chores = [self.chore]
+        for i, freq in enumerate([1, 2, 5, 7]):
+            chore = Chore.objects.create(
+                room=self.room, title=f'r{i}', frequency_days=freq,
+                last_completed=date.today() - timedelta(days=i * 4),
+                type='PRIVATE' if i == 3 else 'PUBLIC',
+            )
+            chore.assigned_to.add(*self.users[i % 2:])
+            chores.append(chore)
+
+        roster = DutyRoster.for_room(self.room)
+        start, end = date.today() - timedelta(days=5), date.today() + timedelta(days=30)
+        for user in self.users:
+            expected = []
+            for chore in Chore.objects.filter(room=self.room):
+                for due in Chore.objects.iter_chore_cycles(chore, start, end + timedelta(days=1)):
+                    if due >= start and self.legacy_duty_user(chore, due) == user:
+                        expected.append((chore.id, due))
+            got = [(c.id, d) for c, d in roster.chores_on_duty(user.id, start, end)]
+            self.assertEqual(sorted(got), sorted(expected))
+
+
+class DutyRosterBenchmarkTests(TestCase):
+    """數百個家務的房間：輪值計算不做任何逐筆查詢"""
+
+    CHORES = 400
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, cls.users = make_room(members=6)
+        today = date.today()
+        chores = Chore.objects.bulk_create([
+            Chore(room=cls.room, title=f'c{i}', frequency_days=1 + i % 10,
+                  last_completed=today - timedelta(days=i % 13))
+            for i in range(cls.CHORES)
+        ])
+        through = Chore.assigned_to.through
+        through.objects.bulk_create([
+            through(chore_id=c.id, user_id=u.id)
+            for i, c in enumerate(chores) for u in cls.users[i % 3:]
+        ])
+        refresh_rosters([c.id for c in chores])
+
+    def test_my_todos_query_count(self):
+        user = self.users[0]
+        with self.assertNumQueries(2):  # 家務 + 完成紀錄
+            today_list, overdue_list = Chore.objects.get_my_todos(self.room, user)
+        todos = today_list + overdue_list
+        self.assertTrue(todos)
+        self.assertTrue(all(c.get_duty_user_id(date.today()) == user.id for c in todos))
+
+    def test_room_duty_window(self):
+        today = date.today()
+        end = today + timedelta(days=90)
+        with self.assertNumQueries(1):
+            roster = DutyRoster.for_room(self.room)
+            duty = roster.duty_map(today)
+            windows = [roster.chores_on_duty(user.id, today, end) for user in self.users]
+        self.assertEqual(len(duty), self.CHORES)
+        # 每個到期日恰好分給一位成員：各成員的結果合起來等於整個房間展開的週期
+        chores = list(Chore.objects.filter(room=self.room))
+        last, freq, created = chore_arrays(chores)
+        occ = expand_cycles(last, freq, today, end + timedelta(days=1), created_at=created)
+        expected = sorted(
+            (chores[i].id, d) for i, d, keep in
+            zip(occ.index.tolist(), occ.dates(), (occ.due >= np.datetime64(today, 'D')).tolist()) if keep
+        )
+        got = sorted((c.id, d) for window in windows for c, d in window)
+        self.assertEqual(got, expected)
+
+
+class ChoreOccurrenceTests(TestCase):
+    """物化排程隨家務 / 完成紀錄更新，且與即時計算結果一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, cls.users = make_room(members=2)
+        cls.today = date.today()
+        cls.chore = Chore.objects.create(
+            room=cls.room, title='dishes', frequency_days=2,
+            last_completed=cls.today - timedelta(days=5),
+        )
+        cls.chore.assigned_to.add(*cls.users)
+
+    def expected_dates(self, chore, until):
+        return [
+            d for _, d in Chore.objects.expand_cycles(
+                [chore], chore.next_due_date, until + timedelta(days=1), rewind=False)
+        ]
+
+    def test_rows_follow_engine_and_roster(self):
+        chore = Chore.objects.get(pk=self.chore.pk)
+        rows = list(chore.occurrences.order_by('due_date'))
+        self.assertEqual([r.due_date for r in rows], self.expected_dates(chore, chore.schedule_until))
+        for row in rows:
+            self.assertEqual(row.duty_user_id, chore.get_duty_user_id(row.due_date))
+            self.assertEqual(row.room_id, self.room.id)
+
+    def test_edit_rebuilds_schedule(self):
+        chore = Chore.objects.get(pk=self.chore.pk)
+        chore.frequency_days = 7
+        chore.save()
+        dates = list(chore.occurrences.values_list('due_date', flat=True))
+        self.assertEqual(dates, self.expected_dates(chore, chore.schedule_until))
+
+    def test_edit_to_shorter_frequency_drops_stale_rows(self):
+        chore = Chore.objects.get(pk=self.chore.pk)
+        chore.frequency_days = 1
+        chore.save()
+        dates = list(chore.occurrences.values_list('due_date', flat=True))
+        self.assertEqual(dates, self.expected_dates(chore, chore.schedule_until))
+
+    def test_unrelated_edit_keeps_schedule(self):
+        chore = Chore.objects.get(pk=self.chore.pk)
+        before = list(chore.occurrences.order_by('due_date').values_list('id', flat=True))
+        chore.title = 'washing up'
+        chore.private_area = 'sink'
+        # pre_save 讀一次舊值 + UPDATE 家務 + 房號版本遞增，不重建排程
+        with self.assertNumQueries(3):
+            chore.save()
+        after = list(chore.occurrences.order_by('due_date').values_list('id', flat=True))
+        self.assertEqual(after, before)
+
+    def test_create_materializes_once(self):
+        chore = Chore.objects.create(
+            room=self.room, title='trash', frequency_days=3,
+            last_completed=self.today - timedelta(days=1),
+        )
+        self.assertFalse(chore.occurrences.exists())
+        chore.assigned_to.add(*self.users)
+        chore.refresh_from_db()
+        dates = list(chore.occurrences.values_list('due_date', flat=True))
+        self.assertEqual(dates, self.expected_dates(chore, chore.schedule_until))
+
+    def test_completion_view_updates_schedule(self):
+        self.client.force_login(self.users[0])
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+        response = self.client.post(f'/chores/complete/{self.chore.pk}/')
+        self.assertEqual(response.json()['status'], 'success')
+
+        chore = Chore.objects.get(pk=self.chore.pk)
+        first = chore.occurrences.order_by('due_date').first()
+        self.assertEqual(first.due_date, chore.next_due_date)
+        self.assertFalse(chore.occurrences.filter(due_date__lte=chore.last_completed).exists())
+
+    def test_record_marks_row_done(self):
+        row = self.chore.occurrences.order_by('due_date').first()
+        record = ChoreRecord.objects.create(chore=self.chore, completed_by=self.users[0])
+        ChoreRecord.objects.filter(pk=record.pk).update(
+            completed_on=timezone.now().replace(
+                year=row.due_date.year, month=row.due_date.month, day=row.due_date.day, hour=12))
+        record.refresh_from_db()
+        mark_done(record)
+        row.refresh_from_db()
+        self.assertEqual(row.status, 'Done')
+
+        record.delete()
+        self.assertEqual(self.chore.occurrences.get(due_date=row.due_date).status, 'Pending')
+
+    def test_horizon_extension_and_rebuild_command(self):
+        chore = Chore.objects.get(pk=self.chore.pk)
+        until = chore.schedule_until + timedelta(days=30)
+        extend_schedule([chore], until)
+        dates = list(chore.occurrences.order_by('due_date').values_list('due_date', flat=True))
+        self.assertEqual(dates, self.expected_dates(chore, until))
+
+        ChoreOccurrence.objects.all().delete()
+        call_command('rebuild_chore_schedule', str(self.room.id), stdout=StringIO())
+        self.assertTrue(chore.occurrences.exists())
+
+        call_command('extend_chore_schedule', '--days', '200', stdout=StringIO())
+        chore.refresh_from_db()
+        self.assertEqual(chore.schedule_until, self.today + timedelta(days=200))
+
+    def test_duty_schedule_uses_materialized_rows(self):
+        start, end = self.today, self.today + timedelta(days=20)
+        for user in self.users:
+            got = [o.due_date for o in Chore.objects.duty_schedule(user, start, end)]
+            expected = [
+                d for c, d in DutyRoster.for_room(self.room).chores_on_duty(
+                    user.id, start, end - timedelta(days=1))
+            ]
+            self.assertEqual(got, expected)
+
+
+class DashboardSnapshotTests(TestCase):
+    """主頁快照：同一天重複瀏覽命中快取，資料變動後失效"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, cls.users = make_room(members=2)
+        cls.chore = Chore.objects.create(
+            room=cls.room, title='floor', frequency_days=1,
+            last_completed=date.today() - timedelta(days=1),
+        )
+        cls.chore.assigned_to.add(cls.users[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.users[0])
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def get_home(self):
+        response = self.client.get('/chores/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hit_after_first_view(self):
+        self.get_home()
+        self.assertEqual(snapshot_stats(), {'hits': 0, 'misses': 1, 'hit_ratio': 0.0})
+        response = self.get_home()
+        self.assertEqual(snapshot_stats()['hits'], 1)
+        self.assertEqual([c.id for c in response.context['today_chores']], [self.chore.id])
+
+    def test_invalidated_by_writes(self):
+        self.get_home()
+        ChoreRecord.objects.create(chore=self.chore, completed_by=self.users[0])
+        self.get_home()
+        self.assertEqual(snapshot_stats()['misses'], 2)
+
+        self.chore.assigned_to.add(self.users[1])
+        self.get_home()
+        self.assertEqual(snapshot_stats()['misses'], 3)
+
+        User = get_user_model()
+        newcomer = User.objects.create_user(username='new', email='new@example.com', password='pw')
+        self.room.members.add(newcomer)
+        self.get_home()
+        self.assertEqual(snapshot_stats()['misses'], 4)
+
+    def test_key_follows_room_version(self):
+        # key 只由資料庫中已提交的版本號決定 (與資料同一個交易更新)，不依賴快取中的計數
+        key = snapshot_key(self.room, self.users[0])
+        cache.clear()
+        self.assertEqual(snapshot_key(self.room, self.users[0]), key)
+        ChoreRecord.objects.create(chore=self.chore, completed_by=self.users[0])
+        self.assertNotEqual(snapshot_key(self.room, self.users[0]), key)
+
+    def test_stats_endpoint_requires_staff(self):
+        self.assertEqual(self.client.get('/chores/api/dashboard-cache/').status_code, 403)
+        get_user_model().objects.filter(pk=self.users[0].pk).update(is_staff=True)
+        self.get_home()
+        self.assertEqual(self.client.get('/chores/api/dashboard-cache/').json()['misses'], 1)
+
+
+class AsyncDashboardTests(TransactionTestCase):
+    """主頁區塊在執行緒池中同時計算；逾時的區塊以預設值顯示且不寫入快照"""
+
+    def setUp(self):
+        cache.clear()
+        self.room, self.users = make_room(members=2)
+        self.chore = Chore.objects.create(
+            room=self.room, title='floor', frequency_days=1,
+            last_completed=date.today() - timedelta(days=1),
+        )
+        self.chore.assigned_to.add(self.users[0])
+        self.client.force_login(self.users[0])
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def patched_sections(self, **replacements):
+        sections = dict(SECTIONS)
+        for name, func in replacements.items():
+            sections[name] = (func, SECTIONS[name][1])
+        return mock.patch.dict('apps.chores.snapshots.SECTIONS', sections)
+
+    def test_sections_run_concurrently_in_pool(self):
+        threads = {}
+        # 每個區塊都要等到四個區塊同時在執行才能通過；依序計算時會在 timeout 後中斷
+        barrier = threading.Barrier(len(SECTIONS), timeout=5)
+
+        def tracked(name):
+            func = SECTIONS[name][0]
+
+            def run(room, user):
+                threads[name] = threading.current_thread().name
+                barrier.wait()
+                return func(room, user)
+            return run
+
+        with self.patched_sections(**{name: tracked(name) for name in SECTIONS}):
+            snapshot, unavailable = async_to_sync(abuild_dashboard)(self.room, self.users[0])
+
+        self.assertEqual(unavailable, [])
+        self.assertFalse(barrier.broken)
+        self.assertEqual(set(threads), set(SECTIONS))
+        self.assertEqual(len(set(threads.values())), len(SECTIONS))
+        self.assertTrue(all(name.startswith('dashboard-section') for name in threads.values()))
+
+        expected = build_dashboard(self.room, self.users[0])
+        self.assertEqual([c.id for c in snapshot['today_chores']], [self.chore.id])
+        self.assertEqual(snapshot['calendar_data'], expected['calendar_data'])
+        self.assertEqual(snapshot['pie_chart_data'], expected['pie_chart_data'])
+        self.assertEqual(snapshot['member_stats'], expected['member_stats'])
+
+    @override_settings(DASHBOARD_SECTION_TIMEOUT=0.5)
+    def test_queue_time_not_counted(self):
+        # 只有一個執行緒：後面的區塊要排隊約 0.6 秒，但各自只執行 0.2 秒
+        def slow(name):
+            func = SECTIONS[name][0]
+
+            def run(room, user):
+                time.sleep(0.2)
+                return func(room, user)
+            return run
+
+        pool = ThreadPoolExecutor(max_workers=1)
+        try:
+            with self.patched_sections(**{name: slow(name) for name in SECTIONS}), \
+                    mock.patch('apps.chores.dashboard._executor', pool):
+                _, unavailable = async_to_sync(abuild_dashboard)(self.room, self.users[0])
+        finally:
+            pool.shutdown()
+        self.assertEqual(unavailable, [])
+
+    @override_settings(DASHBOARD_SECTION_TIMEOUT=0.1)
+    def test_slow_section_degrades(self):
+        def slow(room, user):
+            time.sleep(0.5)
+            return {'pie_chart_data': {'completed': 1}}
+
+        with self.patched_sections(pie_chart=slow), self.assertLogs('apps.chores.dashboard', 'WARNING'):
+            response = self.client.get('/chores/dashboard/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['unavailable_sections'], ['完成率'])
+            self.assertIsNone(response.context['pie_chart_data'])
+            self.assertEqual([c.id for c in response.context['today_chores']], [self.chore.id])
+            self.assertContains(response, 'dashboard-degraded')
+
+        # 不完整的結果沒有寫入快照
+        response = self.client.get('/chores/dashboard/')
+        self.assertEqual(response.context['unavailable_sections'], [])
+        self.assertEqual(snapshot_stats()['misses'], 2)
+
+    def test_anonymous_redirects_to_login(self):
+        self.client.logout()
+        response = self.client.get('/chores/dashboard/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('next=/chores/dashboard/', response['Location'])
+
+
+class BulkCompletionTests(TestCase):
+    """批次完成：同一個交易、固定查詢數，維護結果與逐筆完成相同"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, cls.users = make_room(members=2)
+        cls.other_room, _ = make_room(number='202')
+        last = date.today() - timedelta(days=3)
+        cls.chores = [
+            Chore.objects.create(room=cls.room, title=f'chore {k}', frequency_days=1 + k % 3,
+                                 last_completed=last)
+            for k in range(8)
+        ]
+        for chore in cls.chores:
+            chore.assigned_to.add(*cls.users)
+        cls.foreign = Chore.objects.create(room=cls.other_room, title='foreign', frequency_days=1)
+
+    def setUp(self):
+        self.client.force_login(self.users[0])
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def post(self, chore_ids):
+        return self.client.post('/chores/complete/', json.dumps({'chore_ids': chore_ids}),
+                                content_type='application/json')
+
+    def test_completes_all_in_one_request(self):
+        ids = [c.id for c in self.chores[:5]]
+        version = Room.objects.get(pk=self.room.pk).version
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(ids)
+        data = response.json()
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual([c['id'] for c in data['chores']], ids)
+        self.assertEqual({c['status'] for c in data['chores']}, {'Done'})
+        self.assertEqual(data['stats']['total'], 8)
+
+        today = timezone.localdate()
+        self.assertEqual(ChoreRecord.objects.filter(chore_id__in=ids, completed_by=self.users[0]).count(), 5)
+        for chore in Chore.objects.filter(id__in=ids):
+            self.assertEqual(chore.last_completed, today)
+            # 與 ChoreCompleteView 相同：排程從下一次到期日重新開始
+            self.assertEqual(chore.occurrences.order_by('due_date').first().due_date, chore.next_due_date)
+        self.assertEqual(DailyContribution.objects.totals(self.room, self.users[0])['all'], 5)
+        self.assertEqual(Room.objects.get(pk=self.room.pk).version, version + 1)
+
+    def test_query_count_independent_of_batch_size(self):
+        # 第一次請求另外包含房間解析與建立當天的彙總列
+        self.post([self.chores[0].id])
+        counts = []
+        for ids in ([self.chores[1].id, self.chores[2].id], [c.id for c in self.chores[3:]]):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.post(ids).status_code, 200)
+            # 排程列的 INSERT 依資料庫的參數上限分批，與家務數無關
+            counts.append(len([
+                q for q in queries.captured_queries
+                if not q['sql'].startswith('INSERT INTO "chores_choreoccurrence"')
+            ]))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_foreign_chore_rejects_whole_batch(self):
+        response = self.post([self.chores[0].id, self.foreign.id, 999999])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['missing'], sorted([self.foreign.id, 999999]))
+        self.assertFalse(ChoreRecord.objects.exists())
+        self.assertNotEqual(Chore.objects.get(pk=self.chores[0].pk).last_completed, timezone.localdate())
+
+    def test_invalid_payload(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post(['x']).status_code, 400)
+        self.assertEqual(self.client.post('/chores/complete/', 'nope', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.get('/chores/complete/').status_code, 405)
+
+    def test_single_view_uses_same_path(self):
+        self.assertEqual(self.client.post(f'/chores/complete/{self.foreign.id}/').status_code, 404)
+        response = self.client.post(f'/chores/complete/{self.chores[0].id}/')
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(DailyContribution.objects.totals(self.room, self.users[0])['all'], 1)
+
+
+class IdempotentCompletionTests(TestCase):
+    """Idempotency-Key 重送只完成一次；版本號不符時整批回滾"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, cls.users = make_room(members=2)
+        cls.chores = [
+            Chore.objects.create(room=cls.room, title=f'chore {k}', frequency_days=2,
+                                 last_completed=date.today() - timedelta(days=3))
+            for k in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.users[0])
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def post(self, chore_ids, key=None):
+        headers = {'Idempotency-Key': key} if key else {}
+        return self.client.post('/chores/complete/', json.dumps({'chore_ids': chore_ids}),
+                                content_type='application/json', headers=headers)
+
+    def test_replay_returns_first_result(self):
+        ids = [c.id for c in self.chores[:2]]
+        first = self.post(ids, key='k-1')
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', first)
+
+        second = self.post(ids, key='k-1')
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(ChoreRecord.objects.count(), 2)
+        self.assertEqual(DailyContribution.objects.totals(self.room, self.users[0])['all'], 2)
+
+        # 不同的 key 是新的請求；key 只在同一個成員內有效
+        self.assertEqual(self.post(ids, key='k-2').status_code, 200)
+        self.assertEqual(ChoreRecord.objects.count(), 4)
+
+    def test_single_view_honours_key(self):
+        url = f'/chores/complete/{self.chores[0].id}/'
+        for _ in range(3):
+            self.client.post(url, headers={'Idempotency-Key': 'double-click'})
+        self.assertEqual(ChoreRecord.objects.count(), 1)
+
+    def test_key_reused_for_different_request(self):
+        ids = [c.id for c in self.chores[:2]]
+        first = self.post(ids, key='k-1')
+        self.assertEqual(first.status_code, 200)
+        # 同一組家務 (順序不同) 是重送
+        replay = self.post(ids[::-1], key='k-1')
+        self.assertEqual((replay['Idempotent-Replayed'], replay.json()), ('true', first.json()))
+
+        # 不同的家務、或同一個家務改走單筆完成的路徑：422，不執行也不回傳第一次的結果
+        for response in (
+            self.post([self.chores[2].id], key='k-1'),
+            self.client.post(f'/chores/complete/{ids[0]}/', headers={'Idempotency-Key': 'k-1'}),
+        ):
+            self.assertEqual(response.status_code, 422)
+            self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(ChoreRecord.objects.count(), 2)
+        self.assertEqual(CompletionRequest.objects.get().fingerprint,
+                         request_fingerprint('/chores/complete/', self.room, ids))
+
+    def test_failed_request_does_not_store_key(self):
+        self.assertEqual(self.post([999999], key='retry').status_code, 404)
+        self.assertFalse(CompletionRequest.objects.exists())
+        self.assertEqual(self.post([self.chores[0].id], key='retry').status_code, 200)
+        self.assertEqual(CompletionRequest.objects.get().status_code, 200)
+
+    def test_key_length_limit(self):
+        self.assertEqual(self.post([self.chores[0].id], key='x' * 65).status_code, 400)
+
+    def test_version_conflict_rolls_back(self):
+        target = self.chores[1]
+        real_bulk_create = ChoreRecord.objects.bulk_create
+
+        def racing(objs, *args, **kwargs):
+            # 讀取之後、更新之前，另一個 worker 完成了同一個家務
+            Chore.objects.filter(pk=target.pk).update(version=F('version') + 1)
+            return real_bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(ChoreRecord.objects, 'bulk_create', side_effect=racing):
+            response = self.post([c.id for c in self.chores], key='race')
+        self.assertEqual(response.status_code, 409)
+        # (模擬的並行寫入在同一個測試交易裡，會跟著回滾，這裡無法比對出是哪一個家務)
+        self.assertIn('conflicts', response.json())
+        self.assertFalse(ChoreRecord.objects.exists())
+        self.assertFalse(CompletionRequest.objects.exists())
+        self.assertEqual(
+            set(Chore.objects.values_list('last_completed', flat=True)), {date.today() - timedelta(days=3)}
+        )
+
+        # 同一個 key 重試 (衝突沒有存下結果) 可以完成
+        self.assertEqual(self.post([c.id for c in self.chores], key='race').status_code, 200)
+        self.assertEqual(Chore.objects.get(pk=target.pk).version, 1)
+
+    def test_update_touches_only_completion_columns(self):
+        # 讀取之後被改名：完成只寫 last_completed / version，不會把名稱蓋回去
+        real_bulk_create = ChoreRecord.objects.bulk_create
+
+        def rename(objs, *args, **kwargs):
+            Chore.objects.filter(pk=self.chores[0].pk).update(title='renamed')
+            return real_bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(ChoreRecord.objects, 'bulk_create', side_effect=rename):
+            self.assertEqual(self.post([self.chores[0].id]).status_code, 200)
+        chore = Chore.objects.get(pk=self.chores[0].pk)
+        self.assertEqual((chore.title, chore.last_completed), ('renamed', date.today()))
+
+    def test_prune_command(self):
+        self.post([self.chores[0].id], key='old')
+        CompletionRequest.objects.update(created_at=timezone.now() - timedelta(hours=25))
+        self.post([self.chores[1].id], key='new')
+        out = StringIO()
+        call_command('prune_completion_requests', stdout=out)
+        self.assertEqual(list(CompletionRequest.objects.values_list('key', flat=True)), ['new'])
+
+
+class ConditionalGetTests(TestCase):
+    """房間版本號：沒有寫入時清單頁與統計 API 回 304"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, cls.users = make_room(members=2)
+        cls.chore = Chore.objects.create(
+            room=cls.room, title='floor', frequency_days=1,
+            last_completed=date.today() - timedelta(days=1),
+        )
+        cls.chore.assigned_to.add(cls.users[0])
+
+    def setUp(self):
+        self.client.force_login(self.users[0])
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def test_not_modified_without_writes(self):
+        for url in ('/chores/', '/chores/api/stats/', '/chats/'):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertTrue(first['ETag'].startswith('W/"room-'))
+                # session + user + 房間版本號，不會執行任何家務計算
+                with self.assertNumQueries(3):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_writes_bump_version(self):
+        etag = self.client.get('/chores/api/stats/')['ETag']
+        version = Room.objects.get(pk=self.room.pk).version
+
+        ChoreRecord.objects.create(chore=self.chore, completed_by=self.users[0])
+        self.chore.assigned_to.add(self.users[1])
+        self.room.members.remove(self.users[1])
+        self.assertEqual(Room.objects.get(pk=self.room.pk).version, version + 3)
+
+        response = self.client.get('/chores/api/stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_other_room_untouched(self):
+        other, _ = make_room(number='202')
+        version = Room.objects.get(pk=self.room.pk).version
+        Chore.objects.create(room=other, title='dishes', frequency_days=2)
+        self.assertEqual(Room.objects.get(pk=self.room.pk).version, version)
+
+
+class DailyContributionTests(TestCase):
+    """每日貢獻彙總：與直接聚合 ChoreRecord 的結果一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, cls.users = make_room(members=2)
+        cls.floor = Chore.objects.create(room=cls.room, title='floor', frequency_days=1)
+        cls.desk = Chore.objects.create(room=cls.room, title='desk', type='PRIVATE', frequency_days=3)
+
+    def legacy_stats(self, days=None):
+        records = ChoreRecord.objects.filter(chore__room=self.room, completed_by__isnull=False)
+        if days is not None:
+            since = timezone.localdate() - timedelta(days=days - 1)
+            records = records.filter(completed_on__date__gte=since)
+        counts = {}
+        for username in records.values_list('completed_by__username', flat=True):
+            counts[username] = counts.get(username, 0) + 1
+        return counts
+
+    def leaderboard(self, days=None):
+        return {
+            row['completed_by__username']: row['completed_count']
+            for row in DailyContribution.objects.leaderboard(self.room, days=days)
+        }
+
+    def complete(self, chore, user, days_ago=0):
+        record = ChoreRecord.objects.create(chore=chore, completed_by=user)
+        if days_ago:
+            ChoreRecord.objects.filter(pk=record.pk).update(
+                completed_on=record.completed_on - timedelta(days=days_ago))
+        return record
+
+    def test_incremental_updates(self):
+        a, b = self.users
+        self.complete(self.floor, a)
+        self.complete(self.desk, a)
+        last = self.complete(self.floor, b)
+        self.assertEqual(self.leaderboard(30), {a.username: 2, b.username: 1})
+        self.assertEqual(DailyContribution.objects.totals(self.room, a, 'PRIVATE')['all'], 1)
+
+        last.delete()
+        self.assertEqual(self.leaderboard(), {a.username: 2})
+
+        self.floor.type = 'PRIVATE'
+        self.floor.save()
+        self.assertEqual(DailyContribution.objects.totals(self.room, a, 'PRIVATE')['all'], 2)
+
+        self.desk.delete()
+        self.assertEqual(self.leaderboard(), self.legacy_stats())
+
+    def test_backfill_matches_records(self):
+        a, b = self.users
+        for days_ago in (0, 3, 10, 40, 200, 500):
+            self.complete(self.floor, a, days_ago)
+        for days_ago in (1, 8, 400):
+            self.complete(self.desk, b, days_ago)
+        DailyContribution.objects.all().delete()
+
+        call_command('backfill_contributions', chunk_size=2, stdout=StringIO())
+        for days in (7, 30, 365, None):
+            with self.subTest(days=days):
+                self.assertEqual(self.leaderboard(days), self.legacy_stats(days))
+        with self.assertNumQueries(1):
+            totals = DailyContribution.objects.totals(self.room, a)
+        self.assertEqual(totals, {'7': 2, '30': 3, '365': 5, 'all': 6})
+
+
+    def test_backfill_with_concurrent_completion(self):
+        a, b = self.users
+        for days_ago in (0, 2, 5):
+            self.complete(self.floor, a, days_ago)
+        # 舊的錯誤資料 (包含今天) 都會被取代
+        DailyContribution.objects.filter(room=self.room).update(count=99)
+        real_aggregate = contributions._aggregate
+        calls = []
+
+        def aggregate(records):
+            if not calls:
+                # 重建途中另一個請求完成了家務 (signals 會立即 +1)
+                self.complete(self.desk, b)
+            calls.append(1)
+            return real_aggregate(records)
+
+        with mock.patch('apps.chores.contributions._aggregate', side_effect=aggregate):
+            processed = contributions.backfill(chunk_size=1, room_ids=[self.room.id])
+        self.assertEqual(processed, 4)
+        self.assertEqual(self.leaderboard(), self.legacy_stats())
+        self.assertEqual(self.leaderboard(), {a.username: 3, b.username: 1})
+
+    def test_import_adds_with_f_expression(self):
+        a = self.users[0]
+        self.complete(self.floor, a)
+        record = ChoreRecord.objects.create(chore=self.floor, completed_by=a)
+        row = DailyContribution.objects.get(room=self.room, user=a)
+        real_filter = DailyContribution.objects.filter
+
+        def racing(*args, **kwargs):
+            # 讀取既有的列之後、寫回之前，另一個請求 +1
+            queryset = real_filter(*args, **kwargs)
+            list(queryset)
+            real_filter(pk=row.pk).update(count=F('count') + 1)
+            return queryset
+
+        with mock.patch.object(DailyContribution.objects, 'filter', side_effect=racing):
+            contributions.import_completions([record])
+        self.assertEqual(DailyContribution.objects.get(pk=row.pk).count, 2 + 1 + 1)
+
+
+@override_settings(CHORE_STATS_STREAM_HEARTBEAT=0.05)
+class StatsStreamTests(TestCase):
+    """SSE 統計串流：先送一次，之後只有資料改變才再送，中間以 heartbeat 維持連線"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, cls.users = make_room(members=1)
+        cls.chore = Chore.objects.create(
+            room=cls.room, title='floor', frequency_days=1,
+            last_completed=date.today() - timedelta(days=1),
+        )
+        cls.chore.assigned_to.add(cls.users[0])
+
+    def setUp(self):
+        self.client.force_login(self.users[0])
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+        self.async_client.cookies = self.client.cookies
+
+    def complete(self):
+        # on_commit 在同步的那一側註冊，要在同一個執行緒攔截
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/chores/complete/{self.chore.id}/')
+
+    def open(self, last_event_id=None):
+        # 直接讀取 generator (測試用戶端不會關閉 view 內部的 async generator)
+        return stats_events(self.room, room_chore_stats, last_event_id)
+
+    @staticmethod
+    def parse(chunk):
+        fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines())
+        return fields['id'], fields['event'], json.loads(fields['data'])
+
+    async def test_view_headers(self):
+        response = await self.async_client.get('/chores/api/stats/stream/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+    async def test_initial_stats_then_heartbeat(self):
+        stream = self.open()
+        try:
+            self.assertTrue((await anext(stream)).startswith('retry: '))
+            event_id, event, data = self.parse(await anext(stream))
+            self.assertEqual(event, 'stats')
+            self.assertEqual(data['total'], 1)
+            # 資料沒變就只有 heartbeat
+            self.assertEqual(await anext(stream), ': heartbeat\n\n')
+        finally:
+            await stream.aclose()
+
+    async def test_write_pushes_new_event(self):
+        stream = self.open()
+        try:
+            await anext(stream)
+            first_id, _, _ = self.parse(await anext(stream))
+            await sync_to_async(self.complete)()
+            chunk = await anext(stream)
+            while chunk.startswith(':'):
+                chunk = await anext(stream)
+            event_id, event, data = self.parse(chunk)
+            self.assertNotEqual(event_id, first_id)
+            self.assertEqual(data['overdue'] + data['today'], 0)
+        finally:
+            await stream.aclose()
+
+    async def test_reconnect_skips_unchanged_stats(self):
+        stream = self.open()
+        await anext(stream)
+        event_id, _, _ = self.parse(await anext(stream))
+        await stream.aclose()
+
+        stream = self.open(last_event_id=event_id)
+        try:
+            await anext(stream)
+            self.assertEqual(await anext(stream), ': heartbeat\n\n')
+        finally:
+            await stream.aclose()
+
+    def test_requires_room(self):
+        session = self.client.session
+        del session['current_room_id']
+        session.save()
+        self.assertEqual(self.client.get('/chores/api/stats/stream/').status_code, 403)
+
+
+class StatsStreamWorkerTests(TransactionTestCase):
+    """已提交的資料：版本檢查與統計在執行緒池中執行，不使用 thread-sensitive 執行緒"""
+
+    def setUp(self):
+        self.room = make_room()[0]
+
+    async def test_queries_run_outside_thread_sensitive_thread(self):
+        threads = []
+
+        def compute_stats(room):
+            threads.append(threading.current_thread())
+            return {'total': 0}
+
+        with mock.patch('apps.chores.streams._room_version', wraps=streams._room_version) as version:
+            stream = stats_events(self.room, compute_stats)
+            try:
+                await anext(stream)
+                _, event, data = StatsStreamTests.parse(await anext(stream))
+            finally:
+                await stream.aclose()
+        self.assertEqual((event, data), ('stats', {'total': 0}))
+        self.assertEqual(version.call_count, 1)
+        # thread-sensitive 的呼叫在測試的主執行緒執行
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+
+class ChoreImportTests(TestCase):
+    """批次匯入：整批驗證、bulk_create 寫入，衍生資料與重建結果一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room, cls.users = make_room(members=3)
+        cls.names = [u.username for u in cls.users]
+        cls.outsider = make_room(number='202')[1][0]
+
+    def csv(self, count, frequency=7):
+        a, b, c = self.names
+        day = timezone.localdate() - timedelta(days=10)
+        lines = ['title,type,frequency_days,last_completed,private_area,assignees,completions']
+        for k in range(count):
+            if k % 4 == 3:
+                lines.append(f'private {k},PRIVATE,{frequency},,room {k},{b},{b}@{day}T09:30')
+            else:
+                lines.append(f'chore {k},PUBLIC,{frequency},,,{c};{a},{a}@{day};{c}@{day + timedelta(days=3)}T20:00')
+        return '\n'.join(lines).encode()
+
+    def import_csv(self, data):
+        return import_chores(self.room, read_rows(data, 'csv'), default_user=self.users[0])
+
+    def test_imports_chores_assignments_and_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.import_csv(self.csv(8))
+        self.assertEqual(result, ImportResult(chores=8, assignments=14, completions=14))
+
+        chores = list(Chore.objects.filter(room=self.room).order_by('id'))
+        public, private = chores[0], chores[3]
+        self.assertEqual(public.duty_roster, sorted([self.users[0].id, self.users[2].id]))
+        self.assertEqual((private.type, private.private_area, private.duty_roster),
+                         ('PRIVATE', 'room 3', [self.users[1].id]))
+        # 沒有 last_completed 時取最後一次完成的日期
+        self.assertEqual(public.last_completed, timezone.localdate() - timedelta(days=7))
+        record = ChoreRecord.objects.filter(chore=private).get()
+        self.assertEqual(timezone.localtime(record.completed_on).hour, 9)
+
+        # 輪值名單、排程、每日彙總與重建的結果相同
+        occurrences = lambda: sorted(ChoreOccurrence.objects.filter(room=self.room).values_list(
+            'chore_id', 'due_date', 'duty_user_id', 'status'))
+        contributions = lambda: sorted(DailyContribution.objects.filter(room=self.room).values_list(
+            'user_id', 'chore_type', 'day', 'count'))
+        imported = (occurrences(), contributions())
+        self.assertTrue(imported[0] and imported[1])
+        refresh_rosters([c.id for c in chores])
+        self.assertEqual([c.duty_roster for c in Chore.objects.filter(room=self.room).order_by('id')],
+                         [c.duty_roster for c in chores])
+        rebuild_room(self.room)
+        call_command('backfill_contributions', self.room.id, stdout=StringIO())
+        self.assertEqual((occurrences(), contributions()), imported)
+
+    def test_validation_rejects_whole_file(self):
+        data = '\n'.join([
+            'title,type,frequency_days,last_completed,private_area,assignees,completions',
+            f'ok,PUBLIC,3,,,{self.names[0]},',
+            f'bad type,WEEKLY,0,,,{self.outsider.username},',
+            'no area,PRIVATE,7,,,,',
+            f',PUBLIC,7,yesterday,,,{self.names[1]}@not-a-date',
+        ]).encode()
+        with self.assertRaises(ChoreImportError) as ctx:
+            self.import_csv(data)
+        self.assertEqual(sorted({line for line, _ in ctx.exception.errors}), [3, 4, 5])
+        self.assertFalse(Chore.objects.filter(room=self.room).exists())
+
+    def test_username_with_at_sign(self):
+        user = get_user_model().objects.create_user(username='amy@home', password='pw')
+        self.room.members.add(user)
+        day = timezone.localdate() - timedelta(days=2)
+        data = '\n'.join([
+            'title,type,frequency_days,last_completed,private_area,assignees,completions',
+            f'chore,PUBLIC,7,,,amy@home,amy@home@{day}T08:00',
+        ]).encode()
+        self.assertEqual(self.import_csv(data), ImportResult(chores=1, assignments=1, completions=1))
+        record = ChoreRecord.objects.get(chore__room=self.room)
+        self.assertEqual((record.completed_by, timezone.localdate(record.completed_on)), (user, day))
+
+    def test_json_completions_must_be_list(self):
+        data = json.dumps([
+            {'title': 'a', 'completions': f'{self.names[0]}@2024-01-01'},
+            {'title': 'b', 'completions': {'by': self.names[0], 'on': '2024-01-01'}},
+            {'title': 'c', 'assignees': 3},
+        ])
+        with self.assertRaises(ChoreImportError) as ctx:
+            import_chores(self.room, read_rows(data, 'json'))
+        self.assertEqual([line for line, _ in ctx.exception.errors], [1, 2, 3])
+        self.assertIn('completions', ctx.exception.errors[0][1])
+        self.assertIn('assignees', ctx.exception.errors[2][1])
+        self.assertFalse(Chore.objects.filter(room=self.room).exists())
+
+    def test_query_count_independent_of_size(self):
+        reads, writes = [], []
+        for count in (8, 200):
+            rows = read_rows(self.csv(count, frequency=30), 'csv')
+            with CaptureQueriesContext(connection) as ctx:
+                import_chores(self.room, rows)
+            sql = [q['sql'] for q in ctx.captured_queries]
+            reads.append(sum(q.startswith('SELECT') for q in sql))
+            writes.append(len(sql) - reads[-1])
+        # 讀取固定；寫入只會因資料庫的參數上限分批 (SQLite)，遠少於逐筆寫入
+        self.assertEqual(reads[0], reads[1])
+        self.assertLess(writes[1], 200 // 5)
+
+    def test_upload_view(self):
+        self.client.force_login(self.users[0])
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+        upload = SimpleUploadedFile('chores.json', json.dumps({'chores': [
+            {'title': '倒垃圾', 'assignees': self.names[:2],
+             'completions': [{'by': self.names[1], 'on': str(timezone.localdate() - timedelta(days=1))}]},
+            {'title': '浴室', 'type': 'PRIVATE', 'private_area': '主臥室'},
+        ]}).encode())
+        response = self.client.post('/chores/import/', {'file': upload}, follow=True)
+        self.assertContains(response, '已匯入 2 個家務')
+        private = Chore.objects.get(room=self.room, title='浴室')
+        self.assertEqual(list(private.assigned_to.all()), [self.users[0]])
+
+        bad = SimpleUploadedFile('chores.json', b'[{"title": ""}]')
+        response = self.client.post('/chores/import/', {'file': bad})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['import_errors'], [(1, '缺少家務名稱 (title)')])
+        self.assertEqual(Chore.objects.filter(room=self.room).count(), 2)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as source:
+            source.write(self.csv(4))
+            source.flush()
+            stdout = StringIO()
+            call_command('import_chores', self.room.id, source.name, stdout=stdout)
+        self.assertIn('已匯入 4 個家務', stdout.getvalue())
+        self.assertEqual(Chore.objects.filter(room=self.room).count(), 4)
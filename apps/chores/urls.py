@@ -14,11 +14,17 @@ urlpatterns = [
     # 家務清單與統計 (F-3.1, F-3.2, F-3.4)
     # path('list/', views.ChoreListView.as_view(), name='list'), 
     path('api/stats/', views.chore_stats_api, name='chore-stats-api'),
+    path('api/stats/stream/', views.chore_stats_stream, name='chore-stats-stream'),
+    path('api/dashboard-cache/', views.dashboard_cache_stats, name='dashboard-cache-stats'),
     # CRUD 操作 (F-3.3)
     path('new/', views.ChoreCreateView.as_view(), name='create'),
     path('edit/<int:pk>/', views.ChoreUpdateView.as_view(), name='update'),
     path('delete/<int:pk>/', views.ChoreDeleteView.as_view(), name='delete'),
+    # 批次匯入 (CSV / JSON)
+    path('import/', views.ChoreImportView.as_view(), name='import'),
     
     # 家務完成 AJAX (用於 HomeView 中的勾選)
     path('complete/<int:pk>/', views.ChoreCompleteView.as_view(), name='complete'),
+    # 一次完成多個家務 (POST JSON {"chore_ids": [...]})
+    path('complete/', views.ChoreBulkCompleteView.as_view(), name='bulk-complete'),
 ]
@@ -1,106 +1,87 @@
 # apps/chores/views.py
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.views.generic import ListView
-from django.views.generic.edit import CreateView, UpdateView, DeleteView
+from django.views.generic.edit import CreateView, UpdateView, DeleteView, FormView
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views import View # <-- 確保 View 類別在頂部
 from django.urls import reverse_lazy, reverse
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Count, Q # Q 用於複雜查詢
 from datetime import timedelta
+import inspect
 import json # <-- 確保 json 導入
 from django.contrib.auth.decorators import login_required
 from datetime import date
 # 核心模型導入
-from apps.rooms.models import Room 
-from .models import Chore, ChoreRecord 
-from .forms import ChoreForm 
+from asgiref.sync import sync_to_async
+from django.utils.decorators import method_decorator
+from apps.rooms.conditional import room_conditional
+from apps.rooms.realtime import publish_room_event
+from .models import Chore
+from .forms import ChoreForm, ChoreImportForm
+from .completion import (
+    MAX_KEY_LENGTH, ChoresNotInRoom, CompletionConflict, IdempotencyKeyReused,
+    complete_chores, request_fingerprint, run_once,
+)
+from .dashboard import SECTION_LABELS, aget_dashboard_snapshot
+from .importer import ChoreImportError, import_chores, read_rows
+from .snapshots import snapshot_stats
+from .streams import stats_events
 
 
-# ===============================================
-# 輔助函數 (統一使用這個版本)
-# ===============================================
-
-def get_current_room(request):
-    """輔助函數：獲取當前用戶和房號。"""
-    current_room_id = request.session.get('current_room_id') 
-    try:
-        # 假設 Room 模型有一個 members 欄位/關係 (已在 rooms/models.py 修正為 joined_rooms)
-        room = Room.objects.get(id=current_room_id, members=request.user) 
-        return room
-    except (Room.DoesNotExist, TypeError):
-        return None
-
 # ===============================================
 # F-2.0, F-3.0 家務 Views
 # ===============================================
 
 class HomeView(LoginRequiredMixin, View): # <-- 使用 View 確保能 redirect
-    """F-2.0 主頁儀表板"""
-    def get(self, request):
-        self.room = get_current_room(request)
+    """F-2.0 主頁儀表板 (async：快照未命中時四個區塊同時計算，見 apps.chores.dashboard)"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        # LoginRequiredMixin 未登入時直接回傳 redirect (不是 coroutine)
+        response = super().dispatch(request, *args, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+    async def get(self, request):
+        self.room = request.room
+        # LoginRequiredMixin 已經載入 request.user (auser() 另有快取，會再查詢一次)
         user = request.user
         if not self.room:
             # F-1.3: 如果沒有房間，導向房間選擇頁面
             return redirect(reverse('rooms:list')) 
 
-        # --- 1. 待辦家務 (F-2.1) ---
-        today_chores, overdue_chores = Chore.objects.get_my_todos(self.room, user)
-        
-        raw_events = Chore.objects.format_for_calendar(self.room, user)
-        # overdue_chores = []  
-        # due_chores = []      
-        calendar_events = []
-        for e in raw_events:
-            color = {
-                "Green": "green",
-                "Red": "red",
-                "Grey": "grey",
-            }.get(e["status"], "grey")
-
-            calendar_events.append({
-                "date": e["date"],
-                "title": e["title"],
-                "color": color,
-            })
-           
-        # 2. 個人統計 (Doughnut 圖) - 確保 Manager 也要同步考慮輪替邏輯
-        pie_chart_data = Chore.objects.get_my_completion_percentage(self.room, user)
-
-        # 3. 成員貢獻統計
-        thirty_days_ago = timezone.now() - timezone.timedelta(days=30)
-        member_stats = ChoreRecord.objects.filter(
-            chore__room=self.room,
-            completed_on__gte=thirty_days_ago
-        ).values('completed_by__username').annotate(
-            completed_count=Count('completed_by')
-        ).order_by('-completed_count')
+        # 待辦 / 月曆 / 圓餅圖 / 成員貢獻：每日快照，資料變動時由 signals 失效
+        snapshot, unavailable = await aget_dashboard_snapshot(self.room, user)
 
         context = {
             'room': self.room,
-            'today_chores':today_chores,
-            'overdue_chores': overdue_chores,
-            'member_stats': member_stats,
-            'pie_chart_data': pie_chart_data,
-            'calendar_data': calendar_events,
+            'today_chores': snapshot['today_chores'],
+            'overdue_chores': snapshot['overdue_chores'],
+            'member_stats': snapshot['member_stats'],
+            'pie_chart_data': snapshot['pie_chart_data'],
+            'calendar_data': snapshot['calendar_data'],
+            'unavailable_sections': [SECTION_LABELS[name] for name in unavailable],
         }
-        return render(request, 'chores/home.html', context)
+        # 模板與 context processors 會查詢資料庫，在同步執行緒中渲染
+        return await sync_to_async(render)(request, 'chores/home.html', context)
         
+@method_decorator(room_conditional, name='dispatch')
 class ChoreListView(LoginRequiredMixin, ListView): 
-    """F-3.1, F-3.2 家務清單與統計"""
+    """F-3.1, F-3.2 家務清單與統計 (房間沒有變動時回 304)"""
     model = Chore
     template_name = 'chores/chore_list.html'
     context_object_name = 'chores'
 
     def get_queryset(self):
         # 這個 view 不直接用 queryset
-        self.room = get_current_room(self.request)
+        self.room = self.request.room
         return Chore.objects.none()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        room = get_current_room(self.request)
+        room = self.request.room
         user = self.request.user
         context['room'] = room # 確保導航欄顯示房號
 
@@ -130,25 +111,14 @@ class ChoreListView(LoginRequiredMixin, ListView):
         start = today.replace(day=1)
         end = (start + timedelta(days=32)).replace(day=1)
 
-        chores = Chore.objects.filter(room=self.room)
-
-        for chore in chores:
-            if not chore.last_completed:
-                continue
-
-            due = chore.last_completed + timedelta(days=chore.frequency_days)
-
-            while due < end:
-                status = Chore.objects.get_status_by_date(chore, due)
-
-                calendar_data.append({
-                    "date": due.isoformat(),
-                    "title": chore.title,
-                    "status": status  # Green / Red / Grey
-                })
+        # 從上次完成後的第一個到期日開始，不往前回推 (物化排程)
+        for chore, due, status in Chore.objects.scheduled_cycles(room, end):
+            calendar_data.append({
+                "date": due.isoformat(),
+                "title": chore.title,
+                "status": status  # Green / Red / Grey
+            })
 
-                due += timedelta(days=chore.frequency_days)
-    
         context["calendar_data_json"] = json.dumps(calendar_data)
         return context
 
@@ -163,13 +133,13 @@ class ChoreCreateView(LoginRequiredMixin, CreateView):
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['room'] = get_current_room(self.request)
+        kwargs['room'] = self.request.room
         kwargs['user'] = self.request.user # 傳給 Form 用於鎖定負責人
         return kwargs
 
 
     def form_valid(self, form):
-        self.room = get_current_room(self.request)
+        self.room = self.request.room
         
         if not self.room:
             form.add_error(None, "您尚未加入房號，無法創建家務。")
@@ -181,7 +151,7 @@ class ChoreCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['room'] = get_current_room(self.request) # 確保 Template 能拿到 room 物件
+        context['room'] = self.request.room # 確保 Template 能拿到 room 物件
         context['user'] = self.request.user # 傳遞當前用戶給 form
         return context
 
@@ -194,19 +164,19 @@ class ChoreUpdateView(LoginRequiredMixin, UpdateView):
     
     def get_queryset(self):
         # 確保只能修改當前房號的家務
-        self.room = get_current_room(self.request)
+        self.room = self.request.room
         if not self.room:
              return self.model.objects.none()
         return self.model.objects.filter(room=self.room)
     def get_form_kwargs(self): # 編輯頁也需要限制成員選單
         kwargs = super().get_form_kwargs()
-        kwargs['room'] = get_current_room(self.request)
+        kwargs['room'] = self.request.room
         kwargs['user'] = self.request.user # 傳遞當前用戶給 form
         return kwargs
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['room'] = get_current_room(self.request)
+        context['room'] = self.request.room
         return context
 
 
@@ -217,54 +187,165 @@ class ChoreDeleteView(LoginRequiredMixin, DeleteView):
     
     def get_queryset(self):
         # 確保只能刪除當前房號的家務
-        self.room = get_current_room(self.request)
+        self.room = self.request.room
         if not self.room:
              return self.model.objects.none()
         return self.model.objects.filter(room=self.room)
 
 
+
+class ChoreImportView(LoginRequiredMixin, FormView):
+    """上傳 CSV / JSON 批次建立家務、負責成員與完成紀錄 (見 apps.chores.importer)"""
+    form_class = ChoreImportForm
+    template_name = 'chores/chore_import.html'
+    success_url = reverse_lazy('chores:import')
+    # 頁面上最多列出的錯誤數
+    max_errors = 50
+
+    def form_valid(self, form):
+        room = self.request.room
+        if not room:
+            form.add_error(None, "您尚未加入房號，無法匯入家務。")
+            return self.form_invalid(form)
+
+        try:
+            rows = read_rows(form.cleaned_data['file'].read(), form.cleaned_data['format'])
+            result = import_chores(room, rows, default_user=self.request.user)
+        except ChoreImportError as exc:
+            return self.render_to_response(self.get_context_data(
+                form=form,
+                import_errors=exc.errors[:self.max_errors],
+                hidden_errors=max(len(exc.errors) - self.max_errors, 0),
+            ))
+        messages.success(
+            self.request,
+            f"已匯入 {result.chores} 個家務、{result.assignments} 筆負責成員與 {result.completions} 筆完成紀錄。",
+        )
+        return super().form_valid(form)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['room'] = self.request.room
+        return context
+
 # --- 家務完成 AJAX 視圖 ---
 
 class ChoreCompleteView(LoginRequiredMixin, View):
-    """F-3.4 標記家務完成 (用於 POST 請求)"""
+    """
+    F-3.4 標記家務完成 (用於 POST 請求)
+    可帶 Idempotency-Key 標頭：同一個 key 重送時回傳第一次的結果 (見 apps.chores.completion)，
+    用在不同的家務或房間時回 422
+    """
     def post(self, request, pk, *args, **kwargs):
-        room = get_current_room(request)
+        room = request.room
         if not room:
             return JsonResponse({'status': 'error', 'message': '請先選擇房號。'}, status=403)
+        return self.respond(request, [pk])
+
+    def respond(self, request, chore_ids):
+        key = request.headers.get('Idempotency-Key', '').strip()
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse({'status': 'error', 'message': 'Idempotency-Key 過長。'}, status=400)
+
+        fingerprint = request_fingerprint(request.path, request.room, chore_ids)
+        try:
+            status_code, payload, replayed = run_once(
+                request.user, request.room, key, lambda: self.complete(request, chore_ids), fingerprint
+            )
+        except IdempotencyKeyReused:
+            return JsonResponse(
+                {'status': 'error', 'message': '這個 Idempotency-Key 已用於不同的請求。'}, status=422
+            )
+        response = JsonResponse(payload, status=status_code)
+        if replayed:
+            response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def complete(self, request, chore_ids):
+        """完成家務並推播，回傳 (狀態碼, 回應內容)"""
+        room, user = request.room, request.user
+        # 創建新的完成紀錄並把 last_completed 更新為今天 (與批次完成共用，見 apps.chores.completion)
+        try:
+            chores = complete_chores(room, user, chore_ids)
+        except ChoresNotInRoom as exc:
+            return 404, {'status': 'error', 'message': '有家務不存在或不屬於目前房間。', 'missing': exc.missing}
+        except CompletionConflict as exc:
+            return 409, {
+                'status': 'error', 'message': '家務剛被其他人更新，請重新整理後再試。', 'conflicts': exc.chore_ids,
+            }
+
+        # 推播給房間內的成員 (附上新的統計，前端不必再呼叫 chore_stats_api)
+        stats = room_chore_stats(room)
+        for chore in chores:
+            publish_room_event(
+                room.id, 'chore.completed',
+                chore_id=chore.id, title=chore.title, completed_by=user.username, stats=stats,
+            )
+        return 200, self.success_payload(chores, stats)
 
-        chore = get_object_or_404(Chore, pk=pk, room=room)
-        user = request.user
-        
-        # 創建新的完成紀錄
-        ChoreRecord.objects.create(
-            chore=chore,
-            completed_by=user,
-            completed_on=timezone.now() # 使用 completed_at 而非 completed_on
-        )
-        
-        # 更新 Chore 的 last_completed 字段為今天
-        chore.last_completed = timezone.now().date() # 假設 models.py 使用 last_completed_at
-        
-        # 這裡需要 Chore 模型有計算 next_due_date 的方法
-        # chore.next_due_date = chore.calculate_next_due_date() 
-        # 簡化：暫時只更新 last_completed_at
-        chore.save()
-        
-        # 返回成功響應
-        return JsonResponse({'status': 'success', 'message': f'家務 "{chore.title}" 已標記為完成，舊有積欠已一併清除。'})
+    def success_payload(self, chores, stats):
+        chore, = chores
+        return {'status': 'success', 'message': f'家務 "{chore.title}" 已標記為完成，舊有積欠已一併清除。'}
 
     def http_method_not_allowed(self, request, *args, **kwargs):
         return JsonResponse({'status': 'error', 'message': '僅接受 POST 請求。'}, status=405)
 
+
+class ChoreBulkCompleteView(ChoreCompleteView):
+    """
+    一次完成多個家務：POST JSON {"chore_ids": [1, 2, ...]}
+    全部在同一個交易中寫入，回傳各家務完成後的狀態與新的圓餅圖統計。
+    """
+    # 一次最多完成的家務數
+    max_chores = 200
+
+    def post(self, request, *args, **kwargs):
+        room = request.room
+        if not room:
+            return JsonResponse({'status': 'error', 'message': '請先選擇房號。'}, status=403)
+
+        try:
+            chore_ids = json.loads(request.body or b'{}').get('chore_ids')
+            chore_ids = {int(chore_id) for chore_id in chore_ids}
+        except (ValueError, TypeError, AttributeError):
+            return JsonResponse({'status': 'error', 'message': 'chore_ids 必須是家務 id 的陣列。'}, status=400)
+        if not chore_ids or len(chore_ids) > self.max_chores:
+            return JsonResponse(
+                {'status': 'error', 'message': f'請選擇 1 到 {self.max_chores} 個家務。'}, status=400
+            )
+        return self.respond(request, chore_ids)
+
+    def success_payload(self, chores, stats):
+        statuses = Chore.objects.resolve_statuses(chores)
+        return {
+            'status': 'success',
+            'message': f'已完成 {len(chores)} 項家務，舊有積欠已一併清除。',
+            'chores': [
+                {
+                    'id': chore.id,
+                    'title': chore.title,
+                    'last_completed': chore.last_completed.isoformat(),
+                    'status': statuses[(chore.id, date.today())],
+                }
+                for chore in chores
+            ],
+            'stats': stats,
+        }
+
 @login_required
+@room_conditional
 def chore_stats_api(request):
-    room = get_current_room(request)
-    chores = Chore.objects.filter(room=room)
+    return JsonResponse(room_chore_stats(request.room))
+
+
+def room_chore_stats(room):
+    """圓餅圖統計 (chore_stats_api 與家務完成的即時推播共用)"""
+    chores = list(Chore.objects.filter(room=room))
+    statuses = Chore.objects.resolve_statuses(chores)
 
     overdue = today_count = future = completed = 0
 
-    for chore in chores:
-        status = Chore.objects.get_status(chore)
+    for status in statuses.values():
         if status == "Red":
             overdue += 1
         elif status == "Green":
@@ -272,9 +353,32 @@ def chore_stats_api(request):
         elif status == "Grey":
             future += 1
 
-    return JsonResponse({
+    return {
         "overdue": overdue,
         "today": today_count,
         "future": future,
-        "total": chores.count()
-    })
+        "total": len(chores)
+    }
+
+
+@login_required
+async def chore_stats_stream(request):
+    """圓餅圖統計的 SSE 串流 (需在 ASGI 下執行)，取代反覆呼叫 chore_stats_api"""
+    room = request.room
+    if not room:
+        return JsonResponse({'status': 'error', 'message': '請先選擇房號。'}, status=403)
+    response = StreamingHttpResponse(
+        stats_events(room, room_chore_stats, request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # 不讓 nginx 緩衝
+    return response
+
+
+@login_required
+def dashboard_cache_stats(request):
+    """主頁快照的命中 / 未命中次數 (僅限管理員)"""
+    if not request.user.is_staff:
+        return JsonResponse({'status': 'error', 'message': '權限不足。'}, status=403)
+    return JsonResponse(snapshot_stats())
@@ -0,0 +1,240 @@
+"""
+ChoreManager 與主要頁面的基準測試
+
+每個規模 (家務數) 都在一個會回滾的交易中以 synthetic.generate 建立房間，
+分別計時 ChoreManager 的方法與主要頁面 (取多次執行的中位數，單位 ms)，
+結果可存成 JSON，並與先前存下的 baseline 比較。
+
+另可指定留言數 (例如 1,000,000) 比較留言板全文搜尋與房號內 icontains 的耗時。
+"""
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.chats.models import Chat
+from apps.chats.search import rebuild as rebuild_search, search
+from apps.chores.models import Chore
+from apps.chores.snapshots import invalidate_room
+from .synthetic import generate
+
+MANAGER_METHODS = (
+    'get_my_todos',
+    'get_chore_list_data',
+    'format_for_calendar',
+    'get_completion_percentage',
+    'get_my_completion_percentage',
+)
+
+VIEWS = (
+    ('HomeView', '/chores/dashboard/'),
+    ('ChoreListView', '/chores/'),
+    ('chore_stats_api', '/chores/api/stats/'),
+    ('ChatListView', '/chats/'),
+)
+
+# 一般用語 (大部分留言都有) 與少見用語 (每個房間只有幾則)
+COMMON_WORDS = (
+    '倒垃圾', '回收', '冰箱', '清理', '過期', '洗衣機', '壞了', '浴室', '拖地', '陽台',
+    '房租', '水費', '電費', '網路', '訪客', '噪音', '晚上', '週末', '記得', '謝謝',
+    '大掃除', '輪值', '鑰匙', '包裹', '垃圾車', '曬衣服', '冷氣', '濾網', '燈泡', '公告',
+)
+RARE_WORD_COUNT = 20000
+COMMON_RATIO = 0.7
+# 名稱 → 關鍵字；'rare' 在產生資料時取第一個少見用語
+SEARCH_TERMS = {
+    'common': '倒垃圾',
+    'two_terms': '洗衣機 壞了',
+    'rare': None,
+    'missing': '停水通知',
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def time_call(fn, repeat, setup=None):
+    """執行 repeat 次，回傳 {'median_ms', 'min_ms', 'queries'} (queries 為最後一次的查詢數)"""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'min_ms': round(min(samples), 3),
+        'queries': len(ctx.captured_queries),
+    }
+
+
+def _manager_calls(room, user):
+    return {
+        'get_my_todos': lambda: Chore.objects.get_my_todos(room, user),
+        'get_chore_list_data': lambda: Chore.objects.get_chore_list_data(room),
+        'format_for_calendar': lambda: Chore.objects.format_for_calendar(room, user),
+        'get_completion_percentage': lambda: Chore.objects.get_completion_percentage(room),
+        'get_my_completion_percentage': lambda: Chore.objects.get_my_completion_percentage(room, user),
+    }
+
+
+def _client_for(room, user):
+    # ALLOWED_HOSTS 不一定包含 testserver
+    client = Client(HTTP_HOST=(settings.ALLOWED_HOSTS or ['localhost'])[0].replace('*', 'localhost'))
+    client.force_login(user)
+    session = client.session
+    session['current_room_id'] = room.id
+    session.save()
+    return client
+
+
+def bench_scale(chores, repeat=5, members=4, years=1):
+    """在單一規模下計時所有項目；資料在結束後回滾"""
+    result = {}
+    try:
+        with transaction.atomic():
+            room = generate(rooms=1, members=members, chores=chores, years=years, prefix='bench')[0]
+            user = room.members.order_by('id').first()
+
+            for name, call in _manager_calls(room, user).items():
+                result[f'ChoreManager.{name}'] = time_call(call, repeat)
+
+            client = _client_for(room, user)
+            for name, url in VIEWS:
+                def fetch(url=url):
+                    response = client.get(url)
+                    assert response.status_code == 200, f'{url} 回傳 {response.status_code}'
+                # 主頁量的是快照未命中的成本
+                setup = (lambda: invalidate_room(room.id)) if name == 'HomeView' else None
+                result[f'view.{name}'] = time_call(fetch, repeat, setup)
+            raise _Rollback
+    except _Rollback:
+        pass
+    return result
+
+
+def _icontains_search(room, query, limit=20):
+    """沒有全文索引時的寫法：房號內逐則比對"""
+    queryset = Chat.objects.filter(room=room)
+    for term in query.split():
+        queryset = queryset.filter(Q(title__icontains=term) | Q(content__icontains=term))
+    return list(queryset.order_by('-created_at')[:limit])
+
+
+def _rare_words(rng):
+    chars = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+    return [''.join(rng.choices(chars, k=3)) for _ in range(RARE_WORD_COUNT)]
+
+
+def bench_search(messages, repeat=5, rooms=50, seed=0):
+    """
+    在 rooms 個房間產生共 messages 則文章 (資料在結束後回滾)，
+    計時重建索引，以及每個 SEARCH_TERMS 在第一個房間的全文搜尋與 icontains。
+    """
+    rng = random.Random(seed)
+    rare = _rare_words(rng)
+    terms = dict(SEARCH_TERMS, rare=rare[0])
+
+    def words(k):
+        return ' '.join(
+            rng.choice(COMMON_WORDS) if rng.random() < COMMON_RATIO else rng.choice(rare)
+            for _ in range(k)
+        )
+
+    result = {}
+    try:
+        with transaction.atomic():
+            room_objs = generate(rooms=rooms, members=2, chores=1, years=0, chats_per_week=0,
+                                 prefix='search')
+            for start in range(0, messages, 10000):
+                Chat.objects.bulk_create([
+                    Chat(
+                        room=room_objs[k % rooms], author_id=room_objs[k % rooms].creator_id,
+                        title=words(2), content=words(rng.randint(5, 30)), is_article=True,
+                    )
+                    for k in range(start, min(start + 10000, messages))
+                ], batch_size=2000)
+
+            # bulk_create 不會同步索引；重建只量一次
+            result['search.rebuild'] = time_call(rebuild_search, 1)
+            room = room_objs[0]
+            for name, term in terms.items():
+                result[f'search.fts.{name}'] = time_call(lambda term=term: search(room, term), repeat)
+                result[f'search.icontains.{name}'] = time_call(
+                    lambda term=term: _icontains_search(room, term), repeat
+                )
+            raise _Rollback
+    except _Rollback:
+        pass
+    return result
+
+
+def run(scales=(5, 50, 500), repeat=5, members=4, years=1, stdout=None, search_messages=0):
+    """
+    回傳 {'meta': {...}, 'results': {家務數: {項目: 量測}}}；
+    指定 search_messages 時另有 results['search:<留言數>']
+    """
+    results = {}
+    for chores in scales:
+        if stdout is not None:
+            stdout.write(f'規模 {chores} 個家務 ...')
+        results[str(chores)] = bench_scale(chores, repeat, members, years)
+    if search_messages:
+        if stdout is not None:
+            stdout.write(f'全文搜尋 {search_messages} 則留言 ...')
+        results[f'search:{search_messages}'] = bench_search(search_messages, repeat)
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'repeat': repeat,
+            'members': members,
+            'years': years,
+            'today': timezone.localdate().isoformat(),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=0.25, min_delta_ms=1.0):
+    """
+    與 baseline 比較，回傳 [(規模, 項目, baseline_ms, current_ms, 變化比例)]，
+    只列出變慢超過 tolerance 且差距超過 min_delta_ms 的項目，或查詢數增加的項目。
+    """
+    regressions = []
+    for scale, items in current['results'].items():
+        for name, now in items.items():
+            before = baseline.get('results', {}).get(scale, {}).get(name)
+            if not before:
+                continue
+            delta = now['median_ms'] - before['median_ms']
+            ratio = delta / before['median_ms'] if before['median_ms'] else 0.0
+            slower = ratio > tolerance and delta > min_delta_ms
+            if slower or now['queries'] > before['queries']:
+                regressions.append((scale, name, before['median_ms'], now['median_ms'], round(ratio, 3)))
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def dump(data, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
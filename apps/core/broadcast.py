@@ -0,0 +1,86 @@
+"""
+行程內廣播層 (publish / subscribe)
+
+同步的 view 以 publish(group, message) 發送，ASGI websocket 以 subscribe(group) 收取。
+後端由 settings.BROADCAST_BACKEND (dotted path) 指定，預設 InMemoryBroadcast：
+只在同一個行程內轉送，適合開發、測試與單一 worker 的部署。
+多個 worker 時需實作同樣介面的後端 (例如以 Redis pub/sub 轉送)。
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'apps.core.broadcast.InMemoryBroadcast'
+
+
+class BaseBroadcast:
+    """廣播後端介面"""
+
+    def publish(self, group, message):
+        """同步呼叫 (可在任何執行緒)；message 必須可轉成 JSON"""
+        raise NotImplementedError
+
+    def subscribe(self, group):
+        """async context manager，產生一個 asyncio.Queue，收到的訊息會依序放進去"""
+        raise NotImplementedError
+
+
+class InMemoryBroadcast(BaseBroadcast):
+    """同一個行程內的廣播"""
+
+    # 訂閱者跟不上時最多暫存的訊息數，超過就丟棄 (不讓慢的連線拖住 publish)
+    max_queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)  # group → {(event loop, queue)}
+
+    def publish(self, group, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(group, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # event loop 已關閉；連線的 finally 會自行取消訂閱
+                pass
+
+    @staticmethod
+    def _deliver(queue, message):
+        if not queue.full():
+            queue.put_nowait(message)
+
+    def subscriber_count(self, group):
+        with self._lock:
+            return len(self._subscribers.get(group, ()))
+
+    @asynccontextmanager
+    async def subscribe(self, group):
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[group].add(entry)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                self._subscribers[group].discard(entry)
+                if not self._subscribers[group]:
+                    del self._subscribers[group]
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_broadcast():
+    """目前設定的後端 (每個 dotted path 一個實例)"""
+    path = getattr(settings, 'BROADCAST_BACKEND', DEFAULT_BACKEND)
+    with _backends_lock:
+        if path not in _backends:
+            _backends[path] = import_string(path)()
+        return _backends[path]
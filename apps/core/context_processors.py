@@ -1,10 +1,13 @@
+from django.utils.functional import SimpleLazyObject
+
+from apps.chats.unread import unread_count
+
+
 def current_room(request):
-    from apps.rooms.models import Room
-    room = None
-    if request.user.is_authenticated:
-        current_room_id = request.session.get('current_room_id')
-        try:
-            room = Room.objects.get(id=current_room_id, members=request.user)
-        except (Room.DoesNotExist, TypeError):
-            room = None
-    return {'room': room}
\ No newline at end of file
+    # request.room 由 apps.rooms.middleware.CurrentRoomMiddleware 解析
+    return {'room': getattr(request, 'room', None)}
+
+
+def unread_chats(request):
+    # 導覽列的留言板未讀數：只在模板用到時才讀取 (一列 UnreadCounter，依 (room, user) 索引)
+    return {'unread_chat_count': SimpleLazyObject(lambda: unread_count(request))}
@@ -0,0 +1,50 @@
+"""
+logging handler (settings.LOGGING 使用)
+
+設定載入時不建立任何目錄：log 目錄在第一次寫入時才建立。
+相對路徑的檔名放在 settings.LOG_DIR 之下，開檔時才解析；LOG_DIR 改變時
+(測試以 override_settings 指到暫存目錄) 關閉目前的檔案，下一筆寫到新的位置。
+"""
+import os
+import weakref
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+_handlers = weakref.WeakSet()
+
+
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler：第一筆 log 寫入時才建立檔案與所在目錄"""
+
+    def __init__(self, filename, *args, **kwargs):
+        kwargs['delay'] = True
+        self.relative_name = None if Path(filename).is_absolute() else filename
+        super().__init__(filename, *args, **kwargs)
+        _handlers.add(self)
+
+    def _open(self):
+        if self.relative_name is not None:
+            self.baseFilename = os.path.abspath(Path(settings.LOG_DIR) / self.relative_name)
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+    def reopen(self):
+        """關閉目前的檔案，下一筆 log 重新解析路徑後開檔"""
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+        finally:
+            self.release()
+
+
+@receiver(setting_changed)
+def _log_dir_changed(setting, **kwargs):
+    if setting == 'LOG_DIR':
+        for handler in list(_handlers):
+            handler.reopen()
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.synthetic import generate
+
+
+class Command(BaseCommand):
+    help = '以 bulk_create 快速產生合成資料：房間、成員、家務、多年的完成紀錄與留言'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=10)
+        parser.add_argument('--members', type=int, default=4, help='每個房間的成員數')
+        parser.add_argument('--chores', type=int, default=30, help='每個房間的家務數')
+        parser.add_argument('--years', type=float, default=2, help='完成紀錄與留言的歷史年數')
+        parser.add_argument('--chats-per-week', type=int, default=3, help='每個房間每週的文章數')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='syn', help='房號前綴')
+
+    def handle(self, *args, **options):
+        if min(options['rooms'], options['members'], options['chores']) <= 0:
+            raise CommandError('--rooms、--members、--chores 必須大於 0')
+
+        started = time.perf_counter()
+        rooms = generate(
+            rooms=options['rooms'], members=options['members'], chores=options['chores'],
+            years=options['years'], chats_per_week=options['chats_per_week'],
+            seed=options['seed'], prefix=options['prefix'],
+        )
+        self.stdout.write(
+            f'已建立 {len(rooms)} 個房間 ({rooms[0].room_number} ~ {rooms[-1].room_number})，'
+            f'耗時 {time.perf_counter() - started:.1f} 秒'
+        )
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'ChoreManager 與主要頁面的基準測試，輸出 JSON 並與 baseline 比較'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='5,50,500', help='家務數，以逗號分隔')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--members', type=int, default=4)
+        parser.add_argument('--years', type=float, default=1)
+        parser.add_argument('--output', default='', help='結果 JSON 路徑')
+        parser.add_argument(
+            '--baseline', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'),
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='把這次結果存成 baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='容許變慢的比例')
+        parser.add_argument('--search-messages', type=int, default=0,
+                            help='另外以這麼多則留言 (例如 1000000) 測試留言板全文搜尋；0 表示不測')
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(s) for s in options['scales'].split(',') if s.strip()]
+        except ValueError:
+            raise CommandError('--scales 必須是以逗號分隔的整數')
+        if not scales or min(scales) <= 0 or options['repeat'] <= 0:
+            raise CommandError('--scales 與 --repeat 必須大於 0')
+
+        if options['search_messages'] < 0:
+            raise CommandError('--search-messages 不可小於 0')
+
+        current = benchmarks.run(scales, options['repeat'], options['members'], options['years'],
+                                 stdout=self.stdout, search_messages=options['search_messages'])
+        for scale, items in current['results'].items():
+            if scale.startswith('search:'):
+                self.stdout.write(f'\n[全文搜尋 {scale.removeprefix("search:")} 則留言]')
+            else:
+                self.stdout.write(f'\n[{scale} 個家務]')
+            for name, m in items.items():
+                self.stdout.write(f'  {name:<40} {m["median_ms"]:>9.2f} ms  {m["queries"]:>3} 次查詢')
+
+        if options['output']:
+            benchmarks.dump(current, Path(options['output']))
+            self.stdout.write(f'\n結果已寫入 {options["output"]}')
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            benchmarks.dump(current, baseline_path)
+            self.stdout.write(f'baseline 已更新：{baseline_path}')
+            return
+        if not baseline_path.exists():
+            self.stdout.write(f'找不到 baseline ({baseline_path})，以 --save-baseline 建立')
+            return
+
+        regressions = benchmarks.compare(current, benchmarks.load(baseline_path), options['tolerance'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('與 baseline 相比沒有退步'))
+            return
+        for scale, name, before, now, ratio in regressions:
+            self.stdout.write(self.style.ERROR(
+                f'  [{scale}] {name}: {before:.2f} ms → {now:.2f} ms ({ratio:+.0%})'
+            ))
+        raise CommandError(f'{len(regressions)} 個項目比 baseline 慢')
@@ -0,0 +1,192 @@
+"""
+每個請求的效能紀錄 (PerformanceMiddleware)
+
+- 以 connection.execute_wrapper 記錄每一條 SQL 的耗時，並往回找呼叫堆疊中
+  最近的專案內 (apps/) 公開函式，歸屬到 ChoreManager.get_my_todos、HomeView.get_context_data 等
+- 重複查詢：完全相同的 SQL + 參數 (duplicate)；同一個 SQL 只是參數不同 (similar，N+1 的徵兆)
+- TemplateResponse 的模板渲染時間
+- 以 Server-Timing 標頭回傳；超過門檻的請求連同 SQL 寫入 slow-request log
+  (只寫含 %s 佔位符的 SQL、耗時與來源，不寫參數：參數可能是 session、密碼雜湊或留言內容)
+
+設定 (settings)：
+    PERF_MONITOR_ENABLED      是否啟用 (預設 True)
+    PERF_SERVER_TIMING        回傳 Server-Timing 標頭：True 全部、'staff' 只給管理員 (預設)、False 不回傳
+    PERF_SLOW_REQUEST_MS      總耗時超過此值寫入 log (預設 500)
+    PERF_SLOW_QUERY_COUNT     查詢數超過此值寫入 log (預設 50)
+"""
+import logging
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('apps.perf.slow_requests')
+
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1])  # .../apps
+THIS_FILE = str(Path(__file__).resolve())
+
+
+def _source_of_frame(frame):
+    """
+    從目前的堆疊往回找 apps/ 內最近的公開函式 (名稱不以 _ 開頭)，
+    回傳 '類別.方法' 或 'app.模組.函式'；例如 _completion_dates 的查詢會歸到呼叫它的
+    ChoreManager.resolve_statuses。找不到時回傳 None (Django 內部或模板)。
+    """
+    fallback = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PROJECT_ROOT) and filename != THIS_FILE:
+            name = frame.f_code.co_name
+            owner = frame.f_locals.get('self')
+            if owner is not None:
+                label = f'{type(owner).__name__}.{name}'
+            else:
+                module = frame.f_globals.get('__name__', '').removeprefix('apps.')
+                label = f'{module}.{name}'
+            if not name.startswith(('_', '<')):
+                return label
+            fallback = fallback or label
+        frame = frame.f_back
+    return fallback
+
+
+class RequestProfile:
+    """單一請求的量測結果"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []           # [(sql, params, 毫秒, 來源)]
+        self.template_ms = 0.0      # 含模板中延遲執行的查詢
+        self.template_sql_ms = 0.0
+        self.total_ms = 0.0
+        self.rendering = False
+
+    # --- connection.execute_wrapper ---
+    def __call__(self, execute, sql, params, many, context):
+        source = _source_of_frame(sys._getframe(1)) or ('template' if self.rendering else 'django')
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries.append((sql, _freeze(params), elapsed, source))
+            if self.rendering:
+                self.template_sql_ms += elapsed
+
+    @property
+    def sql_ms(self):
+        return sum(q[2] for q in self.queries)
+
+    @property
+    def duplicates(self):
+        """完全相同 (SQL + 參數) 的重複次數"""
+        counts = Counter((sql, params) for sql, params, _, _ in self.queries)
+        return sum(n - 1 for n in counts.values())
+
+    @property
+    def similar(self):
+        """同一個 SQL、不同參數的重複次數 (N+1)"""
+        counts = Counter(sql for sql, _, _, _ in self.queries)
+        return sum(n - 1 for n in counts.values()) - self.duplicates
+
+    def by_source(self):
+        """{來源: (查詢數, 毫秒)}，依耗時排序"""
+        grouped = defaultdict(lambda: [0, 0.0])
+        for _, _, elapsed, source in self.queries:
+            grouped[source][0] += 1
+            grouped[source][1] += elapsed
+        return dict(sorted(((k, tuple(v)) for k, v in grouped.items()), key=lambda kv: -kv[1][1]))
+
+    def server_timing(self):
+        app_ms = max(self.total_ms - self.sql_ms - (self.template_ms - self.template_sql_ms), 0.0)
+        metrics = [
+            f'db;dur={self.sql_ms:.1f};desc="{len(self.queries)} queries"',
+            f'dup;desc="{self.duplicates} duplicate, {self.similar} similar"',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'app;dur={app_ms:.1f}',
+            f'total;dur={self.total_ms:.1f}',
+        ]
+        # 耗時最多的三個來源
+        for i, (source, (count, elapsed)) in enumerate(list(self.by_source().items())[:3]):
+            metrics.append(f'sql{i};dur={elapsed:.1f};desc="{source} x{count}"')
+        return ', '.join(metrics)
+
+    def report(self, request):
+        lines = [
+            f'{request.method} {request.get_full_path()} '
+            f'total={self.total_ms:.1f}ms sql={self.sql_ms:.1f}ms/{len(self.queries)}q '
+            f'dup={self.duplicates} similar={self.similar} tpl={self.template_ms:.1f}ms',
+        ]
+        for source, (count, elapsed) in self.by_source().items():
+            lines.append(f'  {source}: {count} 次查詢 {elapsed:.1f}ms')
+        repeats = Counter(sql for sql, _, _, _ in self.queries)
+        seen = set()
+        for sql, _, elapsed, source in self.queries:
+            if sql in seen:
+                continue
+            seen.add(sql)
+            mark = f' [x{repeats[sql]}]' if repeats[sql] > 1 else ''
+            lines.append(f'  - ({source}, {elapsed:.1f}ms){mark} {sql}')
+        return '\n'.join(lines)
+
+
+def _freeze(params):
+    if params is None:
+        return ()
+    try:
+        return tuple(params) if not isinstance(params, dict) else tuple(sorted(params.items()))
+    except TypeError:
+        return (repr(params),)
+
+
+def _expose_timing(request):
+    """Server-Timing 會透露查詢數與程式位置，預設只回給管理員"""
+    setting = getattr(settings, 'PERF_SERVER_TIMING', 'staff')
+    if setting == 'staff':
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
+    return bool(setting)
+
+
+class PerformanceMiddleware:
+    """請求層級的效能紀錄，結果放在 request.perf"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'PERF_MONITOR_ENABLED', True):
+            return self.get_response(request)
+
+        profile = request.perf = RequestProfile()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(profile))
+            response = self.get_response(request)
+        profile.total_ms = (time.perf_counter() - profile.started) * 1000
+
+        if _expose_timing(request):
+            response['Server-Timing'] = profile.server_timing()
+        slow_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', 500)
+        slow_queries = getattr(settings, 'PERF_SLOW_QUERY_COUNT', 50)
+        if profile.total_ms >= slow_ms or len(profile.queries) >= slow_queries:
+            logger.warning(profile.report(request))
+        return response
+
+    def process_template_response(self, request, response):
+        profile = getattr(request, 'perf', None)
+        if profile is not None:
+            # 這個 hook 之後 Django 會立即呼叫 response.render()
+            started = time.perf_counter()
+            profile.rendering = True
+
+            def finished(rendered):
+                profile.rendering = False
+                profile.template_ms += (time.perf_counter() - started) * 1000
+
+            response.add_post_render_callback(finished)
+        return response
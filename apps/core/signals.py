@@ -0,0 +1,86 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.chats.models import Chat
+from apps.chores.models import Chore, ChoreRecord
+from apps.members.models import Member
+from apps.rooms.middleware import invalidate_room, invalidate_user
+from apps.rooms.realtime import publish_room_event
+from apps.rooms.models import Room
+
+
+# ===============================================
+# 房間版本號：任何會影響房間頁面的寫入都 +1
+# ===============================================
+
+@receiver(post_save, sender=Chore)
+@receiver(post_delete, sender=Chore)
+@receiver(post_save, sender=Chat)
+@receiver(post_delete, sender=Chat)
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def bump_room_version(sender, instance, **kwargs):
+    Room.bump_version(pk=instance.room_id)
+    # 喚醒同一個行程內的即時連線 (例如家務統計 SSE)，提交後才送出
+    publish_room_event(instance.room_id, 'room.changed')
+
+
+@receiver(post_save, sender=ChoreRecord)
+@receiver(post_delete, sender=ChoreRecord)
+def bump_room_version_for_record(sender, instance, **kwargs):
+    Room.bump_version(chores__id=instance.chore_id)
+
+
+@receiver(m2m_changed, sender=Chore.assigned_to.through)
+def bump_room_version_for_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        Room.bump_version(pk=instance.room_id)
+    elif pk_set:
+        Room.bump_version(chores__id__in=pk_set)
+    else:
+        Room.bump_version(members=instance)
+
+
+@receiver(m2m_changed, sender=Room.members.through)
+def bump_room_version_for_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # user.joined_rooms.clear()：清除後就查不到原本的房間了，先 +1
+        Room.bump_version(members=instance)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        Room.bump_version(pk=instance.pk)
+    elif pk_set:
+        Room.bump_version(pk__in=pk_set)
+
+
+# ===============================================
+# 目前房間解析 (request.room) 的成員資格快取失效
+# ===============================================
+
+@receiver(m2m_changed, sender=Room.members.through)
+def invalidate_room_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # 清除後就查不到原本的成員 / 房間了
+        if reverse:
+            invalidate_user(instance.pk)
+        else:
+            for user_id in instance.members.values_list('id', flat=True):
+                invalidate_user(user_id)
+        return
+    if action not in ('post_add', 'post_remove'):
+        return
+    if reverse:
+        invalidate_user(instance.pk)
+    else:
+        for user_id in pk_set or ():
+            invalidate_user(user_id)
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def invalidate_room_resolver(sender, instance, **kwargs):
+    invalidate_room(instance.pk)
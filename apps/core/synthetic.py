@@ -0,0 +1,160 @@
+"""
+合成資料產生器 (效能測試 / 基準測試用)
+
+全部以 bulk_create 寫入，不經過 signals；輪值名單直接算好一起寫入，
+最後再一次重建排程 (ChoreOccurrence)、每日貢獻彙總、留言板全文搜尋與留言串索引。
+
+完成紀錄依每個家務的頻率與輪值順序回推 years 年：
+多數週期由當期輪值成員在到期日前後完成，少數週期被略過 (積欠)。
+"""
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from apps.chats.models import Chat, UnreadCounter
+from apps.chats.search import rebuild as rebuild_search
+from apps.chats.threads import rebuild as rebuild_threads
+from apps.chores.contributions import backfill
+from apps.chores.models import Chore, ChoreRecord
+from apps.chores.schedule import materialize_chores
+from apps.rooms.models import Room
+
+FREQUENCIES = (1, 1, 2, 3, 7, 7, 7, 14, 30)
+AREAS = ('浴室', '房間', '陽台')
+BATCH_SIZE = 2000
+
+
+def _bulk_create_keeping(model, objs, fields):
+    """
+    bulk_create 會把 auto_now / auto_now_add 欄位 (fields) 改成現在時間：
+    建立後把指定的歷史時間寫回物件，再以 bulk_update 存回 (bulk_update 不會套用 auto_now)
+    """
+    wanted = [[getattr(obj, name) for name in fields] for obj in objs]
+    created = model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    for obj, values in zip(created, wanted):
+        for name, value in zip(fields, values):
+            setattr(obj, name, value)
+    model.objects.bulk_update(created, fields, batch_size=BATCH_SIZE)
+    return created
+
+
+def _aware(day, rng):
+    moment = datetime.combine(day, time(hour=rng.randint(7, 22), minute=rng.randint(0, 59)))
+    return timezone.make_aware(moment)
+
+
+def generate(rooms=1, members=4, chores=30, years=1, chats_per_week=3, skip_rate=0.15,
+             seed=0, prefix='syn'):
+    """
+    產生 rooms 個房間，每個房間 members 位成員、chores 個家務，
+    以及 years 年的完成紀錄與留言板歷史。回傳建立的 Room 清單。
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    today = timezone.localdate()
+    history_start = today - timedelta(days=int(365 * years))
+    weeks = max(1, (today - history_start).days // 7)
+
+    with transaction.atomic():
+        start = Room.objects.filter(room_number__startswith=prefix).count()
+        numbers = [f'{prefix}{start + i:04d}' for i in range(rooms)]
+        users = User.objects.bulk_create([
+            User(username=f'{number}-m{k}', email=f'{number}-m{k}@example.com', password='!')
+            for number in numbers for k in range(members)
+        ], batch_size=BATCH_SIZE)
+        room_objs = Room.objects.bulk_create([
+            Room(room_number=number, password='pw', creator=users[i * members])
+            for i, number in enumerate(numbers)
+        ])
+        Room.members.through.objects.bulk_create([
+            Room.members.through(room_id=room.id, user_id=users[i * members + k].id)
+            for i, room in enumerate(room_objs) for k in range(members)
+        ], batch_size=BATCH_SIZE)
+        # 歷史留言都算已讀
+        UnreadCounter.objects.bulk_create([
+            UnreadCounter(room_id=room.id, user_id=users[i * members + k].id)
+            for i, room in enumerate(room_objs) for k in range(members)
+        ], batch_size=BATCH_SIZE)
+
+        chore_objs = []
+        for i, room in enumerate(room_objs):
+            for k in range(chores):
+                private = rng.random() < 0.25
+                chore_objs.append(Chore(
+                    room=room, title=f'家務 {k}',
+                    type='PRIVATE' if private else 'PUBLIC',
+                    private_area=rng.choice(AREAS) if private else None,
+                    frequency_days=rng.choice(FREQUENCIES),
+                    last_completed=history_start,
+                ))
+        chore_objs = Chore.objects.bulk_create(chore_objs, batch_size=BATCH_SIZE)
+
+        room_users = {
+            room.id: users[i * members:(i + 1) * members] for i, room in enumerate(room_objs)
+        }
+
+        # 負責成員：私人家事 1 人，公共家事 2 人到全體
+        rosters = {}
+        for chore in chore_objs:
+            candidates = room_users[chore.room_id]
+            size = 1 if chore.type == 'PRIVATE' else rng.randint(min(2, members), members)
+            rosters[chore.id] = sorted(rng.sample(candidates, size), key=lambda u: u.id)
+            chore.duty_roster = [u.id for u in rosters[chore.id]]
+        Chore.assigned_to.through.objects.bulk_create([
+            Chore.assigned_to.through(chore_id=chore_id, user_id=user.id)
+            for chore_id, roster in rosters.items() for user in roster
+        ], batch_size=BATCH_SIZE)
+
+        # 完成紀錄：依頻率回推，輪流由名單中的成員完成
+        records, last_done = [], {}
+        for chore in chore_objs:
+            roster = rosters[chore.id]
+            due, cycle = history_start + timedelta(days=chore.frequency_days), 0
+            while due <= today:
+                if rng.random() >= skip_rate:
+                    day = min(today, due + timedelta(days=rng.choice((-1, 0, 0, 0, 1))))
+                    records.append(ChoreRecord(
+                        chore=chore,
+                        completed_by=roster[cycle % len(roster)],
+                        completed_on=_aware(day, rng),
+                    ))
+                    last_done[chore.id] = day
+                due += timedelta(days=chore.frequency_days)
+                cycle += 1
+        _bulk_create_keeping(ChoreRecord, records, ['completed_on'])
+
+        for chore in chore_objs:
+            chore.last_completed = last_done.get(chore.id, history_start)
+        Chore.objects.bulk_update(chore_objs, ['last_completed', 'duty_roster'], batch_size=BATCH_SIZE)
+
+        # 留言板：每週 chats_per_week 篇文章，每篇 0~4 則留言
+        articles = []
+        for room in room_objs:
+            for week in range(weeks):
+                for _ in range(chats_per_week):
+                    articles.append(Chat(
+                        room=room, author=rng.choice(room_users[room.id]), is_article=True,
+                        title=f'第 {week + 1} 週公告', content='合成資料 ' * rng.randint(5, 40),
+                        created_at=_aware(history_start + timedelta(days=week * 7 + rng.randint(0, 6)), rng),
+                    ))
+        replies = []
+        for article in articles:
+            for n in range(rng.randint(0, 4)):
+                replies.append(Chat(
+                    room=article.room, author=rng.choice(room_users[article.room_id]), is_article=False,
+                    parent=article, content='回覆 ' * rng.randint(1, 10),
+                    created_at=article.created_at + timedelta(hours=n + 1),
+                ))
+        for chat in articles + replies:
+            chat.updated_at = chat.created_at
+        _bulk_create_keeping(Chat, articles, ['created_at', 'updated_at'])
+        _bulk_create_keeping(Chat, replies, ['created_at', 'updated_at'])
+
+        materialize_chores(Chore.objects.filter(room__in=room_objs))
+        backfill(room_ids=[room.id for room in room_objs])
+        rebuild_search([room.id for room in room_objs])
+        rebuild_threads([room.id for room in room_objs])
+    return room_objs
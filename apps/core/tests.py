@@ -1,3 +1,168 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.chats.models import Chat
+from apps.chores.models import Chore, ChoreOccurrence, ChoreRecord, DailyContribution
+from apps.rooms.models import Room
+from .benchmarks import MANAGER_METHODS, SEARCH_TERMS, bench_search, compare
+from .broadcast import InMemoryBroadcast
+from .perf import RequestProfile
+from .synthetic import generate
+
+
+class SyntheticDataTests(TestCase):
+
+    def test_generate_history(self):
+        rooms = generate(rooms=2, members=3, chores=8, years=1, seed=1)
+        self.assertEqual(Room.objects.filter(room_number__startswith='syn').count(), 2)
+        self.assertEqual(Chore.objects.filter(room__in=rooms).count(), 16)
+
+        today = timezone.localdate()
+        oldest = ChoreRecord.objects.order_by('completed_on').first().completed_on
+        self.assertGreater((today - timezone.localdate(oldest)).days, 300)
+        self.assertGreater(Chat.objects.filter(room=rooms[0], is_article=False).count(), 0)
+        oldest_chat = Chat.objects.order_by('created_at').first()
+        self.assertGreater((today - timezone.localdate(oldest_chat.created_at)).days, 300)
+        self.assertEqual(oldest_chat.updated_at, oldest_chat.created_at)
+        # 歷史時間是建立後寫回的，欄位設定 (auto_now_add) 沒有被更動
+        self.assertTrue(ChoreRecord._meta.get_field('completed_on').auto_now_add)
+
+        chore = Chore.objects.filter(room=rooms[0]).first()
+        self.assertEqual(chore.duty_roster, sorted(chore.assigned_to.values_list('id', flat=True)))
+        self.assertTrue(ChoreOccurrence.objects.filter(chore=chore).exists())
+        self.assertEqual(
+            sum(DailyContribution.objects.values_list('count', flat=True)),
+            ChoreRecord.objects.count(),
+        )
+
+    def test_command(self):
+        out = StringIO()
+        call_command('generate_synthetic_data', rooms=1, chores=3, years=0.1, stdout=out)
+        self.assertIn('已建立 1 個房間', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('generate_synthetic_data', rooms=0, stdout=StringIO())
+
+
+class BenchmarkTests(TestCase):
+
+    def test_run_writes_json_and_rolls_back(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / 'bench.json'
+            baseline = Path(tmp) / 'baseline.json'
+            call_command('run_benchmarks', scales='3', repeat=1, years=0.1, output=str(output),
+                         baseline=str(baseline), save_baseline=True, stdout=StringIO())
+            data = json.loads(output.read_text(encoding='utf-8'))
+            self.assertTrue(baseline.exists())
+
+        items = data['results']['3']
+        for name in MANAGER_METHODS:
+            self.assertIn(f'ChoreManager.{name}', items)
+        self.assertIn('view.HomeView', items)
+        self.assertFalse(Room.objects.exists())
+
+    def test_search_benchmark(self):
+        items = bench_search(messages=200, repeat=1, rooms=4)
+        self.assertIn('search.rebuild', items)
+        for name in SEARCH_TERMS:
+            self.assertLessEqual(items[f'search.fts.{name}']['queries'], 2)  # 全文索引 + 載入結果
+            self.assertIn(f'search.icontains.{name}', items)
+        self.assertFalse(Chat.objects.exists())
+
+    def test_compare_flags_regressions(self):
+        baseline = {'results': {'50': {
+            'view.HomeView': {'median_ms': 10.0, 'queries': 10},
+            'ChoreManager.get_my_todos': {'median_ms': 2.0, 'queries': 2},
+        }}}
+        current = {'results': {'50': {
+            'view.HomeView': {'median_ms': 20.0, 'queries': 10},
+            'ChoreManager.get_my_todos': {'median_ms': 2.1, 'queries': 3},
+        }}}
+        flagged = [(scale, name) for scale, name, *_ in compare(current, baseline)]
+        self.assertEqual(flagged, [('50', 'view.HomeView'), ('50', 'ChoreManager.get_my_todos')])
+
+
+class PerformanceMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = generate(rooms=1, members=2, chores=6, years=0.1)[0]
+        cls.user = cls.room.members.order_by('id').first()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def test_server_timing_and_attribution(self):
+        response = self.client.get('/chores/')
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'dup;desc=', 'tpl;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+
+        profile = response.wsgi_request.perf
+        sources = profile.by_source()
+        self.assertIn('ChoreManager.get_chore_list_data', sources)
+        self.assertIn('rooms.middleware.resolve_room', sources)
+        self.assertEqual(sum(n for n, _ in sources.values()), len(profile.queries))
+        self.assertGreater(profile.template_ms, 0)
+
+    def test_duplicates_and_slow_log(self):
+        profile = RequestProfile()
+        run = lambda sql, params, many, context: None
+        for params in ((1,), (1,), (2,)):
+            profile(run, 'SELECT 1 WHERE id = %s', params, False, {})
+        self.assertEqual((profile.duplicates, profile.similar), (1, 1))
+
+        with tempfile.TemporaryDirectory() as log_dir:
+            with override_settings(PERF_SLOW_REQUEST_MS=0, LOG_DIR=Path(log_dir)):
+                self.client.get('/chores/')
+            log = (Path(log_dir) / 'slow_requests.log').read_text(encoding='utf-8')
+        self.assertIn('GET /chores/', log)
+        self.assertIn('SELECT', log)
+        self.assertIn('%s', log)
+        # 不寫 SQL 參數 (session key、使用者資料等)
+        self.assertNotIn(self.client.session.session_key, log)
+        self.assertNotIn(self.user.username, log)
+
+    @override_settings(PERF_SERVER_TIMING='staff')
+    def test_server_timing_staff_only(self):
+        self.assertNotIn('Server-Timing', self.client.get('/chores/'))
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertIn('Server-Timing', self.client.get('/chores/'))
+
+    @override_settings(PERF_MONITOR_ENABLED=False)
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/chores/'))
+
+
+class InMemoryBroadcastTests(TestCase):
+
+    async def test_publish_from_other_thread(self):
+        broadcast = InMemoryBroadcast()
+        async with broadcast.subscribe('room-1') as queue, broadcast.subscribe('room-2') as other:
+            thread = threading.Thread(target=broadcast.publish, args=('room-1', {'type': 'ping'}))
+            thread.start()
+            thread.join()
+            self.assertEqual(await asyncio.wait_for(queue.get(), 1), {'type': 'ping'})
+            self.assertTrue(other.empty())
+        self.assertEqual(broadcast.subscriber_count('room-1'), 0)
+
+    async def test_slow_subscriber_drops_messages(self):
+        broadcast = InMemoryBroadcast()
+        broadcast.max_queue_size = 2
+        async with broadcast.subscribe('room-1') as queue:
+            for n in range(5):
+                broadcast.publish('room-1', n)
+            await asyncio.sleep(0)
+            self.assertEqual([queue.get_nowait() for _ in range(queue.qsize())], [0, 1])
@@ -0,0 +1,99 @@
+"""
+房間成員統計 (MemberListView / MemberDetailView / stats_api 共用)
+
+每位成員的：
+- completed：歷來完成的家務數 (DailyContribution 彙總表的 SUM)
+- articles / replies：在這個房間發布的文章 / 留言數
+- duty：目前輪到他、還沒完成的家務 (今天到期 + 積欠，讀 ChoreOccurrence 排程)
+- last_activity：最後一次發文 / 留言或完成家務的時間
+
+全部以相關子查詢 (correlated subquery) 附加在成員查詢上，
+不論房間有多少成員、家務或留言，都只有一個 SELECT。
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+STAT_FIELDS = ('completed', 'articles', 'replies', 'duty', 'last_activity')
+
+
+def _scalar(queryset, aggregate):
+    """對 OuterRef 篩選後的 queryset 做單一聚合 (依常數分組，結果恰好一列或零列)"""
+    return Subquery(
+        queryset.order_by().annotate(_group=Value(1)).values('_group')
+        .annotate(value=aggregate).values('value')
+    )
+
+
+def _count(queryset, aggregate=None):
+    return Coalesce(_scalar(queryset, aggregate or Count('pk')), 0, output_field=IntegerField())
+
+
+def stats_queryset(room, today=None):
+    """房間成員 (依 username 排序)，附上 STAT_FIELDS 所需的欄位"""
+    from apps.chats.models import Chat
+    from apps.chores.models import ChoreOccurrence, ChoreRecord, DailyContribution
+
+    today = today or timezone.localdate()
+    member = OuterRef('pk')
+    chats = Chat.objects.filter(room=room, author=member)
+    return (
+        get_user_model().objects
+        .filter(joined_rooms=room)
+        .annotate(
+            completed=_count(DailyContribution.objects.filter(room=room, user=member), Sum('count')),
+            articles=_count(chats.filter(is_article=True)),
+            replies=_count(chats.filter(is_article=False)),
+            duty=_count(ChoreOccurrence.objects.filter(
+                room=room, duty_user=member, status='Pending', due_date__lte=today,
+            )),
+            last_chat_at=_scalar(chats, Max('created_at')),
+            last_chore_at=_scalar(
+                ChoreRecord.objects.filter(chore__room=room, completed_by=member), Max('completed_on')
+            ),
+        )
+        .order_by('username')
+    )
+
+
+def _last_activity(member):
+    # SQLite 的 GREATEST (MAX) 遇到 NULL 會回傳 NULL，改在 Python 取較大值
+    times = [t for t in (member.last_chat_at, member.last_chore_at) if t is not None]
+    return max(times) if times else None
+
+
+def member_stats(room, user=None, today=None):
+    """
+    [{'user', 'completed', 'articles', 'replies', 'duty', 'last_activity'}, ...]；
+    給 user 時只回傳該成員的一筆 (不是房間成員時為 None)。
+    """
+    from apps.chores.schedule import ensure_schedule
+
+    today = today or timezone.localdate()
+    # 輪值讀的是物化排程，先確認已排到今天 (平常只有一次查詢)
+    ensure_schedule(room, today)
+    members = stats_queryset(room, today)
+    if user is not None:
+        members = members.filter(pk=user.pk)
+
+    rows = []
+    for member in members:
+        member.last_activity = _last_activity(member)
+        rows.append(dict({name: getattr(member, name) for name in STAT_FIELDS}, user=member))
+    if user is not None:
+        return rows[0] if rows else None
+    return rows
+
+
+def serialize(row):
+    """API 用的 JSON 格式"""
+    return {
+        'id': row['user'].pk,
+        'username': row['user'].username,
+        'completed': row['completed'],
+        'articles': row['articles'],
+        'replies': row['replies'],
+        'duty': row['duty'],
+        'last_activity': row['last_activity'].isoformat() if row['last_activity'] else None,
+    }
@@ -1,3 +1,111 @@
+from django.db.models import Sum
 from django.test import TestCase
+from django.utils import timezone
 
-# Create your tests here.
+from apps.chats.models import Chat
+from apps.chores.models import ChoreOccurrence, ChoreRecord, DailyContribution
+from apps.tests.builders import build_room
+
+from .stats import member_stats
+
+
+class MemberStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = build_room(chores=8, members=4, articles=6, replies_per_article=3)
+        cls.room = cls.fixture.room
+        # 另一個房間的資料不能算進來
+        cls.other = build_room(chores=3, members=2, articles=2)
+        cls.room.members.add(cls.other.users[1])
+
+    def login(self, user):
+        self.client.force_login(user)
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def expected(self, user):
+        """逐項查詢的結果 (舊寫法)，用來核對單一查詢的統計"""
+        today = timezone.localdate()
+        chats = Chat.objects.filter(room=self.room, author=user)
+        records = ChoreRecord.objects.filter(chore__room=self.room, completed_by=user)
+        times = [t for t in (
+            chats.order_by('-created_at').values_list('created_at', flat=True).first(),
+            records.order_by('-completed_on').values_list('completed_on', flat=True).first(),
+        ) if t]
+        return {
+            'completed': DailyContribution.objects.filter(room=self.room, user=user)
+                         .aggregate(n=Sum('count', default=0))['n'],
+            'articles': chats.filter(is_article=True).count(),
+            'replies': chats.filter(is_article=False).count(),
+            'duty': ChoreOccurrence.objects.filter(
+                room=self.room, duty_user=user, status='Pending', due_date__lte=today,
+            ).count(),
+            'last_activity': max(times) if times else None,
+        }
+
+    def test_matches_per_member_counts(self):
+        rows = member_stats(self.room)
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(any(row['duty'] for row in rows))
+        self.assertTrue(any(row['completed'] for row in rows))
+        for row in rows:
+            with self.subTest(user=row['user'].username):
+                self.assertEqual(
+                    {key: value for key, value in row.items() if key != 'user'},
+                    self.expected(row['user']),
+                )
+
+    def test_member_without_activity(self):
+        row = member_stats(self.room, user=self.other.users[1])
+        self.assertEqual(
+            (row['completed'], row['articles'], row['replies'], row['duty'], row['last_activity']),
+            (0, 0, 0, 0, None),
+        )
+        self.assertIsNone(member_stats(self.room, user=self.other.users[0]))
+
+    def test_query_count_independent_of_room_size(self):
+        large = build_room(chores=40, members=12, articles=30)
+        for room in (self.room, large.room):
+            with self.subTest(members=room.members.count()):
+                with self.assertNumQueries(2):  # 排程檢查 + 成員統計
+                    member_stats(room)
+
+    def test_api(self):
+        self.login(self.fixture.owner)
+        response = self.client.get('/members/api/stats/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['room'], self.room.id)
+        by_id = {m['id']: m for m in data['members']}
+        owner = by_id[self.fixture.owner.id]
+        expected = self.expected(self.fixture.owner)
+        self.assertEqual(owner['articles'], expected['articles'])
+        self.assertEqual(owner['completed'], expected['completed'])
+        self.assertEqual(owner['last_activity'], expected['last_activity'].isoformat())
+
+    def test_list_view_shows_stats(self):
+        self.login(self.fixture.owner)
+        response = self.client.get('/members/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['members_data']), 5)
+        self.assertContains(response, f'/members/detail/{self.fixture.users[1].pk}/')
+
+    def test_detail_view_shows_duty_and_last_activity(self):
+        self.login(self.fixture.owner)
+        member = max(member_stats(self.room), key=lambda row: (row['duty'], row['last_activity'] is not None))
+        self.assertTrue(member['duty'])
+        self.assertIsNotNone(member['last_activity'])
+        response = self.client.get(f'/members/detail/{member["user"].pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'member_detailed.html')
+        stats = response.context['member_stats']
+        self.assertEqual((stats['duty'], stats['last_activity']),
+                         (member['duty'], member['last_activity']))
+        self.assertContains(response, f'text-red-500">{member["duty"]}</p>')
+        last_activity = timezone.localtime(member['last_activity']).strftime('%Y/%m/%d %H:%M')
+        self.assertContains(response, f'最後活動：{last_activity}')
+
+        # 其他房間的成員 → 404
+        response = self.client.get(f'/members/detail/{self.other.users[0].pk}/')
+        self.assertEqual(response.status_code, 404)
@@ -11,4 +11,7 @@ urlpatterns = [
     
     # /members/detail/1/ (F-4.2) - 尚未實作
     path('detail/<int:pk>/', views.MemberDetailView.as_view(), name='detail'),
+
+    # /members/api/stats/ 房間成員統計 (JSON)
+    path('api/stats/', views.member_stats_api, name='stats-api'),
 ]
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+以房間版本號做 conditional GET (ETag / Last-Modified → 304)
+
+房間沒有任何寫入時，輪詢的頁面與 API 直接回 304，
+完全不會執行 ChoreManager 或留言查詢。
+
+頁面上的未讀數與未讀標記只因閱讀而改變時房間版本號不變，
+所以 ETag 也包含讀者自己的狀態 (UnreadCounter.count 與最新一筆 ReadMarker.read_at)，
+與版本號在同一個查詢中讀取。
+"""
+from datetime import datetime, time
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import Room
+
+
+def _room_state(request):
+    """(room_id, version, version_changed_at, 未讀數, 最後閱讀時間)；每個請求只查詢一次"""
+    if not hasattr(request, '_room_state'):
+        from apps.chats.models import ReadMarker, UnreadCounter
+
+        state = None
+        # 成員資格已由 CurrentRoomMiddleware 驗證過，這裡只需讀取版本號與讀者狀態
+        if request.room is not None:
+            user_id = request.user.pk
+            counters = UnreadCounter.objects.filter(room=OuterRef('pk'), user_id=user_id)
+            markers = ReadMarker.objects.filter(article__room=OuterRef('pk'), user_id=user_id)
+            state = (
+                Room.objects.filter(id=request.room.id)
+                .annotate(
+                    unread=Subquery(counters.values('count')[:1]),
+                    read_at=Subquery(markers.order_by('-read_at').values('read_at')[:1]),
+                )
+                .values_list('id', 'version', 'version_changed_at', 'unread', 'read_at')
+                .first()
+            )
+        request._room_state = state
+    return request._room_state
+
+
+def room_etag(request, *args, **kwargs):
+    state = _room_state(request)
+    if state is None:
+        return None
+    room_id, version, _, unread, read_at = state
+    # 狀態 (紅 / 綠 / 灰) 會隨日期改變，內容也因使用者而異
+    today = timezone.localdate().isoformat()
+    reader = f'{unread or 0}-{int(read_at.timestamp() * 1_000_000) if read_at else 0}'
+    return f'W/"room-{room_id}-v{version}-u{request.user.pk}-r{reader}-{today}"'
+
+
+def room_last_modified(request, *args, **kwargs):
+    state = _room_state(request)
+    if state is None:
+        return None
+    start_of_day = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    changed_at = state[2]
+    return max(changed_at, start_of_day) if changed_at else start_of_day
+
+
+# 用法：@room_conditional 或 method_decorator(room_conditional, name='dispatch')
+room_conditional = condition(etag_func=room_etag, last_modified_func=room_last_modified)
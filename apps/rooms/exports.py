@@ -0,0 +1,175 @@
+"""
+房間歷史匯出 (RoomExportView / export_room_history 共用)
+
+把房間全部的家務完成紀錄 (ChoreRecord) 或留言板訊息 (Chat) 串流輸出成 CSV 或 NDJSON：
+- 查詢以 values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE) 分批讀取，
+  不建立 model 物件也不快取整個結果，記憶體用量與房間資料量無關
+- 逐列產生文字，累積到約 EXPORT_BLOCK_SIZE 位元組才輸出一塊，減少小區塊的傳送次數
+- gzip 以 zlib 的串流壓縮器邊讀邊壓，不需要先產生完整的檔案
+- CSV 中以 = + - @ tab CR 開頭的文字前面加上 '，試算表開啟時不會當成公式執行 (NDJSON 不處理)
+- since / until (含) 以本地時區的日期篩選
+- ASGI 下以 aiter_blocks 包成非同步迭代器，每一塊才切到 sync 執行緒產生一次，
+  不會被 StreamingHttpResponse 先整個讀進 list
+"""
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+FORMATS = ('csv', 'ndjson')
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _timestamp(value):
+    return timezone.localtime(value).isoformat() if value else None
+
+
+def _date_filter(field, since, until):
+    filters = {}
+    if since:
+        filters[f'{field}__gte'] = _start_of_day(since)
+    if until:
+        filters[f'{field}__lt'] = _start_of_day(until + timedelta(days=1))
+    return filters
+
+
+# =========================
+# 資料來源
+# =========================
+def _records(room, since, until):
+    from apps.chores.models import ChoreRecord
+
+    rows = (
+        ChoreRecord.objects
+        .filter(chore__room=room, **_date_filter('completed_on', since, until))
+        .order_by('completed_on', 'id')
+        .values_list('id', 'chore_id', 'chore__title', 'chore__type', 'completed_by__username', 'completed_on')
+    )
+    for record_id, chore_id, title, chore_type, username, completed_on in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield (record_id, chore_id, title, chore_type, username, _timestamp(completed_on))
+
+
+def _chats(room, since, until):
+    from apps.chats.models import Chat
+
+    rows = (
+        Chat.objects
+        .filter(room=room, **_date_filter('created_at', since, until))
+        .order_by('created_at', 'id')
+        .values_list('id', 'is_article', 'parent_id', 'author__username', 'title', 'content', 'created_at')
+    )
+    for chat_id, is_article, parent_id, username, title, content, created_at in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield (
+            chat_id, 'article' if is_article else 'reply', parent_id, username,
+            title, content, _timestamp(created_at),
+        )
+
+
+# 種類 → (欄位名稱, 資料來源)
+KINDS = {
+    'records': (('id', 'chore_id', 'chore', 'chore_type', 'completed_by', 'completed_on'), _records),
+    'chats': (('id', 'type', 'parent_id', 'author', 'title', 'content', 'created_at'), _chats),
+}
+
+
+# =========================
+# 輸出格式
+# =========================
+class _Echo:
+    """csv.writer 用的假檔案：write() 直接回傳格式化後的那一列"""
+
+    def write(self, value):
+        return value
+
+
+# 試算表會把這些字元開頭的儲存格當成公式
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    # BOM：讓 Excel 以 UTF-8 開啟中文內容
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def _ndjson_lines(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), ensure_ascii=False) + '\n'
+
+
+def _blocks(lines, size=EXPORT_BLOCK_SIZE):
+    """把文字逐列編碼並累積成約 size 位元組的區塊"""
+    buffer, length = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_stream(blocks, level=6):
+    """串流 gzip 壓縮 (輸出為完整的 .gz 檔案格式)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_history(room, kind, fmt='csv', since=None, until=None, gzip=False):
+    """
+    房間歷史的位元組區塊產生器；kind 為 KINDS 之一，fmt 為 FORMATS 之一。
+    查詢在開始迭代時才執行。
+    """
+    header, source = KINDS[kind]
+    lines = (_csv_lines if fmt == 'csv' else _ndjson_lines)(header, source(room, since, until))
+    blocks = _blocks(lines)
+    return gzip_stream(blocks) if gzip else blocks
+
+
+async def aiter_blocks(blocks):
+    """
+    把 export_history 的同步產生器轉成非同步迭代器 (ASGI 的 StreamingHttpResponse 用)。
+    使用 thread_sensitive 的 sync 執行緒：iterator() 的游標屬於該執行緒的資料庫連線，
+    每一塊都必須在同一個執行緒產生；中途斷線時也在那裡關閉產生器 (釋放游標)。
+    """
+    done = object()
+    next_block = sync_to_async(next)
+    try:
+        while (block := await next_block(blocks, done)) is not done:
+            yield block
+    finally:
+        await sync_to_async(blocks.close)()
+
+
+def export_filename(room, kind, fmt, gzip=False, today=None):
+    today = today or timezone.localdate()
+    # 檔名用 id：房號可能含非 ASCII 字元
+    name = f'room-{room.id}-{kind}-{today:%Y%m%d}.{fmt}'
+    return name + '.gz' if gzip else name
@@ -50,4 +50,20 @@ class JoinRoomForm(forms.Form):
             
             cleaned_data['room'] = room # 將驗證後的 Room 實例加入
         
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+class RoomExportForm(forms.Form):
+    """房間歷史匯出的查詢參數 (見 apps.rooms.exports)"""
+    kind = forms.ChoiceField(choices=[('records', '家務完成紀錄'), ('chats', '留言板')], label='資料')
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], required=False, label='格式')
+    since = forms.DateField(required=False, label='起始日期')
+    until = forms.DateField(required=False, label='結束日期')
+    gzip = forms.BooleanField(required=False, label='gzip 壓縮')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        cleaned_data['format'] = cleaned_data.get('format') or 'csv'
+        since, until = cleaned_data.get('since'), cleaned_data.get('until')
+        if since and until and since > until:
+            raise forms.ValidationError('起始日期不能晚於結束日期。')
+        return cleaned_data
@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.rooms.exports import FORMATS, KINDS, export_history
+from apps.rooms.models import Room
+
+
+class Command(BaseCommand):
+    help = '串流匯出房間的家務完成紀錄或留言板歷史 (CSV / NDJSON)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('room_id', type=int, help='房號 id')
+        parser.add_argument('kind', choices=sorted(KINDS), help='匯出的資料')
+        parser.add_argument('--format', choices=FORMATS, default='csv', help='輸出格式')
+        parser.add_argument('--since', type=date.fromisoformat, help='起始日期 (含，YYYY-MM-DD)')
+        parser.add_argument('--until', type=date.fromisoformat, help='結束日期 (含，YYYY-MM-DD)')
+        parser.add_argument('--gzip', action='store_true', help='以 gzip 壓縮輸出')
+        parser.add_argument('-o', '--output', help='輸出檔案；不指定則寫到標準輸出')
+
+    def handle(self, *args, **options):
+        room = Room.objects.filter(id=options['room_id']).first()
+        if room is None:
+            raise CommandError(f'找不到房號 id: {options["room_id"]}')
+        if options['since'] and options['until'] and options['since'] > options['until']:
+            raise CommandError('--since 不能晚於 --until')
+
+        blocks = export_history(
+            room, options['kind'], options['format'], options['since'], options['until'], options['gzip'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for block in blocks:
+                    output.write(block)
+            self.stderr.write(f'已匯出到 {options["output"]}')
+        else:
+            # 位元組直接寫到標準輸出 (gzip 不能經過文字編碼)
+            output = getattr(self.stdout._out, 'buffer', None)
+            if output is None:
+                if options['gzip']:
+                    raise CommandError('標準輸出不支援二進位資料，請以 --output 指定檔案')
+                for block in blocks:
+                    self.stdout.write(block.decode('utf-8'), ending='')
+                return
+            for block in blocks:
+                output.write(block)
+            output.flush()
@@ -0,0 +1,103 @@
+"""
+目前房間解析 (CurrentRoomMiddleware)
+
+每個請求只解析一次 request.room：
+- session 中記下「已驗證過的成員資格」(房號 id、使用者、基本欄位、驗證時的戳記)
+- 戳記存在 cache：使用者的房間成員變動、房間本身被修改或刪除時，在交易提交後換新 (apps.core.signals)
+- 戳記相同且未超過 ROOM_MEMBERSHIP_CACHE_SECONDS 時直接由 session 重建 Room，不查詢資料庫；
+  否則以一次 Room + members 查詢重新驗證
+
+重建出來的 Room 只載入 id / room_number / creator_id，其餘欄位 (例如 version)
+第一次讀取時才會查詢，不會拿到過期的值。
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+
+from .models import Room
+
+SESSION_KEY = '_current_room'
+CACHED_FIELDS = ('id', 'room_number', 'creator_id')
+
+
+def _stamp_keys(user_id, room_id):
+    return f'room-resolver:user:{user_id}', f'room-resolver:room:{room_id}'
+
+
+def _new_stamp():
+    return time.time_ns()
+
+
+def _stamps(user_id, room_id):
+    """(使用者戳記, 房間戳記)；不在 cache 中時 (剛啟動或被淘汰) 產生新的，迫使重新驗證"""
+    keys = _stamp_keys(user_id, room_id)
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, _new_stamp(), timeout=None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def _renew_stamp(key):
+    # 交易提交後才換新：提交前換新的話，同時進行的請求可能以尚未提交 (舊的) 成員資格
+    # 重新驗證，並把結果存在新的戳記下
+    transaction.on_commit(lambda: cache.set(key, _new_stamp(), timeout=None))
+
+
+def invalidate_user(user_id):
+    """使用者加入 / 離開房間後呼叫 (交易提交後生效)"""
+    _renew_stamp(f'room-resolver:user:{user_id}')
+
+
+def invalidate_room(room_id):
+    """房間被修改或刪除後呼叫 (交易提交後生效)"""
+    _renew_stamp(f'room-resolver:room:{room_id}')
+
+
+def resolve_room(request):
+    """回傳使用者目前所在且確實是成員的 Room，否則 None"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+    room_id = request.session.get('current_room_id')
+    if not room_id:
+        return None
+
+    stamps = _stamps(user.pk, room_id)
+    cached = request.session.get(SESSION_KEY)
+    max_age = getattr(settings, 'ROOM_MEMBERSHIP_CACHE_SECONDS', 300)
+    if (
+        cached
+        and cached['room'] == room_id
+        and cached['user'] == user.pk
+        and cached['stamps'] == stamps
+        and time.time() - cached['validated_at'] < max_age
+    ):
+        return Room.from_db(router.db_for_read(Room), CACHED_FIELDS, cached['fields'])
+
+    room = Room.objects.filter(id=room_id, members=user).only('room_number', 'creator').first()
+    if room is None:
+        request.session.pop(SESSION_KEY, None)
+        return None
+    request.session[SESSION_KEY] = {
+        'room': room_id,
+        'user': user.pk,
+        'stamps': stamps,
+        'fields': [getattr(room, name) for name in CACHED_FIELDS],
+        'validated_at': time.time(),
+    }
+    return room
+
+
+class CurrentRoomMiddleware:
+    """設定 request.room (需放在 AuthenticationMiddleware 之後)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.room = resolve_room(request)
+        return self.get_response(request)
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-17 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='資料版本'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='version_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='版本更新時間'),
+        ),
+    ]
@@ -2,6 +2,7 @@
 from django.db import models
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
 
 class Room(models.Model):
     """
@@ -26,6 +27,11 @@ class Room(models.Model):
         verbose_name='創建者'
     )
 
+    # 房間資料版本：家務、完成紀錄、留言、成員任何寫入都會 +1 (見 apps.core.signals)
+    # 讀取頁面用它產生 ETag / Last-Modified
+    version = models.PositiveBigIntegerField(default=0, editable=False, verbose_name='資料版本')
+    version_changed_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='版本更新時間')
+
     class Meta:
         verbose_name = '房號'
         verbose_name_plural = '房號'
@@ -33,5 +39,13 @@ class Room(models.Model):
     def __str__(self):
         return self.room_number
 
+    @classmethod
+    def bump_version(cls, **filters):
+        """把符合條件的房間版本 +1 (單一 UPDATE，不觸發 signals)"""
+        return cls.objects.filter(**filters).update(
+            version=models.F('version') + 1,
+            version_changed_at=timezone.now(),
+        )
+
 
 # Create your models here.
@@ -0,0 +1,125 @@
+"""
+房間即時推播 (ASGI websocket：/ws/rooms/<room_id>/)
+
+- view 在交易提交後以 publish_room_event 發送事件 (新留言、家務完成)
+- 已登入且是該房間成員的連線會收到同房間的所有事件 (JSON)
+- 轉送事件前每隔 ROOM_WEBSOCKET_RECHECK_SECONDS 秒重新確認登入與成員資格，
+  已登出或被移出房間的連線以 CLOSE_FORBIDDEN 關閉
+- 透過 apps.core.broadcast 轉送，不經過資料庫，也不需要前端輪詢
+
+事件格式：{"type": "chat.reply" | "chore.completed", ...}
+"""
+import asyncio
+import json
+import re
+import time
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import aget_user
+from django.db import transaction
+from django.http.request import validate_host
+
+from apps.core.broadcast import get_broadcast
+from .models import Room
+
+PATH = re.compile(r'^/ws/rooms/(?P<room_id>\d+)/$')
+
+# 關閉代碼 (4000-4999 為應用程式自訂)
+CLOSE_NOT_FOUND = 4404
+CLOSE_FORBIDDEN = 4403
+
+
+def room_group(room_id):
+    return f'room-{room_id}'
+
+
+def publish_room_event(room_id, event_type, **data):
+    """交易提交後推播給房間內的連線 (回滾時不會送出)"""
+    message = dict(data, type=event_type)
+    transaction.on_commit(lambda: get_broadcast().publish(room_group(room_id), message))
+
+
+# =========================
+# ASGI websocket
+# =========================
+def _headers(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+
+def _origin_allowed(headers):
+    """避免跨站 websocket 劫持：Origin 必須是 ALLOWED_HOSTS 中的網域 (沒有 Origin 的非瀏覽器用戶端放行)"""
+    origin = headers.get('origin')
+    if not origin:
+        return True
+    host = urlsplit(origin).hostname or ''
+    allowed = settings.ALLOWED_HOSTS or (['localhost', '127.0.0.1', '[::1]'] if settings.DEBUG else [])
+    return validate_host(host, allowed)
+
+
+async def _authenticated_user(headers):
+    cookie = SimpleCookie()
+    cookie.load(headers.get('cookie', ''))
+    morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    engine = import_module(settings.SESSION_ENGINE)
+    request = SimpleNamespace(session=engine.SessionStore(morsel.value))
+    user = await aget_user(request)
+    return user if user.is_authenticated else None
+
+
+async def _still_member(headers, room_id, user_id):
+    """session 仍登入同一位使用者，且仍是房間成員"""
+    user = await _authenticated_user(headers)
+    return (
+        user is not None and user.pk == user_id
+        and await Room.objects.filter(id=room_id, members=user).aexists()
+    )
+
+
+async def room_websocket(scope, receive, send):
+    match = PATH.match(scope['path'])
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    headers = _headers(scope)
+    if match is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    room_id = int(match['room_id'])
+    user = await _authenticated_user(headers) if _origin_allowed(headers) else None
+    if user is None or not await Room.objects.filter(id=room_id, members=user).aexists():
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+
+    recheck = getattr(settings, 'ROOM_WEBSOCKET_RECHECK_SECONDS', 30)
+    async with get_broadcast().subscribe(room_group(room_id)) as queue:
+        await send({'type': 'websocket.accept'})
+        checked_at = time.monotonic()
+        next_event = asyncio.ensure_future(receive())
+        next_message = asyncio.ensure_future(queue.get())
+        try:
+            while True:
+                done, _ = await asyncio.wait({next_event, next_message}, return_when=asyncio.FIRST_COMPLETED)
+                if next_event in done:
+                    # 用戶端不需要送資料；斷線就結束
+                    if next_event.result()['type'] == 'websocket.disconnect':
+                        return
+                    next_event = asyncio.ensure_future(receive())
+                if next_message in done:
+                    # 只在有事件要送時才查詢，閒置的連線不會佔用資料庫
+                    if time.monotonic() - checked_at >= recheck:
+                        if not await _still_member(headers, room_id, user.pk):
+                            await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+                            return
+                        checked_at = time.monotonic()
+                    await send({'type': 'websocket.send', 'text': json.dumps(next_message.result(), ensure_ascii=False)})
+                    next_message = asyncio.ensure_future(queue.get())
+        finally:
+            next_event.cancel()
+            next_message.cancel()
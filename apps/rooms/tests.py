@@ -1,3 +1,305 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import warnings
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+
+from apps.chats.models import Chat
+from apps.chores.models import ChoreRecord
+from apps.core.broadcast import get_broadcast
+from apps.tests.builders import build_room
+from .exports import export_history
+from .middleware import SESSION_KEY, resolve_room
+from .models import Room
+from .realtime import CLOSE_FORBIDDEN, room_group, room_websocket
+
+User = get_user_model()
+
+
+class CurrentRoomResolverTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='resolver', password='pw')
+        cls.room = Room.objects.create(room_number='R1', password='pw', creator=cls.user)
+        cls.other = Room.objects.create(room_number='R2', password='pw', creator=cls.user)
+        cls.room.members.add(cls.user)
+        cls.other.members.add(cls.user)
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+        self.request.session = {'current_room_id': self.room.id}
+
+    def resolve(self):
+        with CaptureQueriesContext(connection) as ctx:
+            room = resolve_room(self.request)
+        return room, len(ctx.captured_queries)
+
+    def test_cached_membership_needs_no_query(self):
+        room, queries = self.resolve()
+        self.assertEqual((room, queries), (self.room, 1))
+        self.assertIn(SESSION_KEY, self.request.session)
+
+        room, queries = self.resolve()
+        self.assertEqual((room, queries), (self.room, 0))
+        self.assertEqual((room.room_number, room.creator_id), ('R1', self.user.id))
+
+    def test_leaving_room_invalidates(self):
+        self.resolve()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.room.members.remove(self.user)
+            # 交易提交前戳記不變：不會以尚未提交的成員資格重新驗證
+            self.assertEqual(self.resolve(), (self.room, 0))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.resolve(), (None, 1))
+        self.assertNotIn(SESSION_KEY, self.request.session)
+
+    def test_switching_and_deleting_rooms(self):
+        self.resolve()
+        self.request.session['current_room_id'] = self.other.id
+        self.assertEqual(self.resolve(), (self.other, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.delete()
+        self.assertEqual(self.resolve(), (None, 1))
+
+    def test_expired_validation_requeries(self):
+        self.resolve()
+        self.request.session[SESSION_KEY]['validated_at'] -= 3600
+        self.assertEqual(self.resolve(), (self.room, 1))
+
+    def test_anonymous_or_no_room(self):
+        self.request.session = {}
+        self.assertEqual(self.resolve(), (None, 0))
+
+
+class RoomWebsocketTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = build_room(chores=2, articles=1, replies_per_article=0)
+        cls.room = cls.fixture.room
+        cls.outsider = User.objects.create_user(username='outsider', password='pw')
+
+    def setUp(self):
+        self.client.force_login(self.fixture.owner)
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def connect(self, cookie=None, origin='http://localhost', room_id=None):
+        cookie = cookie or self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        scope = {
+            'type': 'websocket',
+            'path': f'/ws/rooms/{room_id or self.room.id}/',
+            'headers': [
+                (b'cookie', f'{settings.SESSION_COOKIE_NAME}={cookie}'.encode()),
+                (b'origin', origin.encode()),
+            ],
+        }
+        return ApplicationCommunicator(room_websocket, scope)
+
+    def post(self, url, data=None):
+        # on_commit 在同步的那一側註冊，要在同一個執行緒攔截
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, data or {})
+
+    async def receive_event(self, communicator, event_type):
+        # 同一次寫入也會送出 room.changed 等其他事件
+        while True:
+            event = json.loads((await communicator.receive_output(timeout=1))['text'])
+            if event['type'] == event_type:
+                return event
+
+    async def open(self, **kwargs):
+        communicator = self.connect(**kwargs)
+        await communicator.send_input({'type': 'websocket.connect'})
+        return communicator, await communicator.receive_output(timeout=1)
+
+    async def test_member_receives_room_events(self):
+        communicator, accepted = await self.open()
+        self.assertEqual(accepted['type'], 'websocket.accept')
+        self.assertEqual(get_broadcast().subscriber_count(room_group(self.room.id)), 1)
+
+        article = self.fixture.articles[0]
+        await sync_to_async(self.post)(f'/chats/{article.id}/reply/', {'content': '收到'})
+        event = await self.receive_event(communicator, 'chat.reply')
+        self.assertEqual((event['type'], event['article_id']), ('chat.reply', article.id))
+        self.assertEqual(event['comment']['content'], '收到')
+
+        chore = self.fixture.chores[0]
+        await sync_to_async(self.post)(f'/chores/complete/{chore.id}/')
+        event = await self.receive_event(communicator, 'chore.completed')
+        self.assertEqual((event['type'], event['chore_id']), ('chore.completed', chore.id))
+        self.assertEqual(event['stats']['total'], 2)
+
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(timeout=1)
+        self.assertEqual(get_broadcast().subscriber_count(room_group(self.room.id)), 0)
+
+    async def test_rejects_outsiders(self):
+        _, closed = await self.open(cookie='missing')
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+
+        _, closed = await self.open(origin='https://evil.example.com')
+        self.assertEqual(closed['code'], CLOSE_FORBIDDEN)
+
+        await sync_to_async(self.client.force_login)(self.outsider)
+        _, closed = await self.open()
+        self.assertEqual(closed['code'], CLOSE_FORBIDDEN)
+
+
+    async def test_closes_after_leaving_room(self):
+        with self.settings(ROOM_WEBSOCKET_RECHECK_SECONDS=0):
+            communicator, accepted = await self.open()
+            self.assertEqual(accepted['type'], 'websocket.accept')
+            get_broadcast().publish(room_group(self.room.id), {'type': 'room.changed'})
+            self.assertEqual(json.loads((await communicator.receive_output(timeout=1))['text'])['type'], 'room.changed')
+
+            await self.room.members.aremove(self.fixture.owner)
+            get_broadcast().publish(room_group(self.room.id), {'type': 'room.changed'})
+            closed = await communicator.receive_output(timeout=1)
+            self.assertEqual(closed, {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+
+    async def test_closes_after_logout(self):
+        with self.settings(ROOM_WEBSOCKET_RECHECK_SECONDS=0):
+            communicator, _ = await self.open()
+            await sync_to_async(self.client.logout)()
+            get_broadcast().publish(room_group(self.room.id), {'type': 'room.changed'})
+            closed = await communicator.receive_output(timeout=1)
+            self.assertEqual(closed['code'], CLOSE_FORBIDDEN)
+
+    async def test_recheck_is_throttled(self):
+        communicator, _ = await self.open()
+        await self.room.members.aremove(self.fixture.owner)
+        # 還在確認間隔內：不查詢，照常轉送
+        get_broadcast().publish(room_group(self.room.id), {'type': 'room.changed'})
+        event = await communicator.receive_output(timeout=1)
+        self.assertEqual(json.loads(event['text'])['type'], 'room.changed')
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(timeout=1)
+
+class RoomExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixture = build_room(chores=6, records_per_chore=3, articles=4, replies_per_article=2)
+        cls.room = cls.fixture.room
+        cls.other = build_room(chores=2, articles=1)
+        # 一半的紀錄移到 30 天前，測試日期篩選
+        cls.old_day = timezone.localdate() - timedelta(days=30)
+        records = ChoreRecord.objects.filter(chore__room=cls.room).order_by('id')
+        cls.old_ids = list(records.values_list('id', flat=True)[:9])
+        ChoreRecord.objects.filter(id__in=cls.old_ids).update(
+            completed_on=timezone.now() - timedelta(days=30)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.fixture.owner)
+        session = self.client.session
+        session['current_room_id'] = self.room.id
+        session.save()
+
+    def export(self, **params):
+        response = self.client.get('/rooms/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_records(self):
+        response, body = self.export(kind='records')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn(f'room-{self.room.id}-records-', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8-sig'))))
+        self.assertEqual(rows[0], ['id', 'chore_id', 'chore', 'chore_type', 'completed_by', 'completed_on'])
+        expected = ChoreRecord.objects.filter(chore__room=self.room)
+        self.assertEqual(sorted(int(row[0]) for row in rows[1:]), sorted(expected.values_list('id', flat=True)))
+        times = [row[5] for row in rows[1:]]
+        self.assertEqual(times, sorted(times))
+
+    def test_csv_neutralises_formulas(self):
+        author = self.fixture.owner
+        texts = ['=HYPERLINK("http://x","y")', '+1', '-2', '@SUM(A1)', '\tcmd', '\rcmd', 'plain', '2024-01-01']
+        for text in texts:
+            Chat.objects.create(room=self.room, author=author, title=text, content=text, is_article=True)
+        _, body = self.export(kind='chats')
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8-sig'), newline='')))
+        exported = {row[4] for row in rows[1:]}
+        for text in texts[:6]:
+            self.assertIn("'" + text, exported)
+            self.assertNotIn(text, exported)
+        self.assertIn('plain', exported)
+        self.assertIn('2024-01-01', exported)
+
+        # NDJSON 保留原文
+        _, body = self.export(kind='chats', format='ndjson')
+        self.assertTrue({c['title'] for c in map(json.loads, body.splitlines())} >= set(texts))
+
+    def test_ndjson_chats_gzip(self):
+        response, body = self.export(kind='chats', format='ndjson', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertTrue(response['Content-Disposition'].endswith('.ndjson.gz"'))
+        lines = gzip.decompress(body).decode('utf-8').splitlines()
+        chats = [json.loads(line) for line in lines]
+        self.assertEqual(len(chats), Chat.objects.filter(room=self.room).count())
+        self.assertEqual({c['type'] for c in chats}, {'article', 'reply'})
+        self.assertTrue(all(c['parent_id'] for c in chats if c['type'] == 'reply'))
+
+    def test_date_range(self):
+        _, body = self.export(kind='records', format='ndjson', until=self.old_day.isoformat())
+        self.assertEqual(sorted(json.loads(line)['id'] for line in body.splitlines()), self.old_ids)
+        _, body = self.export(kind='records', format='ndjson', since=(self.old_day + timedelta(days=1)).isoformat())
+        self.assertEqual(len(body.splitlines()), 18 - len(self.old_ids))
+
+    async def test_asgi_streams_async_iterator(self):
+        await self.async_client.aforce_login(self.fixture.owner)
+        session = await self.async_client.asession()
+        await session.aset('current_room_id', self.room.id)
+        await session.asave()
+
+        response = await self.async_client.get('/rooms/export/', {'kind': 'records', 'format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        # ASGIHandler 以 async for 讀取回應；同步產生器會觸發「must consume synchronous iterators」
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            blocks = [block async for block in response]
+        self.assertEqual(len(b''.join(blocks).splitlines()), 18)
+
+    def test_invalid_parameters(self):
+        for params in ({}, {'kind': 'users'}, {'kind': 'records', 'format': 'xml'},
+                       {'kind': 'records', 'since': '2024-02-01', 'until': '2024-01-01'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/rooms/export/', params).status_code, 400)
+
+    def test_lazy_single_query(self):
+        with self.assertNumQueries(0):
+            blocks = export_history(self.room, 'chats')
+        with mock.patch('apps.rooms.exports.EXPORT_CHUNK_SIZE', 2), \
+                self.assertNumQueries(1):
+            self.assertTrue(b''.join(blocks))
+
+    def test_command(self):
+        stdout = io.StringIO()
+        call_command('export_room_history', self.room.id, 'records', '--format', 'ndjson', stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 18)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'chats.csv.gz')
+            call_command('export_room_history', self.room.id, 'chats', '--gzip', '-o', path, stderr=io.StringIO())
+            with gzip.open(path, 'rt', encoding='utf-8-sig') as output:
+                rows = list(csv.reader(output))
+        self.assertEqual(len(rows) - 1, Chat.objects.filter(room=self.room).count())
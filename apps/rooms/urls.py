@@ -15,4 +15,6 @@ urlpatterns = [
     path('join/', views.JoinRoomView.as_view(), name='join'),       # <-- 新增
     # 【關鍵修正】：新增 'members/' 路由，指向一個新的 View
     path('members/', views.RoomMembersView.as_view(), name='members'), # <--- 新增這行
+    # 串流匯出房間歷史 (CSV / NDJSON)
+    path('export/', views.RoomExportView.as_view(), name='export'),
 ]
\ No newline at end of file
@@ -4,7 +4,10 @@ from django.views.generic import View, FormView, ListView
 from django.contrib import messages
 from .models import Room
 from django.urls import reverse # 需要導入
-from .forms import CreateRoomForm, JoinRoomForm
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from .exports import CONTENT_TYPES, aiter_blocks, export_filename, export_history
+from .forms import CreateRoomForm, JoinRoomForm, RoomExportForm
 from django.urls import reverse_lazy
 
 class SelectRoomView(LoginRequiredMixin, View):
@@ -85,23 +88,13 @@ class JoinRoomView(LoginRequiredMixin, FormView):
             messages.error(self.request, error)
         return redirect(self.success_url)
         
-# 這裡需要一個輔助函數來獲取當前房間
-def get_current_room(request):
-    current_room_id = request.session.get('current_room_id') 
-    if current_room_id:
-        try:
-            # 這裡我們只檢查房間是否存在，因為我們只在 RoomMembersView 中使用
-            return Room.objects.get(id=current_room_id)
-        except Room.DoesNotExist:
-            return None
-    return None
 
 class RoomMembersView(LoginRequiredMixin, View):
     """用於顯示當前房間所有成員的清單"""
     template_name = 'rooms/room_members.html' # 需要創建這個模板
 
     def get(self, request):
-        room = get_current_room(request)
+        room = request.room
         
         if not room:
             # 如果用戶沒有選擇房間，導向房間列表/選擇頁面
@@ -114,4 +107,34 @@ class RoomMembersView(LoginRequiredMixin, View):
             'room': room,
             'members': members,
         }
-        return render(request, self.template_name, context)
\ No newline at end of file
+        return render(request, self.template_name, context)
+
+
+class RoomExportView(LoginRequiredMixin, View):
+    """
+    串流匯出目前房間的歷史 (見 apps.rooms.exports)
+    GET ?kind=records|chats&format=csv|ndjson&since=YYYY-MM-DD&until=YYYY-MM-DD&gzip=1
+    WSGI 直接迭代產生器；ASGI (daphne) 改用非同步迭代器逐塊輸出
+    """
+
+    def get(self, request):
+        room = request.room
+        if not room:
+            return JsonResponse({'status': 'error', 'message': '請先選擇房號。'}, status=403)
+
+        form = RoomExportForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'status': 'error', 'message': '無效的匯出參數。', 'errors': form.errors}, status=400)
+        options = form.cleaned_data
+
+        blocks = export_history(room, options['kind'], options['format'], options['since'], options['until'], options['gzip'])
+        if isinstance(request, ASGIRequest):
+            # ASGI 只能逐塊串流非同步迭代器，同步產生器會先被整個讀進記憶體
+            blocks = aiter_blocks(blocks)
+        response = StreamingHttpResponse(
+            blocks,
+            content_type='application/gzip' if options['gzip'] else CONTENT_TYPES[options['format']],
+        )
+        filename = export_filename(room, options['kind'], options['format'], options['gzip'])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,66 @@
+"""
+頁面效能預算 (查詢數與耗時)
+
+    with query_budget('HomeView', max_queries=12, max_seconds=0.5):
+        client.get('/chores/dashboard/')
+
+超過預算時丟出 AssertionError，訊息中列出實際執行的每一條 SQL
+(重複的查詢會標出次數，方便找出 N+1)。
+
+耗時上限可用環境變數 VIEW_BUDGET_TIME_FACTOR 整體放寬 (例如較慢的 CI 設為 3)。
+"""
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def time_factor():
+    return float(os.environ.get('VIEW_BUDGET_TIME_FACTOR', 1))
+
+
+class BudgetResult:
+    """一次量測的結果：queries (SQL 清單) 與 seconds"""
+
+    def __init__(self):
+        self.queries = []
+        self.seconds = 0.0
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def report(self):
+        repeats = Counter(self.queries)
+        lines = []
+        for i, sql in enumerate(self.queries, 1):
+            mark = f'  [x{repeats[sql]}]' if repeats[sql] > 1 else ''
+            lines.append(f'{i}. {sql}{mark}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def measure():
+    """量測區塊內的 SQL 與耗時，不做判斷"""
+    result = BudgetResult()
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        yield result
+        result.seconds = time.perf_counter() - started
+    result.queries = [q['sql'] for q in ctx.captured_queries]
+
+
+@contextmanager
+def query_budget(label, max_queries=None, max_seconds=None):
+    with measure() as result:
+        yield result
+    problems = []
+    if max_queries is not None and result.count > max_queries:
+        problems.append(f'{result.count} 次查詢 (預算 {max_queries})')
+    if max_seconds is not None and result.seconds > max_seconds * time_factor():
+        problems.append(f'{result.seconds:.3f} 秒 (預算 {max_seconds * time_factor():.3f})')
+    if problems:
+        raise AssertionError(f'{label} 超出預算：{"，".join(problems)}\n{result.report()}')
@@ -0,0 +1,93 @@
+"""
+測試用資料建構：一次建好指定大小的房間
+
+全部用 bulk_create 寫入 (不觸發 signals)，最後再一次重建
+輪值名單、排程、每日貢獻彙總、全文搜尋與留言串索引、未讀計數器，讓衍生資料與正常寫入時一致。
+"""
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from apps.chats.models import Chat
+from apps.chats.search import rebuild as rebuild_search
+from apps.chats.threads import rebuild as rebuild_threads
+from apps.chats.unread import create_counters
+from apps.chores.contributions import backfill
+from apps.chores.models import Chore, ChoreRecord
+from apps.chores.roster import refresh_rosters
+from apps.chores.schedule import rebuild_room
+from apps.rooms.models import Room
+
+
+class RoomFixture(NamedTuple):
+    room: object
+    users: list
+    chores: list
+    articles: list
+
+    @property
+    def owner(self):
+        return self.users[0]
+
+
+def build_room(chores=5, members=3, records_per_chore=2, articles=5, replies_per_article=2,
+               number=None):
+    """
+    建立一個房間：members 位成員、chores 個家務 (每 4 個有 1 個私人家事)、
+    每個家務 records_per_chore 筆完成紀錄，以及 articles 篇文章各 replies_per_article 則留言。
+    """
+    User = get_user_model()
+    number = number or f'R{Room.objects.count() + 1:03d}'
+    users = User.objects.bulk_create([
+        User(username=f'{number}-m{k}', email=f'{number}-m{k}@example.com', password='!')
+        for k in range(members)
+    ])
+    room = Room.objects.create(room_number=number, password='pw', creator=users[0])
+    Room.members.through.objects.bulk_create([
+        Room.members.through(room_id=room.id, user_id=user.id) for user in users
+    ])
+
+    today = timezone.localdate()
+    chore_objs = Chore.objects.bulk_create([
+        Chore(
+            room=room, title=f'chore {k}',
+            type='PRIVATE' if k % 4 == 3 else 'PUBLIC',
+            private_area=f'area {k % 3}' if k % 4 == 3 else None,
+            frequency_days=1 + k % 7,
+            last_completed=today - timedelta(days=k % 5),
+        )
+        for k in range(chores)
+    ])
+    Chore.assigned_to.through.objects.bulk_create([
+        Chore.assigned_to.through(chore_id=chore.id, user_id=users[(k + j) % members].id)
+        for k, chore in enumerate(chore_objs)
+        for j in range(1 if chore.type == 'PRIVATE' else min(2, members))
+    ])
+    ChoreRecord.objects.bulk_create([
+        ChoreRecord(chore=chore, completed_by=users[(k + j) % members])
+        for k, chore in enumerate(chore_objs) for j in range(records_per_chore)
+    ])
+
+    article_objs = Chat.objects.bulk_create([
+        Chat(room=room, author=users[k % members], title=f'post {k}', content='hello', is_article=True)
+        for k in range(articles)
+    ])
+    Chat.objects.bulk_create([
+        Chat(room=room, author=users[(k + j) % members], content='reply', is_article=False, parent=article)
+        for k, article in enumerate(article_objs) for j in range(replies_per_article)
+    ])
+
+    refresh_rosters([c.id for c in chore_objs])
+    rebuild_room(room)
+    backfill(room_ids=[room.id])
+    rebuild_search([room.id])
+    rebuild_threads([room.id])
+    create_counters([room.id], [u.id for u in users])
+    return RoomFixture(
+        room=room,
+        users=users,
+        chores=list(Chore.objects.filter(room=room).order_by('id')),
+        articles=article_objs,
+    )
@@ -0,0 +1,25 @@
+"""
+測試執行器 (settings.TEST_RUNNER)
+
+測試期間 LOG_DIR 指到暫存目錄：慢請求 log 等不會寫進專案的 logs/，
+結束時一併刪除。
+"""
+import tempfile
+from pathlib import Path
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._log_dir = tempfile.TemporaryDirectory(prefix='roomie-test-logs-')
+        self._log_settings = override_settings(LOG_DIR=Path(self._log_dir.name))
+        self._log_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        # disable 會觸發 setting_changed，關閉寫在暫存目錄裡的 log 檔
+        self._log_settings.disable()
+        self._log_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,224 @@
+"""
+熱門查詢的執行計畫 (EXPLAIN) 回歸測試
+
+先灌入一份較大的資料，再對每個熱門查詢取得 EXPLAIN 結果：
+- 受保護的資料表不可以整張掃描 (SQLite: SCAN table；PostgreSQL: Seq Scan)
+- 需要依索引排序的查詢不可以出現額外排序 (USE TEMP B-TREE / Sort)
+- 與 query_plans/<vendor>.json 的快照比對使用到的索引
+
+PostgreSQL 會在 enable_seqscan = off 下執行：只要有可用的索引就一定會用，
+因此仍然出現 Seq Scan 就表示缺少索引。
+
+更新快照：UPDATE_QUERY_PLANS=1 python manage.py test apps.tests.test_query_plans
+"""
+import json
+import os
+import re
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import DateTimeField, ExpressionWrapper, F
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.chats.models import Chat
+from apps.chats.threads import rebuild as rebuild_threads
+from apps.chores.models import Chore, ChoreOccurrence, ChoreRecord, DailyContribution
+from apps.members.stats import stats_queryset
+from apps.rooms.models import Room
+
+SNAPSHOT_DIR = Path(__file__).resolve().parent / 'query_plans'
+
+ROOMS = 20
+MEMBERS_PER_ROOM = 5
+CHORES_PER_ROOM = 20
+RECORDS_PER_CHORE = 20
+CHATS_PER_ROOM = 100
+
+
+# =========================
+# EXPLAIN 解析
+# =========================
+SQLITE_ACCESS = re.compile(
+    r'\b(SCAN|SEARCH) (\w+)(?: AS \w+)?'
+    r'(?: USING (?:COVERING )?INDEX (\w+)| USING (?:INTEGER )?PRIMARY KEY)?'
+)
+PG_SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+PG_INDEX_SCAN = re.compile(r'(?:Index Scan|Index Only Scan)(?: Backward)? using (\w+) on (\w+)')
+PG_BITMAP_SCAN = re.compile(r'Bitmap Index Scan on (\w+)')
+
+
+def parse_plan(plan):
+    """EXPLAIN 文字 → {'indexes', 'full_scans', 'temp_sort'}"""
+    indexes, full_scans, temp_sort = set(), set(), False
+    for line in plan.splitlines():
+        if connection.vendor == 'sqlite':
+            if 'TEMP B-TREE' in line:
+                temp_sort = True
+            match = SQLITE_ACCESS.search(line)
+            if not match:
+                continue
+            kind, table, index = match.groups()
+            if index:
+                indexes.add(index)
+            elif kind == 'SCAN':
+                full_scans.add(table)
+        else:
+            if re.search(r'\bSort\b', line) and 'Sort Key' not in line:
+                temp_sort = True
+            full_scans.update(PG_SEQ_SCAN.findall(line))
+            indexes.update(index for index, _ in PG_INDEX_SCAN.findall(line))
+            indexes.update(PG_BITMAP_SCAN.findall(line))
+    return {'indexes': sorted(indexes), 'full_scans': sorted(full_scans), 'temp_sort': temp_sort}
+
+
+def explain(queryset):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain()
+
+
+class QueryPlanTests(TestCase):
+    """熱門查詢必須使用索引"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        User.objects.bulk_create([
+            User(username=f'user{i}', email=f'user{i}@example.com', password='!')
+            for i in range(ROOMS * MEMBERS_PER_ROOM)
+        ])
+        users = list(User.objects.order_by('id'))
+        Room.objects.bulk_create([
+            Room(room_number=f'{i:03d}', password='pw', creator=users[i * MEMBERS_PER_ROOM])
+            for i in range(ROOMS)
+        ])
+        rooms = list(Room.objects.order_by('id'))
+        Room.members.through.objects.bulk_create([
+            Room.members.through(room_id=room.id, user_id=users[i * MEMBERS_PER_ROOM + k].id)
+            for i, room in enumerate(rooms) for k in range(MEMBERS_PER_ROOM)
+        ])
+
+        today = timezone.localdate()
+        Chore.objects.bulk_create([
+            Chore(room=room, title=f'chore {k}', type='PRIVATE' if k % 4 == 0 else 'PUBLIC',
+                  frequency_days=1 + k % 7, last_completed=today)
+            for room in rooms for k in range(CHORES_PER_ROOM)
+        ])
+        chores = list(Chore.objects.order_by('id'))
+        ChoreRecord.objects.bulk_create([
+            ChoreRecord(chore=chore, completed_by=users[(i % ROOMS) * MEMBERS_PER_ROOM + k % MEMBERS_PER_ROOM])
+            for i, chore in enumerate(chores) for k in range(RECORDS_PER_CHORE)
+        ])
+        # completed_on 是 auto_now_add，建立後再依 id 往前分散到過去一年
+        ChoreRecord.objects.update(completed_on=ExpressionWrapper(
+            F('completed_on') - F('id') % 365 * timedelta(days=1),
+            output_field=DateTimeField(),
+        ))
+        ChoreOccurrence.objects.bulk_create([
+            ChoreOccurrence(chore=chore, room_id=chore.room_id, due_date=today + timedelta(days=d))
+            for chore in chores for d in range(30)
+        ])
+        DailyContribution.objects.bulk_create([
+            DailyContribution(room=room, user=users[i * MEMBERS_PER_ROOM + k], chore_type='PUBLIC',
+                              day=today - timedelta(days=d), count=1 + d % 3)
+            for i, room in enumerate(rooms) for k in range(MEMBERS_PER_ROOM) for d in range(60)
+        ])
+
+        for i, room in enumerate(rooms):
+            articles = Chat.objects.bulk_create([
+                Chat(room=room, author=users[i * MEMBERS_PER_ROOM + k % MEMBERS_PER_ROOM],
+                     title=f'post {k}', content='hello', is_article=True)
+                for k in range(CHATS_PER_ROOM // 2)
+            ])
+            Chat.objects.bulk_create([
+                Chat(room=room, author=article.author, content='reply', is_article=False, parent=article)
+                for article in articles
+            ])
+        rebuild_threads()
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        cls.room = rooms[ROOMS // 2]
+        cls.user = users[(ROOMS // 2) * MEMBERS_PER_ROOM]
+        cls.chore_ids = [c.id for c in chores if c.room_id == cls.room.id]
+        cls.feed_cursor = Chat.objects.article_feed(cls.room, limit=10)[1]
+        cls.article = Chat.objects.filter(room=cls.room, is_article=True).first()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.snapshot_path = SNAPSHOT_DIR / f'{connection.vendor}.json'
+        cls.updating = bool(os.environ.get('UPDATE_QUERY_PLANS'))
+        cls.snapshot = {}
+        if cls.snapshot_path.exists() and not cls.updating:
+            cls.snapshot = json.loads(cls.snapshot_path.read_text(encoding='utf-8'))
+        cls.captured = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.updating and cls.captured:
+            SNAPSHOT_DIR.mkdir(exist_ok=True)
+            cls.snapshot_path.write_text(
+                json.dumps(cls.captured, ensure_ascii=False, indent=2, sort_keys=True) + '\n',
+                encoding='utf-8',
+            )
+        super().tearDownClass()
+
+    def hot_queries(self):
+        """(名稱, queryset, 不可整張掃描的資料表, 是否必須依索引排序)"""
+        now = timezone.now()
+        return [
+            ('room_membership',
+             Room.objects.filter(id=self.room.id, members=self.user),
+             {'rooms_room', 'rooms_room_members'}, False),
+            ('records_by_room_window',
+             ChoreRecord.objects.filter(chore__room=self.room, completed_on__gte=now - timedelta(days=30)),
+             {'chores_chore', 'chores_chorerecord'}, False),
+            ('records_by_chores_window',
+             ChoreRecord.objects.filter(
+                 chore_id__in=self.chore_ids,
+                 completed_on__gte=now - timedelta(days=1), completed_on__lt=now,
+             ).order_by().values_list('chore_id', 'completed_on'),
+             {'chores_chorerecord'}, False),
+            ('chat_article_feed',
+             Chat.objects.feed_queryset(self.room)[:21],
+             {'chats_chat'}, True),
+            ('chat_article_feed_next_page',
+             Chat.objects.feed_queryset(self.room, cursor=self.feed_cursor)[:21],
+             {'chats_chat'}, True),
+            ('chat_reply_thread',
+             Chat.objects.thread_queryset(self.article)[:21],
+             {'chats_chat'}, True),
+            ('occurrence_calendar',
+             ChoreOccurrence.objects.filter(room=self.room, due_date__lte=now.date() + timedelta(days=7)),
+             {'chores_choreoccurrence'}, False),
+            ('contribution_window',
+             DailyContribution.objects.filter(room=self.room, day__gte=now.date() - timedelta(days=29)),
+             {'chores_dailycontribution'}, False),
+            ('member_stats',
+             stats_queryset(self.room, today=now.date()),
+             {'chats_chat', 'chores_choreoccurrence', 'chores_chorerecord', 'chores_dailycontribution'}, False),
+        ]
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset, guarded, index_ordered in self.hot_queries():
+            with self.subTest(query=name):
+                plan = explain(queryset)
+                parsed = parse_plan(plan)
+                self.captured[name] = dict(parsed, plan=plan.splitlines())
+
+                scanned = guarded & set(parsed['full_scans'])
+                self.assertFalse(scanned, f'{name} 整張掃描 {sorted(scanned)}:\n{plan}')
+                if index_ordered:
+                    self.assertFalse(parsed['temp_sort'], f'{name} 沒有依索引排序:\n{plan}')
+
+                expected = self.snapshot.get(name)
+                if expected:
+                    missing = set(expected['indexes']) - set(parsed['indexes'])
+                    self.assertFalse(missing, f'{name} 不再使用索引 {sorted(missing)}:\n{plan}')
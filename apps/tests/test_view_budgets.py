@@ -0,0 +1,79 @@
+"""
+各頁面的查詢數與耗時預算
+
+房間從 5 個家務成長到 500 個家務時：
+- 查詢數必須相同 (沒有 N+1)，且不超過 max_queries
+- 每個大小的耗時都不超過 max_seconds (VIEW_BUDGET_TIME_FACTOR 可整體放寬)
+"""
+from django.test import TestCase
+
+from apps.chores.snapshots import invalidate_room
+
+from .budgets import measure, query_budget
+from .builders import build_room
+
+SIZES = (5, 50, 500)
+
+# (名稱, 網址, 最多查詢數, 最多秒數)
+VIEW_BUDGETS = [
+    # HomeView：快照 key 讀取已提交的房間版本號 (1 次)
+    ('HomeView', lambda f: '/chores/dashboard/', 11, 1.0),
+    ('ChoreListView', lambda f: '/chores/', 11, 1.0),
+    ('ChatListView', lambda f: '/chats/', 5, 0.3),
+    ('ChatDetailView', lambda f: f'/chats/{f.articles[0].id}/', 6, 0.3),
+    ('MemberListView', lambda f: '/members/', 5, 0.3),
+    ('MemberDetailView', lambda f: f'/members/detail/{f.users[1].id}/', 9, 0.3),
+]
+
+
+class ViewBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rooms = {
+            size: build_room(chores=size, members=4, articles=size // 5 + 1)
+            for size in SIZES
+        }
+
+    def login(self, fixture):
+        self.fixture = fixture
+        self.client.force_login(fixture.owner)
+        session = self.client.session
+        session['current_room_id'] = fixture.room.id
+        session.save()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_views_stay_within_budget(self):
+        for name, url_for, max_queries, max_seconds in VIEW_BUDGETS:
+            counts = {}
+            for size, fixture in self.rooms.items():
+                with self.subTest(view=name, chores=size):
+                    url = url_for(fixture)
+                    self.login(fixture)
+                    # 第一次請求先載入模板
+                    self.get(url)
+                    # 主頁快照要量的是未命中時的成本 (版本號 +1；不清空整個快取，
+                    # request.room 的成員資格戳記也在裡面)
+                    invalidate_room(fixture.room.id)
+                    with query_budget(f'{name} ({size} 個家務)', max_queries, max_seconds) as result:
+                        self.get(url)
+                    counts[size] = result.count
+            if len(counts) == len(SIZES):
+                self.assertEqual(len(set(counts.values())), 1, f'{name} 查詢數隨房間大小改變：{counts}')
+
+    def test_budget_reports_sql(self):
+        self.login(self.rooms[SIZES[0]])
+        with self.assertRaises(AssertionError) as raised:
+            with query_budget('ChoreListView', max_queries=1):
+                self.get('/chores/')
+        self.assertIn('ChoreListView 超出預算', str(raised.exception))
+        self.assertIn('SELECT', str(raised.exception))
+
+        with measure() as result:
+            self.get('/chores/')
+            self.get('/chores/')
+        self.assertIn('[x2]', result.report())
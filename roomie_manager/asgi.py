@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'roomie_manager.settings.production')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# websocket 由 apps.rooms.realtime 處理 (需在 Django 初始化之後匯入)
+from apps.rooms.realtime import room_websocket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await room_websocket(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -38,6 +38,7 @@ ASGI_APPLICATION = 'roomie_manager.asgi.application'
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',  # runserver 改用 ASGI (websocket：apps.rooms.realtime)
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -67,12 +68,14 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User' # 假設您的 User 模型命名為 User
 
 MIDDLEWARE = [
+    'apps.core.perf.PerformanceMiddleware',  # 最外層：總耗時包含所有 middleware
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.rooms.middleware.CurrentRoomMiddleware',  # request.room
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware', 
@@ -91,6 +94,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.core.context_processors.unread_chats',
             ],
         },
     },
@@ -98,6 +102,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'roomie_manager.wsgi.application'
 
+# 測試期間 log 寫到暫存目錄 (apps.tests.runner)
+TEST_RUNNER = 'apps.tests.runner.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -203,6 +210,77 @@ SOCIALACCOUNT_PROVIDERS = {
         'FETCH_USERINFO': True,  # 從 Google 取得用戶資訊
     }
 }
+# 家務排程 (ChoreOccurrence) 往後物化的天數
+CHORE_SCHEDULE_HORIZON_DAYS = 90
+
+# 家務完成請求的 Idempotency-Key 保留時數 (prune_completion_requests)
+CHORE_COMPLETION_KEY_HOURS = 24
+
+# 家務批次匯入 (apps.chores.importer) 單次最多的家務筆數
+CHORE_IMPORT_MAX_ROWS = 50000
+
+# 快取：開發環境使用 local-memory；多個 worker 的正式環境請改用 file backend
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'roomie-manager',
+    }
+}
+# 主頁快照 (apps.chores.snapshots) 使用的快取與存活秒數
+DASHBOARD_CACHE_ALIAS = 'default'
+DASHBOARD_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+# 主頁區塊的非同步計算 (apps.chores.dashboard)：執行緒池大小 (0 = 在請求的執行緒內依序計算)
+# 與單一區塊最多執行的秒數 (不含排隊等執行緒的時間)，逾時的區塊以空白顯示
+DASHBOARD_SECTION_WORKERS = 4
+DASHBOARD_SECTION_TIMEOUT = 5
+
+# 目前房間 (apps.rooms.middleware.CurrentRoomMiddleware)：成員資格驗證結果沿用的秒數，
+# 成員或房間變動時會立即失效
+ROOM_MEMBERSHIP_CACHE_SECONDS = 300
+
+# 即時推播的廣播後端 (apps.core.broadcast)；預設只在同一個行程內轉送，
+# 多個 worker 時需換成跨行程的後端
+BROADCAST_BACKEND = 'apps.core.broadcast.InMemoryBroadcast'
+# 房間 websocket (apps.rooms.realtime)：轉送事件前重新確認登入與成員資格的間隔秒數 (0 = 每個事件都確認)
+ROOM_WEBSOCKET_RECHECK_SECONDS = 30
+# 家務統計 SSE (apps.chores.streams)：沒有事件時每隔幾秒送 heartbeat 並檢查版本號
+CHORE_STATS_STREAM_HEARTBEAT = 15
+
+# 請求效能紀錄 (apps.core.perf.PerformanceMiddleware)
+PERF_MONITOR_ENABLED = True
+# Server-Timing 含查詢數與程式位置：True = 所有回應，'staff' = 只回給管理員，False = 不回傳
+PERF_SERVER_TIMING = 'staff'
+PERF_SLOW_REQUEST_MS = 500
+PERF_SLOW_QUERY_COUNT = 50
+
+# 慢請求 log：logs/slow_requests.log，超過 5MB 輪替，保留 5 份 (目錄在第一次寫入時建立)
+# 相對路徑的 filename 放在 LOG_DIR 之下；測試期間 LOG_DIR 指到暫存目錄 (apps.tests.runner)
+LOG_DIR = BASE_DIR / 'logs'
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'slow_request': {'format': '%(asctime)s %(message)s'},
+    },
+    'handlers': {
+        'slow_requests': {
+            'class': 'apps.core.log_handlers.LazyRotatingFileHandler',
+            'filename': 'slow_requests.log',
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'formatter': 'slow_request',
+        },
+    },
+    'loggers': {
+        'apps.perf.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # --- 路由配置 (roomie_manager/urls.py) ---
 # 確保主路由包含 chores 的路由:
 """
@@ -3,6 +3,9 @@ from .base import *
 DEBUG = True
 ALLOWED_HOSTS = ['127.0.0.1' , 'localhost']
 
+# 開發時所有回應都帶 Server-Timing
+PERF_SERVER_TIMING = True
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -31,6 +31,14 @@ else:
         }
     }
 
+# 快取：gunicorn 多個 worker 需共用主頁快照與命中計數，使用 file backend
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    }
+}
+
 # 生產環境安全設定
 
 SESSION_COOKIE_SECURE = True  # Cookie 只能透過 HTTPS 傳輸